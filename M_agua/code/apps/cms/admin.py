@@ -1,10 +1,212 @@
-from django.contrib import admin
-from .models import CategoriaEscena, Escena360, LogoCreador, ConfiguracionInterfaz
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.http import HttpResponseRedirect
+from django.shortcuts import get_object_or_404
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils import timezone
+from django.utils.html import format_html
+
+from .cache import invalidar_catalogo
+from .models import CategoriaEscena, Escena360, LogoCreador, ConfiguracionInterfaz, TareaImagen
+from .paginacion import PaginadorEstimado
+
+
+def miniatura(obj, campo='icono'):
+    """<img> con la rendición más pequeña de una imagen para las listas del admin"""
+    url = obj.get_url_miniatura(campo)
+    if not url:
+        return "—"
+    return format_html(
+        '<img src="{}" alt="" width="40" height="40" loading="lazy" style="object-fit: contain;">', url,
+    )
+
+
+class FiltroAutocompletar(admin.FieldListFilter):
+    """
+    Filtro de una ForeignKey con el autocompletado del admin.
+
+    El filtro por defecto lista todos los objetos relacionados en cada
+    carga de la lista; este solo consulta el elegido y busca el resto bajo
+    demanda, con los ``search_fields`` del admin del modelo relacionado.
+    """
+    template = 'admin/cms/filtro_autocompletar.html'
+    
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.lookup_kwarg = f'{field_path}__{field.target_field.name}__exact'
+        super().__init__(field, request, params, model, model_admin, field_path)
+        self.lookup_val = (self.used_parameters.get(self.lookup_kwarg) or [None])[-1]
+        self.campo = forms.ModelChoiceField(
+            queryset=field.remote_field.model._default_manager.all(),
+            widget=AutocompleteSelect(field, model_admin.admin_site, attrs={'style': 'width: 100%;'}),
+            required=False,
+        )
+    
+    @staticmethod
+    def media_filtro(field, admin_site):
+        """JS y CSS del filtro; los añade el ModelAdmin, la lista de cambios no recoge los de los filtros"""
+        return AutocompleteSelect(field, admin_site).media + forms.Media(
+            js=['admin/js/jquery.init.js', 'js/filtro_autocompletar.js'],
+        )
+    
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+    
+    def get_facet_counts(self, pk_attname, filtered_qs):
+        return {}
+    
+    def choices(self, changelist):
+        self.consulta_sin_filtro = changelist.get_query_string(remove=[self.lookup_kwarg])
+        yield {
+            'selected': self.lookup_val is None,
+            'query_string': self.consulta_sin_filtro,
+            'display': "Todas",
+        }
+    
+    def selector(self):
+        return self.campo.widget.render(
+            self.lookup_kwarg,
+            self.lookup_val,
+            attrs={'id': f'filtro_{self.lookup_kwarg}', 'data-consulta': self.consulta_sin_filtro},
+        )
+
+
+class ListaEscalableMixin:
+    """Listas del admin que no cuentan toda la tabla en cada carga"""
+    paginator = PaginadorEstimado
+    # Sin el "(N en total)" junto a la búsqueda, que añadiría otro COUNT(*)
+    show_full_result_count = False
+    
+    @admin.display(description="Icono")
+    def miniatura(self, obj):
+        return miniatura(obj)
+
+
+class OrdenableMixin:
+    """
+    Página para ordenar arrastrando, enlazada desde la lista de cambios.
+
+    El orden nuevo llega en un único envío y se guarda con un solo
+    ``bulk_update`` en una transacción: no hay un UPDATE ni señales por fila,
+    y el catálogo publica una única versión nueva al confirmar.
+    """
+    change_list_template = 'admin/cms/change_list_ordenable.html'
+    # ForeignKey dentro de la que se ordena (las escenas, dentro de su categoría)
+    ordenar_dentro_de = None
+    
+    def get_urls(self):
+        nombre = f'{self.opts.app_label}_{self.opts.model_name}_ordenar'
+        # Antes que las de super(), que capturan cualquier ruta como un objeto
+        return [path('ordenar/', self.admin_site.admin_view(self.ordenar_view), name=nombre)] + super().get_urls()
+    
+    def url_ordenar(self, request):
+        """URL de la página de ordenar desde la lista actual, o None si hay que filtrar antes"""
+        url = reverse(f'admin:{self.opts.app_label}_{self.opts.model_name}_ordenar', current_app=self.admin_site.name)
+        if self.ordenar_dentro_de is None:
+            return url
+        campo = self.opts.get_field(self.ordenar_dentro_de)
+        grupo = request.GET.get(f'{campo.name}__{campo.target_field.name}__exact')
+        return f'{url}?{campo.name}={grupo}' if grupo else None
+    
+    def changelist_view(self, request, extra_context=None):
+        extra_context = {'url_ordenar': self.url_ordenar(request), **(extra_context or {})}
+        return super().changelist_view(request, extra_context)
+    
+    def objetos_a_ordenar(self, request):
+        """(grupo, queryset) de los objetos que se ordenan juntos; queryset es None si falta el grupo"""
+        consulta = self.model._default_manager.all()
+        if self.ordenar_dentro_de is None:
+            return None, consulta
+        campo = self.opts.get_field(self.ordenar_dentro_de)
+        pk = request.GET.get(campo.name, '')
+        if not pk.isdigit():
+            return None, None
+        grupo = get_object_or_404(campo.remote_field.model, pk=pk)
+        return grupo, consulta.filter(**{campo.name: grupo}).select_related(campo.name)
+    
+    def ordenar_view(self, request):
+        if not self.has_change_permission(request):
+            raise PermissionDenied
+        grupo, consulta = self.objetos_a_ordenar(request)
+        url_lista = reverse(f'admin:{self.opts.app_label}_{self.opts.model_name}_changelist', current_app=self.admin_site.name)
+        if consulta is None:
+            campo = self.opts.get_field(self.ordenar_dentro_de)
+            self.message_user(
+                request,
+                f"Filtre la lista por {campo.verbose_name.lower()} para ordenar sus {self.opts.verbose_name_plural.lower()}",
+                messages.WARNING,
+            )
+            return HttpResponseRedirect(url_lista)
+        if grupo is not None:
+            campo = self.opts.get_field(self.ordenar_dentro_de)
+            url_lista += f'?{campo.name}__{campo.target_field.name}__exact={grupo.pk}'
+        
+        if request.method == 'POST':
+            try:
+                ids = [int(valor) for valor in request.POST.get('orden', '').split(',') if valor]
+            except ValueError:
+                ids = None
+            cambiados = self.aplicar_orden(consulta, ids)
+            if cambiados is None:
+                self.message_user(
+                    request,
+                    "La lista cambió mientras la ordenaba; revise el orden y vuelva a guardarlo",
+                    messages.ERROR,
+                )
+                return HttpResponseRedirect(request.get_full_path())
+            self.message_user(request, f"Orden guardado: {cambiados} {self.opts.verbose_name_plural.lower()} cambiaron de posición")
+            return HttpResponseRedirect(url_lista)
+        
+        campo_imagen = next(iter(self.model.CAMPOS_RENDICION), None)
+        contexto = {
+            **self.admin_site.each_context(request),
+            'title': f"Ordenar {self.opts.verbose_name_plural.lower()}" + (f" de {grupo}" if grupo else ""),
+            'opts': self.opts,
+            'grupo': grupo,
+            'nombre_grupo': self.ordenar_dentro_de,
+            'objetos': [
+                {'pk': obj.pk, 'texto': str(obj), 'miniatura': miniatura(obj, campo_imagen) if campo_imagen else ""}
+                for obj in consulta
+            ],
+            'url_lista': url_lista,
+        }
+        return TemplateResponse(request, 'admin/cms/ordenar.html', contexto)
+    
+    def aplicar_orden(self, consulta, ids):
+        """
+        Guarda ``ids`` como el orden nuevo; devuelve cuántos objetos cambiaron.
+
+        Devuelve None, sin guardar nada, si ``ids`` no son exactamente los
+        objetos a ordenar (otro editor añadió o borró alguno entretanto).
+        """
+        with transaction.atomic():
+            objetos = {obj.pk: obj for obj in consulta.select_for_update()}
+            if ids is None or len(ids) != len(objetos) or set(ids) != set(objetos):
+                return None
+            ahora = timezone.now()
+            cambiados = []
+            for posicion, pk in enumerate(ids):
+                obj = objetos[pk]
+                if obj.orden != posicion:
+                    obj.orden = posicion
+                    # bulk_update no aplica auto_now; la huella del catálogo la lee
+                    obj.fecha_modificacion = ahora
+                    cambiados.append(obj)
+            if cambiados:
+                self.model._default_manager.bulk_update(cambiados, ['orden', 'fecha_modificacion'])
+                # bulk_update no envía post_save: se publica una única versión del catálogo
+                transaction.on_commit(invalidar_catalogo)
+        return len(cambiados)
 
 
 @admin.register(CategoriaEscena)
-class CategoriaEscenaAdmin(admin.ModelAdmin):
-    list_display = ('titulo', 'orden', 'activa', 'fecha_creacion')
+class CategoriaEscenaAdmin(OrdenableMixin, ListaEscalableMixin, admin.ModelAdmin):
+    list_display = ('miniatura', 'titulo', 'orden', 'activa', 'fecha_creacion')
+    list_display_links = ('titulo',)
     list_filter = ('activa', 'fecha_creacion')
     search_fields = ('titulo',)
     list_editable = ('orden', 'activa')
@@ -12,16 +214,42 @@ class CategoriaEscenaAdmin(admin.ModelAdmin):
 
 
 @admin.register(Escena360)
-class Escena360Admin(admin.ModelAdmin):
-    list_display = ('titulo', 'categoria', 'orden', 'activa', 'fecha_creacion')
-    list_filter = ('categoria', 'activa', 'fecha_creacion')
-    search_fields = ('titulo', 'descripcion')
+class Escena360Admin(OrdenableMixin, ListaEscalableMixin, admin.ModelAdmin):
+    list_display = ('miniatura', 'titulo', 'categoria', 'orden', 'activa', 'estado_procesamiento', 'fecha_creacion')
+    list_display_links = ('titulo',)
+    list_select_related = ('categoria',)
+    list_filter = (('categoria', FiltroAutocompletar), 'activa', 'fecha_creacion')
+    # La descripción queda fuera: un LIKE '%...%' sobre texto largo recorre toda la tabla
+    search_fields = ('titulo',)
     list_editable = ('orden', 'activa')
     ordering = ('categoria', 'orden', 'titulo')
+    autocomplete_fields = ('categoria',)
+    ordenar_dentro_de = 'categoria'
+    
+    @property
+    def media(self):
+        filtro = FiltroAutocompletar.media_filtro(Escena360._meta.get_field('categoria'), self.admin_site)
+        return super().media + filtro
+    
+    def get_queryset(self, request):
+        # Estado de la última tarea de imagen de cada escena en la misma consulta
+        ultima_tarea = TareaImagen.objects.filter(
+            modelo=Escena360._meta.label_lower,
+            objeto_id=OuterRef('pk'),
+        ).order_by('-pk')
+        return super().get_queryset(request).annotate(
+            estado_tarea=Subquery(ultima_tarea.values('estado')[:1]),
+        )
+    
+    @admin.display(description="Procesamiento", ordering='estado_tarea')
+    def estado_procesamiento(self, obj):
+        if obj.estado_tarea is None:
+            return "—"
+        return dict(TareaImagen.ESTADOS_CHOICES)[obj.estado_tarea]
 
 
 @admin.register(LogoCreador)
-class LogoCreadorAdmin(admin.ModelAdmin):
+class LogoCreadorAdmin(OrdenableMixin, admin.ModelAdmin):
     list_display = ('nombre', 'orden', 'activo', 'url', 'fecha_creacion')
     list_filter = ('activo', 'fecha_creacion')
     search_fields = ('nombre',)
@@ -29,6 +257,26 @@ class LogoCreadorAdmin(admin.ModelAdmin):
     ordering = ('orden', 'nombre')
 
 
+@admin.register(TareaImagen)
+class TareaImagenAdmin(admin.ModelAdmin):
+    list_display = ('modelo', 'objeto_id', 'estado', 'intentos', 'trabajador', 'fecha_creacion', 'fecha_fin')
+    list_filter = ('estado', 'modelo')
+    readonly_fields = [campo.name for campo in TareaImagen._meta.fields]
+    actions = ['reintentar']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    @admin.action(description="Reintentar las tareas seleccionadas")
+    def reintentar(self, request, queryset):
+        total = queryset.exclude(estado=TareaImagen.EN_PROCESO).update(
+            estado=TareaImagen.PENDIENTE,
+            intentos=0,
+            disponible_desde=timezone.now(),
+        )
+        self.message_user(request, f"{total} tareas devueltas a la cola")
+
+
 @admin.register(ConfiguracionInterfaz)
 class ConfiguracionInterfazAdmin(admin.ModelAdmin):
     fieldsets = (
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CmsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.cms'
+
+    def ready(self):
+        from . import middleware, signals  # noqa: F401
+        from .metricas import instalar
+
+        instalar()
@@ -0,0 +1,298 @@
+"""
+Utilidades comunes de los comandos de benchmark (``bench_*``).
+
+Las peticiones se hacen dentro del propio proceso contra las aplicaciones
+WSGI y ASGI de ``core``, sin servidores ni servicios externos, y los
+resultados se resumen en percentiles que se imprimen como tabla o se vuelcan
+como JSON para comparar ejecuciones entre commits.
+"""
+
+import asyncio
+import colorsys
+import json
+import math
+import subprocess
+import time
+from contextlib import contextmanager
+from io import BytesIO
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections
+from django.db.models import Max
+from PIL import Image, ImageDraw
+
+
+def percentil(ordenadas, porcentaje):
+    """Percentil por rango más cercano de una lista ya ordenada"""
+    if not ordenadas:
+        return 0.0
+    posicion = max(math.ceil(porcentaje / 100 * len(ordenadas)) - 1, 0)
+    return ordenadas[posicion]
+
+
+def resumir(latencias, duracion):
+    """Resumen de una tanda de peticiones; las latencias van en segundos"""
+    ordenadas = sorted(latencias)
+    return {
+        'peticiones': len(ordenadas),
+        'duracion_s': round(duracion, 4),
+        'rps': round(len(ordenadas) / duracion, 1) if duracion else 0.0,
+        'media_ms': round(sum(ordenadas) / len(ordenadas) * 1000, 3) if ordenadas else 0.0,
+        'p50_ms': round(percentil(ordenadas, 50) * 1000, 3),
+        'p95_ms': round(percentil(ordenadas, 95) * 1000, 3),
+        'p99_ms': round(percentil(ordenadas, 99) * 1000, 3),
+    }
+
+
+def cronometrar(funcion, repeticiones):
+    """Latencias en segundos de ``repeticiones`` llamadas a ``funcion``"""
+    latencias = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        latencias.append(time.perf_counter() - inicio)
+    return latencias
+
+
+def formatear_tabla(filas, columnas):
+    """Líneas de texto con las columnas alineadas; ``filas`` son diccionarios"""
+    anchos = {columna: max([len(columna)] + [len(str(fila.get(columna, ''))) for fila in filas]) for columna in columnas}
+    lineas = ['  '.join(columna.rjust(anchos[columna]) for columna in columnas)]
+    for fila in filas:
+        lineas.append('  '.join(str(fila.get(columna, '')).rjust(anchos[columna]) for columna in columnas))
+    return lineas
+
+
+def volcar_json(resultados):
+    return json.dumps(resultados, indent=2, ensure_ascii=False)
+
+
+def commit_actual():
+    """Commit de git del código medido, para comparar resultados entre commits"""
+    try:
+        proceso = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=5,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return proceso.stdout.strip() or None
+
+
+@contextmanager
+def base_de_datos_temporal(alias='default', archivo=None):
+    """
+    Base de datos de pruebas migrada desde cero, que se destruye al salir.
+
+    Los benchmarks que generan catálogos sintéticos la usan para no tocar
+    la base de datos real. Con SQLite es en memoria salvo que se indique
+    ``archivo``, necesario para medir el diario o varias conexiones.
+    """
+    conexion = connections[alias]
+    nombre = conexion.settings_dict['NAME']
+    prueba = conexion.settings_dict.setdefault('TEST', {})
+    nombre_prueba = prueba.get('NAME')
+    if archivo is not None:
+        prueba['NAME'] = str(archivo)
+    conexion.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield conexion
+    finally:
+        conexion.creation.destroy_test_db(nombre, verbosity=0)
+        prueba['NAME'] = nombre_prueba
+
+
+def crear_catalogo_sintetico(escenas, categorias=50, logos=5, lote=5000):
+    """
+    Catálogo con nombres de imagen ficticios creado con ``bulk_create``.
+
+    Una de cada siete escenas está inactiva y una de cada cinco tiene video,
+    como en las pruebas de presupuesto de consultas.
+    """
+    from .models import CategoriaEscena, ConfiguracionInterfaz, Escena360, LogoCreador
+
+    creadas = CategoriaEscena.objects.bulk_create(
+        CategoriaEscena(
+            titulo=f"Categoría {i}", orden=i, icono=f'categorias/{i}.jpg', icono_ancho=160, icono_alto=160,
+        )
+        for i in range(categorias)
+    )
+    for inicio in range(0, escenas, lote):
+        nuevas = [
+            Escena360(
+                categoria=creadas[i % categorias],
+                titulo=f"Escena {i}",
+                orden=i,
+                activa=i % 7 != 0,
+                imagen=f'escenas/{i}.jpg',
+                imagen_ancho=4096,
+                imagen_alto=2048,
+                icono=f'iconos/{i}.png',
+                icono_ancho=160,
+                icono_alto=160,
+                video_youtube='https://youtu.be/AExMQmVgkOI' if i % 5 == 0 else '',
+            )
+            for i in range(inicio, min(inicio + lote, escenas))
+        ]
+        for escena in nuevas:
+            escena.actualizar_youtube()
+        Escena360.objects.bulk_create(nuevas)
+    LogoCreador.objects.bulk_create(
+        LogoCreador(nombre=f"Logo {i}", orden=i, logo=f'logos/{i}.png', logo_ancho=480, logo_alto=100)
+        for i in range(logos)
+    )
+    # Sin señales, como el resto del catálogo: post_save compilaría la hoja de
+    # estilos del tema en el MEDIA_ROOT real
+    ConfiguracionInterfaz.objects.bulk_create([ConfiguracionInterfaz(pk=1)], ignore_conflicts=True)
+    return creadas
+
+
+def imagen_de_relleno(ancho, alto, indice, texto=''):
+    """
+    JPEG de relleno distinto para cada ``indice``: un color, una cuadrícula y un texto.
+
+    Con nombres por contenido dos imágenes iguales serían un solo archivo,
+    así que el color cambia con el índice.
+    """
+    color = tuple(int(canal * 255) for canal in colorsys.hsv_to_rgb((indice * 0.618034) % 1, 0.55, 0.75))
+    imagen = Image.new('RGB', (ancho, alto), color)
+    dibujo = ImageDraw.Draw(imagen)
+    paso = max(ancho // 16, 4)
+    for x in range(0, ancho, paso):
+        dibujo.line([(x, 0), (x, alto)], fill=(255, 255, 255))
+    for y in range(0, alto, paso):
+        dibujo.line([(0, y), (ancho, y)], fill=(255, 255, 255))
+    if texto:
+        dibujo.text((paso // 4, paso // 4), texto, fill=(255, 255, 255))
+    buffer = BytesIO()
+    imagen.save(buffer, 'JPEG', quality=80)
+    return buffer.getvalue()
+
+
+def sembrar_catalogo(categorias, escenas_por_categoria, ancho=2048, lado_icono=160, prefijo="Semilla"):
+    """
+    Crea ``categorias`` × ``escenas_por_categoria`` con imágenes de relleno en el storage.
+
+    A diferencia de ``crear_catalogo_sintetico`` los archivos existen, así que
+    el visor y las URLs de media responden como con un catálogo subido desde
+    el admin. No genera teselas ni rendiciones. Devuelve las categorías creadas.
+    """
+    from .metadatos import leer_metadatos
+    from .models import CategoriaEscena, Escena360
+
+    def guardar(modelo, campo, nombre, contenido):
+        field = modelo._meta.get_field(campo)
+        nombre = field.storage.save(field.generate_filename(None, nombre), ContentFile(contenido))
+        datos = leer_metadatos(nombre, field.storage)
+        return {campo: nombre, f'{campo}_ancho': datos['ancho'], f'{campo}_alto': datos['alto']}, datos
+
+    inicio = CategoriaEscena.objects.aggregate(maximo=Max('orden'))['maximo'] or 0
+    nuevas = []
+    for numero in range(inicio + 1, inicio + categorias + 1):
+        campos, datos = guardar(
+            CategoriaEscena, 'icono', f'{numero}.jpg',
+            imagen_de_relleno(lado_icono, lado_icono, numero, f"C{numero}"),
+        )
+        nuevas.append(CategoriaEscena(titulo=f"{prefijo} {numero}", orden=numero, metadatos={'icono': datos}, **campos))
+    creadas = CategoriaEscena.objects.bulk_create(nuevas)
+
+    for categoria in creadas:
+        escenas = []
+        for orden in range(1, escenas_por_categoria + 1):
+            indice = categoria.orden * escenas_por_categoria + orden
+            texto = f"C{categoria.orden} E{orden}"
+            imagen, datos_imagen = guardar(
+                Escena360, 'imagen', f'{indice}.jpg', imagen_de_relleno(ancho, ancho // 2, indice, texto),
+            )
+            icono, datos_icono = guardar(
+                Escena360, 'icono', f'{indice}.jpg', imagen_de_relleno(lado_icono, lado_icono, indice, texto),
+            )
+            escenas.append(Escena360(
+                categoria=categoria,
+                titulo=f"Escena {orden}",
+                orden=orden,
+                metadatos={'imagen': datos_imagen, 'icono': datos_icono},
+                **imagen,
+                **icono,
+            ))
+        Escena360.objects.bulk_create(escenas)
+    return creadas
+
+
+def entorno_wsgi(ruta, metodo='GET', cabeceras=None):
+    """environ WSGI mínimo para una petición local"""
+    ruta, _, consulta = ruta.partition('?')
+    environ = {'REQUEST_METHOD': metodo, 'PATH_INFO': ruta, 'QUERY_STRING': consulta}
+    for nombre, valor in (cabeceras or {}).items():
+        environ['HTTP_' + nombre.upper().replace('-', '_')] = valor
+    setup_testing_defaults(environ)
+    return environ
+
+
+def peticion_wsgi(aplicacion, ruta, retardo=0, cabeceras=None):
+    """
+    Hace una petición a una aplicación WSGI y devuelve (estado, cuerpo).
+
+    ``retardo`` simula un cliente lento: el hilo que atiende la petición
+    sigue ocupado ese tiempo mientras se entrega la respuesta.
+    """
+    estado = []
+
+    def start_response(linea_estado, cabeceras_respuesta, exc_info=None):
+        estado.append(int(linea_estado.split()[0]))
+
+    respuesta = aplicacion(entorno_wsgi(ruta, cabeceras=cabeceras), start_response)
+    try:
+        cuerpo = b''.join(respuesta)
+    finally:
+        if hasattr(respuesta, 'close'):
+            respuesta.close()
+    if retardo:
+        time.sleep(retardo)
+    return estado[0], cuerpo
+
+
+async def peticion_asgi(aplicacion, ruta, retardo=0, cabeceras=None):
+    """Equivalente de ``peticion_wsgi`` para una aplicación ASGI"""
+    ruta, _, consulta = ruta.partition('?')
+    alcance = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': ruta,
+        'raw_path': ruta.encode(),
+        'query_string': consulta.encode(),
+        'root_path': '',
+        'headers': [(b'host', b'127.0.0.1')] + [
+            (nombre.lower().encode(), valor.encode()) for nombre, valor in (cabeceras or {}).items()
+        ],
+        'client': ('127.0.0.1', 0),
+        'server': ('127.0.0.1', 80),
+    }
+    leido = False
+    estado = None
+    cuerpo = []
+
+    async def receive():
+        nonlocal leido
+        if not leido:
+            leido = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # El cliente no se desconecta: Django cancela esta espera al responder
+        await asyncio.get_running_loop().create_future()
+
+    async def send(mensaje):
+        nonlocal estado
+        if mensaje['type'] == 'http.response.start':
+            estado = mensaje['status']
+        elif mensaje['type'] == 'http.response.body':
+            cuerpo.append(mensaje.get('body', b''))
+            if retardo and not mensaje.get('more_body'):
+                await asyncio.sleep(retardo)
+
+    await aplicacion(alcance, receive, send)
+    return estado, b''.join(cuerpo)
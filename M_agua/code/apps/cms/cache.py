@@ -0,0 +1,191 @@
+"""
+Caché de páginas públicas ligada a la versión del catálogo.
+
+Cada vez que un editor guarda o borra algo del catálogo se publica una
+versión nueva (``invalidar_catalogo``); las páginas cacheadas llevan esa
+versión en su clave, así que quedan obsoletas sin tener que borrarlas. Solo
+un worker vuelve a renderizar tras una edición: los demás sirven la última
+copia mientras tanto.
+"""
+
+import asyncio
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from .metricas import registrar_cache
+from .models import CategoriaEscena, ConfiguracionInterfaz, Escena360, LogoCreador
+
+CLAVE_VERSION = 'cms:catalogo:version'
+
+CONFIGURACION_POR_DEFECTO = {
+    # Segundos que se conserva una página renderizada (None = sin caducidad)
+    'TIMEOUT': 60 * 60 * 24,
+    # Segundos máximos que un worker retiene el candado de renderizado
+    'TIEMPO_CANDADO': 30,
+    # Segundos que un worker espera a otro cuando no hay copia anterior
+    'ESPERA_MAXIMA': 5,
+}
+
+
+def obtener_configuracion():
+    """Devuelve la configuración de caché combinada con CMS_CACHE_PAGINAS"""
+    return {**CONFIGURACION_POR_DEFECTO, **getattr(settings, 'CMS_CACHE_PAGINAS', {})}
+
+
+def huella_catalogo():
+    """
+    Huella del catálogo leída de la base de datos: (última modificación, filas).
+
+    Solo se calcula cuando la caché no tiene versión (arranque o caché
+    vaciada); el número de filas detecta borrados que la fecha no refleja.
+    """
+    modificado = 0.0
+    filas = 0
+    for modelo in (CategoriaEscena, Escena360, LogoCreador, ConfiguracionInterfaz):
+        datos = modelo.objects.aggregate(modificado=Max('fecha_modificacion'), filas=Count('pk'))
+        if datos['modificado'] is not None:
+            modificado = max(modificado, datos['modificado'].timestamp())
+        filas += datos['filas']
+    return modificado, filas
+
+
+def estado_catalogo():
+    """
+    Estado vigente del catálogo: ``{'version': str, 'modificado': float}``.
+
+    Si la caché no lo tiene se deriva de ``huella_catalogo``, de modo que
+    todos los workers llegan a la misma versión sin coordinarse.
+    """
+    estado = cache.get(CLAVE_VERSION)
+    registrar_cache(CLAVE_VERSION, 'fallo' if estado is None else 'acierto')
+    if estado is None:
+        modificado, filas = huella_catalogo()
+        cache.add(CLAVE_VERSION, {'version': f'{modificado:.6f}-{filas}', 'modificado': modificado}, None)
+        estado = cache.get(CLAVE_VERSION)
+    return estado
+
+
+async def aestado_catalogo():
+    """Versión asíncrona de ``estado_catalogo``"""
+    estado = await cache.aget(CLAVE_VERSION)
+    if estado is None:
+        # estado_catalogo cuenta el fallo
+        return await sync_to_async(estado_catalogo)()
+    registrar_cache(CLAVE_VERSION, 'acierto')
+    return estado
+
+
+def version_catalogo():
+    """Versión vigente del catálogo"""
+    return estado_catalogo()['version']
+
+
+def invalidar_catalogo():
+    """Publica una versión nueva del catálogo, dejando obsoletas las páginas cacheadas"""
+    modificado = time.time()
+    anterior = cache.get(CLAVE_VERSION)
+    if anterior is not None and modificado <= anterior['modificado']:
+        # Relojes de baja resolución: dos ediciones seguidas deben dar versiones distintas
+        modificado = anterior['modificado'] + 0.001
+    cache.set(CLAVE_VERSION, {'version': f'{modificado:.6f}', 'modificado': modificado}, None)
+
+
+async def aversion_catalogo():
+    """Versión asíncrona de ``version_catalogo``"""
+    return (await aestado_catalogo())['version']
+
+
+def pagina_cacheada(clave, generar):
+    """
+    Devuelve ``(contenido, estado)`` de ``clave`` para la versión vigente.
+
+    Si no existe, solo el worker que consigue el candado llama a ``generar``;
+    el resto sirve la última versión renderizada o, si todavía no hay
+    ninguna, espera a que el primero termine. ``estado`` es el del catálogo
+    con que se renderizó el contenido servido, que en la copia anterior no
+    es el vigente: las vistas lo usan para el ETag y el Last-Modified.
+    """
+    config = obtener_configuracion()
+    estado = estado_catalogo()
+    clave_version = f"{clave}:{estado['version']}"
+    clave_anterior = f'{clave}:anterior'
+    clave_candado = f'{clave}:candado'
+
+    contenido = cache.get(clave_version)
+    if contenido is not None:
+        registrar_cache(clave, 'acierto')
+        return contenido, estado
+
+    if cache.add(clave_candado, estado['version'], config['TIEMPO_CANDADO']):
+        registrar_cache(clave, 'fallo')
+        try:
+            contenido = generar()
+            cache.set_many({clave_version: contenido, clave_anterior: (contenido, estado)}, config['TIMEOUT'])
+        finally:
+            cache.delete(clave_candado)
+        return contenido, estado
+
+    anterior = cache.get(clave_anterior)
+    if anterior is not None:
+        registrar_cache(clave, 'anterior')
+        return anterior
+
+    limite = time.monotonic() + config['ESPERA_MAXIMA']
+    while time.monotonic() < limite:
+        time.sleep(0.05)
+        contenido = cache.get(clave_version)
+        if contenido is not None:
+            registrar_cache(clave, 'espera')
+            return contenido, estado
+
+    # El worker con el candado tarda demasiado: se renderiza sin cachear
+    registrar_cache(clave, 'sin_cache')
+    return generar(), estado
+
+
+async def apagina_cacheada(clave, generar):
+    """
+    Versión asíncrona de ``pagina_cacheada``; ``generar`` es una corrutina.
+
+    Mientras otro worker renderiza, la espera cede el bucle de eventos en
+    lugar de bloquear un hilo.
+    """
+    config = obtener_configuracion()
+    estado = await aestado_catalogo()
+    clave_version = f"{clave}:{estado['version']}"
+    clave_anterior = f'{clave}:anterior'
+    clave_candado = f'{clave}:candado'
+
+    contenido = await cache.aget(clave_version)
+    if contenido is not None:
+        registrar_cache(clave, 'acierto')
+        return contenido, estado
+
+    if await cache.aadd(clave_candado, estado['version'], config['TIEMPO_CANDADO']):
+        registrar_cache(clave, 'fallo')
+        try:
+            contenido = await generar()
+            await cache.aset_many({clave_version: contenido, clave_anterior: (contenido, estado)}, config['TIMEOUT'])
+        finally:
+            await cache.adelete(clave_candado)
+        return contenido, estado
+
+    anterior = await cache.aget(clave_anterior)
+    if anterior is not None:
+        registrar_cache(clave, 'anterior')
+        return anterior
+
+    limite = time.monotonic() + config['ESPERA_MAXIMA']
+    while time.monotonic() < limite:
+        await asyncio.sleep(0.05)
+        contenido = await cache.aget(clave_version)
+        if contenido is not None:
+            registrar_cache(clave, 'espera')
+            return contenido, estado
+
+    registrar_cache(clave, 'sin_cache')
+    return await generar(), estado
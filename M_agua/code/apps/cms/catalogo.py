@@ -0,0 +1,71 @@
+"""
+Consultas y serialización del catálogo público.
+
+El visor y la API JSON comparten estas funciones para que la página
+incrustada y las respuestas de la API describan las escenas igual.
+"""
+
+from django.db.models import Prefetch
+
+from .models import CategoriaEscena, Escena360
+
+
+def categorias_activas():
+    """Categorías visibles en el visor, en su orden de visualización"""
+    return CategoriaEscena.objects.filter(activa=True)
+
+
+def escenas_activas():
+    """
+    Escenas visibles, ordenadas dentro de su categoría sin unir la tabla de categorías.
+
+    El orden sigue al índice parcial ``cms_escena_activa_orden``, así que ni
+    la consulta de una categoría ni la del catálogo completo ordenan filas.
+    """
+    return Escena360.objects.filter(activa=True).order_by('categoria_id', 'orden', 'titulo')
+
+
+def escenas_con_video():
+    """Escenas visibles que tienen un video de YouTube reconocido"""
+    return escenas_activas().exclude(youtube_id='')
+
+
+def categorias_con_escenas():
+    """Categorías activas con sus escenas activas precargadas en ``escenas_activas``"""
+    return categorias_activas().prefetch_related(
+        Prefetch('escenas', queryset=escenas_activas(), to_attr='escenas_activas')
+    )
+
+
+def serializar_escena(escena):
+    """Datos de una escena tal como los consume el JavaScript del visor"""
+    return {
+        'id': escena.id,
+        'titulo': escena.titulo,
+        'descripcion': escena.descripcion,
+        'imagen': escena.imagen.url,
+        'imagenAncho': escena.imagen_ancho,
+        'imagenAlto': escena.imagen_alto,
+        'imagenBytes': escena.get_metadatos('imagen').get('bytes'),
+        'icono': escena.icono.url,
+        'iconoAncho': escena.icono_ancho,
+        'iconoAlto': escena.icono_alto,
+        'iconoSet': escena.get_image_set('icono'),
+        'video': escena.youtube_embed_url,
+        'videoUrl': escena.youtube_watch_url,
+        'multires': escena.get_multires_config(),
+    }
+
+
+def serializar_categoria(categoria):
+    """Datos de una categoría para la API"""
+    return {
+        'id': categoria.id,
+        'titulo': categoria.titulo,
+        'icono': categoria.icono.url,
+        'iconoAncho': categoria.icono_ancho,
+        'iconoAlto': categoria.icono_alto,
+        'iconoSet': categoria.get_image_set('icono'),
+        'colorFondo': categoria.color_fondo,
+        'fondo': categoria.get_url_rendicion('imagen_fondo') if categoria.imagen_fondo else '',
+    }
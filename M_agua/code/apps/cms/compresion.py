@@ -0,0 +1,38 @@
+"""
+Precompresión de archivos de texto servidos tal cual.
+
+Los archivos se comprimen una sola vez al publicarlos (``collectstatic`` o
+``export_visor``) y el servidor elige la variante según ``Accept-Encoding``,
+así que nunca se comprime nada por petición.
+"""
+
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Extensiones que merece la pena precomprimir; las imágenes ya van comprimidas
+EXTENSIONES_COMPRIMIBLES = {'.html', '.css', '.js', '.json', '.svg', '.txt', '.xml', '.map'}
+
+# Sufijo de cada variante, en orden de preferencia
+CODIFICACIONES = {'br': '.br', 'gzip': '.gz'}
+
+
+def es_comprimible(nombre):
+    """Indica si un archivo se publica con variantes comprimidas"""
+    return any(nombre.lower().endswith(extension) for extension in EXTENSIONES_COMPRIMIBLES)
+
+
+def precomprimir(ruta):
+    """Escribe junto a ``ruta`` sus variantes .gz y .br si reducen el tamaño"""
+    if not es_comprimible(ruta.name):
+        return
+    datos = ruta.read_bytes()
+    variantes = {'.gz': gzip.compress(datos, 9, mtime=0)}
+    if brotli is not None:
+        variantes['.br'] = brotli.compress(datos)
+    for sufijo, comprimido in variantes.items():
+        if len(comprimido) < len(datos):
+            ruta.with_name(ruta.name + sufijo).write_bytes(comprimido)
@@ -0,0 +1,181 @@
+"""
+Envío de archivos grandes de disco: peticiones Range, condicionales y delegación.
+
+Lo comparten el servidor WSGI de estáticos y la vista de media. Una
+descarga interrumpida se reanuda con ``Range`` en lugar de empezar de cero,
+y cuando el tramo llega hasta el final del archivo se entrega el archivo
+abierto al servidor (``wsgi.file_wrapper``), que puede enviarlo con
+``sendfile`` sin copiarlo a Python.
+
+Con ``CMS_ENVIO_ARCHIVOS['DELEGAR']`` el worker solo resuelve la ruta del
+media y responde con ``X-Accel-Redirect`` (nginx) o ``X-Sendfile``
+(Apache, lighttpd); el servidor frontal hace el envío, con sus propios
+Range y condicionales, y el worker queda libre enseguida.
+"""
+
+import os
+from email.utils import formatdate
+from urllib.parse import quote
+
+from django.conf import settings
+from django.utils.http import parse_http_date_safe
+
+CONFIGURACION_POR_DEFECTO = {
+    # None, 'x-accel-redirect' o 'x-sendfile'
+    'DELEGAR': None,
+    # Location ``internal`` de nginx que apunta a MEDIA_ROOT (solo X-Accel-Redirect)
+    'UBICACION_INTERNA': '/media-interna/',
+}
+
+TAMANO_BLOQUE = 64 * 1024
+
+
+def obtener_configuracion():
+    """Devuelve la configuración de envío combinada con CMS_ENVIO_ARCHIVOS"""
+    return {**CONFIGURACION_POR_DEFECTO, **getattr(settings, 'CMS_ENVIO_ARCHIVOS', {})}
+
+
+def cabecera_delegacion(relativa, ruta):
+    """
+    Cabecera ``(nombre, valor)`` que cede el envío al servidor frontal, o None.
+
+    ``relativa`` es la ruta dentro de MEDIA_ROOT y ``ruta`` la absoluta en disco.
+    """
+    config = obtener_configuracion()
+    delegar = (config['DELEGAR'] or '').lower()
+    if delegar == 'x-accel-redirect':
+        return 'X-Accel-Redirect', quote(config['UBICACION_INTERNA'].rstrip('/') + '/' + relativa.lstrip('/'))
+    if delegar == 'x-sendfile':
+        return 'X-Sendfile', ruta
+    return None
+
+
+class RangoNoSatisfacible(Exception):
+    """El rango pedido empieza después del final del archivo"""
+
+
+def rango_pedido(cabecera, tamano):
+    """
+    ``(inicio, fin)``, ambos incluidos, de una cabecera Range de un solo rango.
+
+    Devuelve None si no hay que atenderla: los rangos múltiples o mal
+    formados se ignoran y se sirve el archivo completo, como permite la RFC 9110.
+    """
+    unidad, _, rangos = (cabecera or '').partition('=')
+    if unidad.strip().lower() != 'bytes' or ',' in rangos:
+        return None
+    inicio, guion, fin = rangos.strip().partition('-')
+    if not guion:
+        return None
+    try:
+        if not inicio:
+            # bytes=-N: los últimos N bytes
+            sufijo = int(fin)
+            if sufijo < 0:
+                return None
+            if sufijo == 0 or tamano == 0:
+                raise RangoNoSatisfacible
+            return max(tamano - sufijo, 0), tamano - 1
+        inicio = int(inicio)
+        fin = int(fin) if fin else None
+    except ValueError:
+        return None
+    if inicio < 0 or (fin is not None and fin < inicio):
+        return None
+    if inicio >= tamano:
+        raise RangoNoSatisfacible
+    return inicio, tamano - 1 if fin is None else min(fin, tamano - 1)
+
+
+def _etags(cabecera):
+    return [valor.strip() for valor in cabecera.split(',')]
+
+
+def no_modificado(meta, etag, modificado):
+    """Indica si If-None-Match o, en su ausencia, If-Modified-Since permiten un 304"""
+    if_none_match = meta.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        return '*' in _etags(if_none_match) or etag in _etags(if_none_match)
+    desde = parse_http_date_safe(meta.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return desde is not None and int(modificado) <= desde
+
+
+def rango_vigente(meta, etag, modificado):
+    """
+    Indica si el Range se aplica según If-Range.
+
+    Si la copia parcial del cliente es de otra versión del archivo se envía
+    completo en lugar de mezclar trozos de dos versiones.
+    """
+    if_range = meta.get('HTTP_IF_RANGE', '').strip()
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        # Las ETag de aquí son fuertes: una débil (W/) nunca coincide
+        return if_range == etag
+    return parse_http_date_safe(if_range) == int(modificado)
+
+
+def preparar_envio(meta, ruta, tipo, comunes=(), codificacion=None):
+    """
+    ``(estado, cabeceras, tramo)`` con que responder a un GET o HEAD de ``ruta``.
+
+    ``meta`` son las cabeceras de la petición al estilo WSGI y ``comunes``
+    las que llevan también los 304 (Cache-Control, Vary). ``tramo`` es
+    ``(inicio, longitud)``, o None si la respuesta no tiene cuerpo.
+    """
+    datos = os.stat(ruta)
+    tamano = datos.st_size
+    etag = f'"{datos.st_mtime_ns:x}-{tamano:x}{"-" + codificacion if codificacion else ""}"'
+    cabeceras = [
+        *comunes,
+        ('ETag', etag),
+        ('Last-Modified', formatdate(datos.st_mtime, usegmt=True)),
+    ]
+    if no_modificado(meta, etag, datos.st_mtime):
+        return 304, cabeceras, None
+
+    cabeceras += [('Content-Type', tipo), ('Accept-Ranges', 'bytes')]
+    if codificacion:
+        cabeceras.append(('Content-Encoding', codificacion))
+
+    rango = None
+    if meta.get('HTTP_RANGE') and rango_vigente(meta, etag, datos.st_mtime):
+        try:
+            rango = rango_pedido(meta['HTTP_RANGE'], tamano)
+        except RangoNoSatisfacible:
+            cabeceras += [('Content-Range', f'bytes */{tamano}'), ('Content-Length', '0')]
+            return 416, cabeceras, None
+
+    if rango is None:
+        cabeceras.append(('Content-Length', str(tamano)))
+        return 200, cabeceras, (0, tamano)
+    inicio, fin = rango
+    cabeceras += [('Content-Range', f'bytes {inicio}-{fin}/{tamano}'), ('Content-Length', str(fin - inicio + 1))]
+    return 206, cabeceras, (inicio, fin - inicio + 1)
+
+
+def leer_tramo(archivo, longitud):
+    """Itera ``longitud`` bytes de un archivo ya posicionado y lo cierra al terminar"""
+    try:
+        while longitud > 0:
+            bloque = archivo.read(min(TAMANO_BLOQUE, longitud))
+            if not bloque:
+                break
+            longitud -= len(bloque)
+            yield bloque
+    finally:
+        archivo.close()
+
+
+def abrir_tramo(ruta, inicio, longitud):
+    """
+    ``(archivo, hasta_el_final)``: el archivo abierto y posicionado en ``inicio``.
+
+    Si el tramo llega hasta el final el archivo se puede entregar tal cual al
+    servidor (``sendfile`` envía desde la posición actual); si no, hay que
+    limitarlo con ``leer_tramo``.
+    """
+    archivo = open(ruta, 'rb')
+    archivo.seek(inicio)
+    return archivo, inicio + longitud >= os.fstat(archivo.fileno()).st_size
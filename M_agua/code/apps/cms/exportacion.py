@@ -0,0 +1,173 @@
+"""
+Exportación del visor a un directorio estático autocontenido.
+
+Renderiza ``visor_360`` con todo el catálogo incrustado y copia junto a la
+página los estáticos y media a los que hace referencia (CSS, imágenes,
+rendiciones y teselas multires). Los archivos que no tienen ya un nombre por
+contenido se renombran con el hash de sus bytes y los de texto se acompañan
+de variantes ``.gz`` (y ``.br`` si está instalado ``brotli``), de modo que
+cualquier servidor estático pueda servir el directorio sin Python.
+"""
+
+import hashlib
+import os
+import posixpath
+import re
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import unquote
+
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.files.storage import default_storage
+
+from .compresion import precomprimir
+from .storage import es_nombre_por_contenido
+
+# Caracteres del hash que se añaden a los nombres que no son por contenido
+LONGITUD_HUELLA = 12
+
+
+def renderizar_visor():
+    """HTML del visor con las escenas de todas las categorías incrustadas"""
+    from .views import _contexto_visor, _renderizar_visor
+
+    return _renderizar_visor(_contexto_visor(carga_diferida=False))
+
+
+def nombre_con_huella(ruta, datos):
+    """Inserta el hash del contenido en el nombre salvo que ya sea por contenido"""
+    if es_nombre_por_contenido(ruta):
+        return ruta
+    base, extension = posixpath.splitext(ruta)
+    return f'{base}.{hashlib.sha256(datos).hexdigest()[:LONGITUD_HUELLA]}{extension}'
+
+
+class ExportadorVisor:
+    """Copia el visor y sus dependencias a ``destino``"""
+
+    def __init__(self, destino, hilos=None):
+        self.destino = Path(destino)
+        self.hilos = hilos or os.cpu_count()
+        self.prefijo_static = staticfiles_storage.base_url
+        self.prefijo_media = default_storage.base_url
+        self.referencia = re.compile(
+            '(?:%s|%s)[^"\'\\s()<>\\\\&,`]+' % (re.escape(self.prefijo_static), re.escape(self.prefijo_media))
+        )
+        # URL -> ruta relativa al destino
+        self.exportados = {}
+        self.faltantes = set()
+
+    def origen(self, url):
+        """Ruta local del archivo o directorio al que apunta una URL, o None"""
+        if url.startswith(self.prefijo_media):
+            nombre = unquote(url[len(self.prefijo_media):])
+            ruta = Path(default_storage.path(nombre))
+            return ruta if ruta.exists() else None
+        nombre = unquote(url[len(self.prefijo_static):])
+        encontrado = finders.find(nombre)
+        if encontrado:
+            return Path(encontrado)
+        # Nombres con huella del manifiesto: solo existen en STATIC_ROOT
+        if staticfiles_storage.exists(nombre):
+            return Path(staticfiles_storage.path(nombre))
+        return None
+
+    def referencias(self, texto):
+        return set(self.referencia.findall(texto))
+
+    def reescribir(self, texto, documento):
+        """Sustituye las URLs del texto por rutas relativas a ``documento``"""
+        directorio = posixpath.dirname(documento)
+
+        def sustituir(coincidencia):
+            url = coincidencia.group(0)
+            if url not in self.exportados:
+                return url
+            return posixpath.relpath(self.exportados[url], directorio or '.')
+
+        return self.referencia.sub(sustituir, texto)
+
+    def escribir(self, relativa, datos):
+        ruta = self.destino / relativa
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        ruta.write_bytes(datos)
+        precomprimir(ruta)
+        return ruta
+
+    def copiar_archivo(self, url, origen):
+        datos = origen.read_bytes()
+        relativa = nombre_con_huella(url.lstrip('/'), datos)
+        self.escribir(relativa, datos)
+        return url, relativa
+
+    def copiar_tal_cual(self, fuente, relativa):
+        copia = self.destino / relativa
+        copia.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(fuente, copia)
+
+    def exportar_css(self, url, origen, pendientes):
+        """Copia una hoja de estilos tras exportar y reescribir lo que referencia"""
+        if url in self.exportados:
+            return
+        texto = origen.read_text(encoding='utf-8')
+        for referencia in self.referencias(texto):
+            if referencia in pendientes:
+                self.exportar_css(referencia, pendientes.pop(referencia), pendientes)
+        texto = self.reescribir(texto, url.lstrip('/')).encode('utf-8')
+        relativa = nombre_con_huella(url.lstrip('/'), texto)
+        self.exportados[url] = relativa
+        self.escribir(relativa, texto)
+
+    def descubrir(self, html):
+        """Recorre las referencias del HTML y de las hojas de estilos que enlaza"""
+        encontrados = {}
+        por_visitar = list(self.referencias(html))
+        while por_visitar:
+            url = por_visitar.pop()
+            if url in encontrados or url in self.faltantes:
+                continue
+            origen = self.origen(url)
+            if origen is None:
+                self.faltantes.add(url)
+                continue
+            encontrados[url] = origen
+            if origen.suffix.lower() == '.css':
+                por_visitar.extend(self.referencias(origen.read_text(encoding='utf-8')))
+        return encontrados
+
+    def exportar(self):
+        """Genera el directorio y devuelve el número de archivos escritos"""
+        html = renderizar_visor()
+        encontrados = self.descubrir(html)
+        hojas = {url: origen for url, origen in encontrados.items() if origen.suffix.lower() == '.css'}
+
+        with ThreadPoolExecutor(max_workers=self.hilos) as ejecutor:
+            tareas = []
+            copias = []
+            for url, origen in encontrados.items():
+                if url in hojas:
+                    continue
+                if not origen.is_dir():
+                    tareas.append(ejecutor.submit(self.copiar_archivo, url, origen))
+                    continue
+                # Las teselas se piden por patrón de nombre: el directorio se copia tal cual
+                self.exportados[url] = url.lstrip('/')
+                for raiz, _, archivos in os.walk(origen):
+                    for archivo in archivos:
+                        fuente = Path(raiz) / archivo
+                        relativa = posixpath.join(url.lstrip('/'), fuente.relative_to(origen).as_posix())
+                        copias.append(ejecutor.submit(self.copiar_tal_cual, fuente, relativa))
+            self.exportados.update(tarea.result() for tarea in tareas)
+            for copia in copias:
+                copia.result()
+
+        # Las hojas se procesan después: su hash depende de las URLs ya reescritas
+        pendientes = dict(hojas)
+        while pendientes:
+            url, origen = pendientes.popitem()
+            self.exportar_css(url, origen, pendientes)
+
+        self.escribir('index.html', self.reescribir(html, 'index.html').encode('utf-8'))
+        return sum(len(archivos) for _, _, archivos in os.walk(self.destino))
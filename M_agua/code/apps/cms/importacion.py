@@ -0,0 +1,450 @@
+"""
+Importación masiva de escenas 360 desde un directorio o un manifiesto.
+
+Cada fila describe una escena (panorámica, icono, título, descripción,
+categoría...). Las imágenes se validan y procesan en un pool de procesos
+(guardado por contenido, teselas multires y rendiciones del icono) y las
+filas se insertan al final con ``bulk_create`` en una sola transacción.
+
+Cada escena procesada se anota en un diario JSONL junto al origen; si la
+importación se interrumpe, la siguiente ejecución reutiliza lo ya procesado
+y solo inserta las escenas que aún no están en la base de datos.
+"""
+
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from io import BytesIO
+from pathlib import Path
+
+import django
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile, File
+from django.db import connections, transaction
+from django.db.models import Max
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .cache import invalidar_catalogo
+from .metadatos import comprobar_panoramica, leer_metadatos
+from .miniaturas import generar_rendiciones
+from .models import CategoriaEscena, Escena360
+from .multires import generar_multires
+from .storage import hash_contenido, nombre_por_contenido
+from .youtube import validar_url_youtube
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+EXTENSIONES_IMAGEN = {'.jpg', '.jpeg', '.png', '.webp'}
+
+FORMATOS_ADMITIDOS = {'JPEG', 'PNG', 'WEBP'}
+
+# Sufijo del icono de una panorámica en modo directorio: pozo.jpg -> pozo.icono.png
+SUFIJO_ICONO = '.icono'
+
+# Lado del icono que se genera a partir de la panorámica si la fila no trae uno
+LADO_ICONO = 320
+
+VERDADEROS = {'1', 'true', 'si', 'sí', 'yes', 'x'}
+
+
+class ErrorImportacion(Exception):
+    """Fila que no se puede importar; el mensaje se muestra al usuario"""
+
+
+def _es_verdadero(valor):
+    """Columna de sí/no de un manifiesto; vacía cuenta como sí"""
+    if valor is None or valor == '':
+        return True
+    return str(valor).strip().lower() in VERDADEROS
+
+
+def _titulo_desde_nombre(nombre):
+    return Path(nombre).stem.replace('_', ' ').replace('-', ' ').strip().capitalize()
+
+
+def filas_de_directorio(directorio):
+    """
+    Filas de un directorio con una subcarpeta por categoría.
+
+    ``<categoría>/<nombre>.jpg`` es la panorámica; ``<nombre>.icono.png`` y
+    ``<nombre>.txt``, si existen, son su icono y su descripción.
+    """
+    filas = []
+    for carpeta in sorted(ruta for ruta in directorio.iterdir() if ruta.is_dir()):
+        for imagen in sorted(carpeta.iterdir()):
+            if imagen.suffix.lower() not in EXTENSIONES_IMAGEN or imagen.stem.endswith(SUFIJO_ICONO):
+                continue
+            iconos = [
+                imagen.with_name(imagen.stem + SUFIJO_ICONO + extension)
+                for extension in sorted(EXTENSIONES_IMAGEN)
+            ]
+            descripcion = imagen.with_suffix('.txt')
+            filas.append({
+                'categoria': carpeta.name,
+                'titulo': _titulo_desde_nombre(imagen.name),
+                'imagen': str(imagen),
+                'icono': next((str(icono) for icono in iconos if icono.exists()), ''),
+                'descripcion': descripcion.read_text(encoding='utf-8').strip() if descripcion.exists() else '',
+            })
+    return filas
+
+
+def filas_de_manifiesto(ruta):
+    """Filas de un manifiesto CSV o YAML; las rutas son relativas al manifiesto"""
+    if ruta.suffix.lower() in ('.yaml', '.yml'):
+        if yaml is None:
+            raise ErrorImportacion("Instala PyYAML para leer manifiestos YAML")
+        with open(ruta, encoding='utf-8') as archivo:
+            datos = yaml.safe_load(archivo) or []
+        filas = datos.get('escenas', []) if isinstance(datos, dict) else datos
+    elif ruta.suffix.lower() == '.csv':
+        with open(ruta, encoding='utf-8-sig', newline='') as archivo:
+            filas = list(csv.DictReader(archivo))
+    else:
+        raise ErrorImportacion(f"Formato de manifiesto no soportado: {ruta.name}")
+
+    base = ruta.parent
+    normalizadas = []
+    for fila in filas:
+        fila = {clave.strip().lower(): '' if valor is None else valor for clave, valor in fila.items() if clave}
+        for campo in ('imagen', 'icono'):
+            if fila.get(campo):
+                fila[campo] = str(base / str(fila[campo]).strip())
+        normalizadas.append(fila)
+    return normalizadas
+
+
+def leer_origen(ruta):
+    """Filas a importar desde un directorio o un manifiesto"""
+    ruta = Path(ruta)
+    if ruta.is_dir():
+        return filas_de_directorio(ruta)
+    if ruta.is_file():
+        return filas_de_manifiesto(ruta)
+    raise ErrorImportacion(f"No existe {ruta}")
+
+
+def clave_fila(fila):
+    """Identifica una fila y la versión de su panorámica e icono para el diario"""
+    partes = [str(fila.get('categoria', '')).strip(), str(fila.get('titulo', '')).strip()]
+    for campo in ('imagen', 'icono'):
+        if fila.get(campo):
+            datos = os.stat(fila[campo])
+            partes.append(f"{fila[campo]}:{datos.st_size}:{datos.st_mtime_ns}")
+    return '|'.join(partes)
+
+
+def orden_de_fila(fila):
+    """Orden indicado en la fila, o None si la columna está vacía"""
+    valor = str(fila.get('orden') or '').strip()
+    if not valor:
+        return None
+    try:
+        return int(valor)
+    except ValueError:
+        raise ErrorImportacion(f"El orden «{valor}» no es un número entero")
+
+
+def _abrir_imagen(ruta):
+    """Abre y valida una imagen del disco; devuelve la imagen ya decodificada"""
+    try:
+        with Image.open(ruta) as imagen:
+            imagen.verify()
+        imagen = Image.open(ruta)
+        imagen.load()
+    except (OSError, UnidentifiedImageError, SyntaxError) as error:
+        raise ErrorImportacion(f"{Path(ruta).name} no es una imagen válida: {error}")
+    if imagen.format not in FORMATOS_ADMITIDOS:
+        raise ErrorImportacion(f"{Path(ruta).name}: formato {imagen.format} no admitido")
+    return imagen
+
+
+def _icono_desde_panoramica(imagen):
+    """Recorte cuadrado del centro de la panorámica, en PNG"""
+    icono = ImageOps.fit(imagen.convert('RGB'), (LADO_ICONO, LADO_ICONO), Image.Resampling.LANCZOS)
+    buffer = BytesIO()
+    icono.save(buffer, 'PNG', optimize=True)
+    return ContentFile(buffer.getvalue())
+
+
+def nombre_panoramica(ruta):
+    """Nombre por contenido que tendrá la panorámica en el storage"""
+    nombre = Escena360._meta.get_field('imagen').generate_filename(None, Path(ruta).name)
+    with open(ruta, 'rb') as archivo:
+        return nombre_por_contenido(nombre, hash_contenido(File(archivo)))
+
+
+def _guardar(campo, ruta_o_contenido, nombre):
+    """Guarda en el storage del campo con su upload_to; devuelve el nombre final"""
+    field = Escena360._meta.get_field(campo)
+    nombre = field.generate_filename(None, nombre)
+    if isinstance(ruta_o_contenido, ContentFile):
+        return field.storage.save(nombre, ruta_o_contenido)
+    with open(ruta_o_contenido, 'rb') as archivo:
+        return field.storage.save(nombre, File(archivo))
+
+
+def procesar_escena(fila):
+    """
+    Valida las imágenes de una fila y genera sus archivos en el storage.
+
+    Se ejecuta en los procesos del pool sin tocar la base de datos; devuelve
+    los valores de los campos de imagen, teselas y rendiciones de la escena.
+    """
+    if not fila.get('titulo'):
+        raise ErrorImportacion("La fila no tiene título")
+    if not fila.get('categoria'):
+        raise ErrorImportacion("La fila no tiene categoría")
+    if not fila.get('imagen'):
+        raise ErrorImportacion("La fila no tiene imagen 360")
+    orden_de_fila(fila)
+    if fila.get('video_youtube'):
+        try:
+            validar_url_youtube(fila['video_youtube'])
+        except ValidationError as error:
+            raise ErrorImportacion(' '.join(error.messages))
+
+    panoramica = _abrir_imagen(fila['imagen'])
+    try:
+        comprobar_panoramica(*panoramica.size)
+    except ValidationError as error:
+        raise ErrorImportacion(' '.join(error.messages))
+    imagen = _guardar('imagen', fila['imagen'], Path(fila['imagen']).name)
+    if fila.get('icono'):
+        _abrir_imagen(fila['icono'])
+        icono = _guardar('icono', fila['icono'], Path(fila['icono']).name)
+    else:
+        icono = _guardar('icono', _icono_desde_panoramica(panoramica), Path(fila['imagen']).stem + '.png')
+
+    storage = Escena360._meta.get_field('imagen').storage
+    return {
+        'imagen': imagen,
+        'icono': icono,
+        'metadatos': {'imagen': leer_metadatos(imagen, storage), 'icono': leer_metadatos(icono, storage)},
+        'multires': generar_multires(imagen),
+        'rendiciones': {'icono': {'fuente': icono, 'variantes': generar_rendiciones(icono, 'icono')}},
+        'bytes': os.path.getsize(fila['imagen']),
+    }
+
+
+def _procesar_en_pool(fila):
+    try:
+        return procesar_escena(fila), None
+    except ErrorImportacion as error:
+        return None, str(error)
+    except (OSError, ValueError, Image.DecompressionBombError) as error:
+        # Un archivo truncado o desmesurado solo descarta su fila, no la importación
+        return None, f"Error al procesar {Path(fila['imagen']).name}: {error}"
+
+
+class Diario:
+    """Escenas ya procesadas, una línea JSON por escena, para reanudar"""
+
+    def __init__(self, ruta):
+        self.ruta = Path(ruta)
+        self.entradas = {}
+        if self.ruta.exists():
+            with open(self.ruta, encoding='utf-8') as archivo:
+                for linea in archivo:
+                    try:
+                        entrada = json.loads(linea)
+                    except ValueError:
+                        # Última línea a medio escribir si el proceso murió
+                        continue
+                    self.entradas[entrada['clave']] = entrada['resultado']
+
+    def get(self, clave):
+        return self.entradas.get(clave)
+
+    def anotar(self, clave, resultado):
+        self.entradas[clave] = resultado
+        with open(self.ruta, 'a', encoding='utf-8') as archivo:
+            archivo.write(json.dumps({'clave': clave, 'resultado': resultado}, ensure_ascii=False) + '\n')
+
+    def borrar(self):
+        self.ruta.unlink(missing_ok=True)
+
+
+class ImportadorEscenas:
+    """Procesa las filas en paralelo e inserta las escenas en una transacción"""
+
+    def __init__(self, filas, diario, procesos=None, avisar=None):
+        self.filas = filas
+        self.diario = diario
+        self.procesos = procesos or os.cpu_count()
+        self.avisar = avisar or (lambda mensaje: None)
+        self.errores = []
+        self.estadisticas = {
+            'filas': len(filas),
+            'procesadas': 0,
+            'reanudadas': 0,
+            'existentes': 0,
+            'creadas': 0,
+            'errores': 0,
+            'bytes': 0,
+            'segundos_proceso': 0.0,
+            'segundos_insercion': 0.0,
+        }
+
+    def importar(self):
+        inicio = time.perf_counter()
+        resultados = self.procesar()
+        self.estadisticas['segundos_proceso'] = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        self.insertar(resultados)
+        self.estadisticas['segundos_insercion'] = time.perf_counter() - inicio
+        self.diario.borrar()
+        return self.estadisticas
+
+    def procesar(self):
+        """Resultado de cada fila válida, en el orden del origen"""
+        resultados = [None] * len(self.filas)
+        pendientes = {}
+        for indice, fila in enumerate(self.filas):
+            try:
+                clave = clave_fila(fila)
+            except OSError as error:
+                self.error(indice, f"{error.filename} no existe")
+                continue
+            anterior = self.diario.get(clave)
+            if anterior is not None:
+                try:
+                    # Un diario de una versión anterior pudo anotar filas sin validar el orden
+                    orden_de_fila(fila)
+                except ErrorImportacion as error:
+                    self.error(indice, str(error))
+                    continue
+                resultados[indice] = anterior
+                self.estadisticas['reanudadas'] += 1
+            else:
+                pendientes[indice] = clave
+
+        # Escenas de una importación anterior ya terminada: no se vuelven a procesar
+        for indice in self.ya_importadas(pendientes):
+            del pendientes[indice]
+            self.estadisticas['existentes'] += 1
+
+        for indice, (resultado, error) in self.ejecutar(pendientes):
+            if error:
+                self.error(indice, error)
+                continue
+            self.diario.anotar(pendientes[indice], resultado)
+            resultados[indice] = resultado
+            self.estadisticas['procesadas'] += 1
+            self.estadisticas['bytes'] += resultado['bytes']
+            self.avisar(f"{self.filas[indice]['titulo']}: procesada")
+        return resultados
+
+    def ya_importadas(self, pendientes):
+        """Índices de las filas cuya panorámica ya está en su categoría"""
+        nombres = {}
+        for indice in pendientes:
+            fila = self.filas[indice]
+            if fila.get('imagen'):
+                nombres[indice] = (str(fila.get('categoria', '')).strip(), nombre_panoramica(fila['imagen']))
+        existentes = set(
+            Escena360.objects.filter(imagen__in=[nombre for _, nombre in nombres.values()])
+            .values_list('categoria__titulo', 'imagen')
+        )
+        return [indice for indice, clave in nombres.items() if clave in existentes]
+
+    def ejecutar(self, pendientes):
+        """Pares (índice, (resultado, error)) a medida que terminan las filas"""
+        if self.procesos == 1 or len(pendientes) <= 1:
+            for indice in pendientes:
+                yield indice, _procesar_en_pool(self.filas[indice])
+            return
+
+        # Los procesos hijos no deben heredar las conexiones abiertas del padre
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=self.procesos, initializer=django.setup) as pool:
+            tareas = {pool.submit(_procesar_en_pool, self.filas[indice]): indice for indice in pendientes}
+            for tarea in as_completed(tareas):
+                yield tareas[tarea], tarea.result()
+
+    def error(self, indice, mensaje):
+        self.errores.append((indice, mensaje))
+        self.estadisticas['errores'] += 1
+
+    def insertar(self, resultados):
+        validas = [(fila, resultado) for fila, resultado in zip(self.filas, resultados) if resultado is not None]
+        if not validas:
+            return
+
+        with transaction.atomic():
+            categorias = self.categorias(validas)
+            existentes = set(
+                Escena360.objects.filter(imagen__in=[resultado['imagen'] for _, resultado in validas])
+                .values_list('categoria_id', 'imagen')
+            )
+            siguiente = dict(
+                Escena360.objects.filter(categoria__in=categorias.values())
+                .values('categoria').annotate(maximo=Max('orden')).values_list('categoria', 'maximo')
+            )
+
+            escenas = []
+            for fila, resultado in validas:
+                categoria = categorias[str(fila['categoria']).strip()]
+                if (categoria.pk, resultado['imagen']) in existentes:
+                    self.estadisticas['existentes'] += 1
+                    continue
+                existentes.add((categoria.pk, resultado['imagen']))
+
+                orden = orden_de_fila(fila)
+                if orden is None:
+                    orden = siguiente.get(categoria.pk, -1) + 1
+                siguiente[categoria.pk] = max(orden, siguiente.get(categoria.pk, -1))
+
+                escena = Escena360(
+                    categoria=categoria,
+                    titulo=str(fila['titulo']).strip(),
+                    descripcion=str(fila.get('descripcion') or '').strip(),
+                    imagen=resultado['imagen'],
+                    imagen_ancho=resultado['metadatos']['imagen']['ancho'],
+                    imagen_alto=resultado['metadatos']['imagen']['alto'],
+                    icono=resultado['icono'],
+                    icono_ancho=resultado['metadatos']['icono']['ancho'],
+                    icono_alto=resultado['metadatos']['icono']['alto'],
+                    metadatos=resultado['metadatos'],
+                    video_youtube=str(fila.get('video_youtube') or '').strip(),
+                    orden=orden,
+                    activa=_es_verdadero(fila.get('activa')),
+                    multires=resultado['multires'],
+                    rendiciones=resultado['rendiciones'],
+                )
+                escena.actualizar_youtube()
+                escenas.append(escena)
+
+            Escena360.objects.bulk_create(escenas)
+            self.estadisticas['creadas'] = len(escenas)
+            if escenas:
+                # bulk_create no envía post_save: se publica una única versión del catálogo
+                transaction.on_commit(invalidar_catalogo)
+
+    def categorias(self, validas):
+        """Categorías por título, creando las que faltan con el icono de su primera escena"""
+        titulos = {}
+        for fila, resultado in validas:
+            titulos.setdefault(str(fila['categoria']).strip(), resultado['icono'])
+
+        categorias = {categoria.titulo: categoria for categoria in CategoriaEscena.objects.filter(titulo__in=titulos)}
+        orden = CategoriaEscena.objects.aggregate(maximo=Max('orden'))['maximo'] or 0
+        for titulo, icono in titulos.items():
+            if titulo not in categorias:
+                orden += 1
+                categorias[titulo] = CategoriaEscena.objects.create(titulo=titulo, icono=icono, orden=orden)
+                self.avisar(f"Categoría creada: {titulo}")
+        return categorias
+
+
+def ruta_diario(origen):
+    """Diario por defecto junto al directorio o manifiesto de origen"""
+    origen = Path(origen).resolve()
+    return origen.parent / f'.{origen.name}.importacion.jsonl'
+
@@ -0,0 +1,140 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.cms.benchmark import formatear_tabla, peticion_asgi, peticion_wsgi, resumir, volcar_json
+
+COLUMNAS = ('servidor', 'clientes', 'rps', 'p50_ms', 'p95_ms', 'p99_ms', 'errores')
+
+
+def medir_wsgi(aplicacion, ruta, clientes, peticiones, hilos, retardo):
+    """Clientes concurrentes contra un pool fijo de ``hilos`` workers, como gunicorn gthread"""
+    latencias = []
+    errores = []
+    with ThreadPoolExecutor(max_workers=hilos) as workers:
+
+        def cliente():
+            for _ in range(peticiones):
+                inicio = time.perf_counter()
+                estado, _ = workers.submit(peticion_wsgi, aplicacion, ruta, retardo).result()
+                latencias.append(time.perf_counter() - inicio)
+                if estado >= 400:
+                    errores.append(estado)
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clientes) as conexiones:
+            for tarea in [conexiones.submit(cliente) for _ in range(clientes)]:
+                tarea.result()
+        duracion = time.perf_counter() - inicio
+    return {**resumir(latencias, duracion), 'errores': len(errores)}
+
+
+async def medir_asgi(aplicacion, ruta, clientes, peticiones, retardo):
+    """Clientes concurrentes en un único bucle de eventos"""
+    latencias = []
+    errores = []
+
+    async def cliente():
+        for _ in range(peticiones):
+            inicio = time.perf_counter()
+            estado, _ = await peticion_asgi(aplicacion, ruta, retardo)
+            latencias.append(time.perf_counter() - inicio)
+            if estado >= 400:
+                errores.append(estado)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente() for _ in range(clientes)))
+    return {**resumir(latencias, time.perf_counter() - inicio), 'errores': len(errores)}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el visor bajo core.asgi (vistas asíncronas) y core.wsgi (vistas síncronas "
+        "con un pool fijo de hilos) con varios números de clientes lentos concurrentes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ruta', default='/', help="URL a pedir (por defecto, el visor)")
+        parser.add_argument(
+            '--clientes',
+            default='1,10,50,200',
+            help="Números de clientes concurrentes separados por comas",
+        )
+        parser.add_argument('--peticiones', type=int, default=20, help="Peticiones por cliente")
+        parser.add_argument('--hilos', type=int, default=4, help="Hilos de trabajo del servidor WSGI")
+        parser.add_argument(
+            '--retardo',
+            type=float,
+            default=50,
+            help="Milisegundos que tarda cada cliente en recibir la respuesta",
+        )
+        parser.add_argument('--json', action='store_true', help="Imprime los resultados en JSON")
+        parser.add_argument('--servidor', choices=('wsgi', 'asgi'), help="Uso interno: mide solo un servidor")
+
+    def handle(self, *args, **options):
+        try:
+            clientes = [int(valor) for valor in options['clientes'].split(',')]
+        except ValueError:
+            raise CommandError("--clientes debe ser una lista de enteros separados por comas")
+
+        if options['servidor']:
+            self.stdout.write(json.dumps(self.medir(options['servidor'], clientes, options)))
+            return
+
+        # Cada servidor va en su propio proceso: las URLs se eligen al importar
+        # la configuración según CMS_VISTAS_ASINCRONAS
+        resultados = []
+        for servidor in ('wsgi', 'asgi'):
+            resultados += self.medir_en_subproceso(servidor, options)
+
+        if options['json']:
+            self.stdout.write(volcar_json(resultados))
+            return
+        for linea in formatear_tabla(resultados, COLUMNAS):
+            self.stdout.write(linea)
+
+    def medir_en_subproceso(self, servidor, options):
+        entorno = {**os.environ, 'CMS_VISTAS_ASINCRONAS': '1' if servidor == 'asgi' else '0'}
+        orden = [
+            sys.executable, '-m', 'django', 'bench_asgi',
+            '--servidor', servidor,
+            '--settings', settings.SETTINGS_MODULE,
+            '--ruta', options['ruta'],
+            '--clientes', options['clientes'],
+            '--peticiones', str(options['peticiones']),
+            '--hilos', str(options['hilos']),
+            '--retardo', str(options['retardo']),
+        ]
+        proceso = subprocess.run(
+            orden, env=entorno, cwd=settings.BASE_DIR.parent, capture_output=True, text=True,
+        )
+        if proceso.returncode:
+            raise CommandError(f"Falló la medición de {servidor}:\n{proceso.stderr}")
+        return json.loads(proceso.stdout)
+
+    def medir(self, servidor, clientes, options):
+        retardo = options['retardo'] / 1000
+        ruta = options['ruta']
+        if servidor == 'asgi':
+            from core.asgi import application
+        else:
+            from core.wsgi import application
+
+        filas = []
+        for total in clientes:
+            if servidor == 'asgi':
+                # Primera petición fuera de la medición: calienta cachés y conexiones
+                asyncio.run(peticion_asgi(application, ruta))
+                resultado = asyncio.run(medir_asgi(application, ruta, total, options['peticiones'], retardo))
+            else:
+                peticion_wsgi(application, ruta)
+                resultado = medir_wsgi(application, ruta, total, options['peticiones'], options['hilos'], retardo)
+            filas.append({'servidor': servidor, 'clientes': total, **resultado})
+        return filas
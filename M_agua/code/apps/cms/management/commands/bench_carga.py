@@ -0,0 +1,217 @@
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from apps.cms.benchmark import (
+    base_de_datos_temporal,
+    commit_actual,
+    formatear_tabla,
+    peticion_wsgi,
+    resumir,
+    sembrar_catalogo,
+    volcar_json,
+)
+from apps.cms.models import Escena360
+
+ESCENARIOS = ('visor', 'api', 'admin_escenas', 'admin_categorias', 'media')
+
+COLUMNAS = ('escenario', 'clientes', 'rps', 'p50_ms', 'p95_ms', 'p99_ms', 'consultas_media', 'consultas_max', 'errores')
+
+
+def medir_carga(aplicacion, rutas, clientes, peticiones, cabeceras=None):
+    """
+    ``clientes`` hilos que hacen ``peticiones`` seguidas cada uno, repartidas entre ``rutas``.
+
+    Además de las latencias cuenta las consultas SQL de cada petición con un
+    ``execute_wrapper`` en la conexión del hilo que la atiende.
+    """
+    latencias = []
+    consultas = []
+    errores = []
+
+    def cliente(numero):
+        conexion = connections['default']
+        contador = threading.local()
+
+        def contar(execute, sql, params, many, context):
+            contador.total += 1
+            return execute(sql, params, many, context)
+
+        with conexion.execute_wrapper(contar):
+            for indice in range(peticiones):
+                contador.total = 0
+                inicio = time.perf_counter()
+                estado, _ = peticion_wsgi(aplicacion, rutas[(numero + indice) % len(rutas)], cabeceras=cabeceras)
+                latencias.append(time.perf_counter() - inicio)
+                consultas.append(contador.total)
+                if estado >= 400:
+                    errores.append(estado)
+
+    def cliente_en_hilo(numero):
+        try:
+            cliente(numero)
+        finally:
+            connections.close_all()
+
+    inicio = time.perf_counter()
+    if clientes == 1:
+        # Un solo cliente en este hilo: también mide la conexión que ya está abierta
+        cliente(0)
+    else:
+        with ThreadPoolExecutor(max_workers=clientes) as hilos:
+            for tarea in [hilos.submit(cliente_en_hilo, numero) for numero in range(clientes)]:
+                tarea.result()
+    duracion = time.perf_counter() - inicio
+    return {
+        **resumir(latencias, duracion),
+        'consultas_media': round(sum(consultas) / len(consultas), 1) if consultas else 0.0,
+        'consultas_max': max(consultas, default=0),
+        'errores': len(errores),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de carga local del visor, la API, las listas del admin y las URLs de media "
+        "a través de la aplicación WSGI, con percentiles de latencia, rendimiento y consultas "
+        "por petición; por defecto sobre un catálogo de relleno en una base de datos temporal"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--escenarios',
+            default=','.join(ESCENARIOS),
+            help=f"Escenarios separados por comas ({', '.join(ESCENARIOS)})",
+        )
+        parser.add_argument('--clientes', default='1,10', help="Números de clientes concurrentes separados por comas")
+        parser.add_argument('--peticiones', type=int, default=50, help="Peticiones por cliente")
+        parser.add_argument('--categorias', type=int, default=10, help="Categorías del catálogo de relleno")
+        parser.add_argument('--escenas', type=int, default=20, help="Escenas por categoría del catálogo de relleno")
+        parser.add_argument('--ancho', type=int, default=1024, help="Ancho de las panorámicas de relleno")
+        parser.add_argument(
+            '--catalogo-actual',
+            action='store_true',
+            help="Usa la base de datos y MEDIA_ROOT configurados en lugar de un catálogo temporal",
+        )
+        parser.add_argument(
+            '--usuario',
+            help="Superusuario con el que se piden las listas del admin sobre el catálogo actual",
+        )
+        parser.add_argument('--json', action='store_true', help="Imprime los resultados en JSON")
+        parser.add_argument('--salida', help="Guarda también los resultados en este archivo JSON")
+
+    def handle(self, *args, **options):
+        try:
+            clientes = [int(valor) for valor in options['clientes'].split(',')]
+        except ValueError:
+            raise CommandError("--clientes debe ser una lista de enteros separados por comas")
+        escenarios = [escenario.strip() for escenario in options['escenarios'].split(',') if escenario.strip()]
+        desconocidos = set(escenarios) - set(ESCENARIOS)
+        if desconocidos:
+            raise CommandError(f"Escenarios desconocidos: {', '.join(sorted(desconocidos))}")
+
+        if options['catalogo_actual']:
+            usuario = None
+            if options['usuario']:
+                usuario = get_user_model().objects.filter(username=options['usuario']).first()
+                if usuario is None:
+                    raise CommandError(f"No existe el usuario {options['usuario']}")
+            resultados = self.medir(escenarios, clientes, options, usuario)
+            catalogo = {'escenas': Escena360.objects.count()}
+        else:
+            resultados, catalogo = self.medir_con_catalogo_temporal(escenarios, clientes, options)
+
+        informe = {
+            'commit': commit_actual(),
+            'ajustes': settings.SETTINGS_MODULE,
+            'catalogo': catalogo,
+            'resultados': resultados,
+        }
+        if options['salida']:
+            Path(options['salida']).write_text(volcar_json(informe) + '\n', encoding='utf-8')
+        if options['json']:
+            self.stdout.write(volcar_json(informe))
+            return
+        for linea in formatear_tabla(resultados, COLUMNAS):
+            self.stdout.write(linea)
+
+    def medir_con_catalogo_temporal(self, escenarios, clientes, options):
+        directorio = tempfile.mkdtemp()
+        try:
+            with override_settings(MEDIA_ROOT=directorio), \
+                    base_de_datos_temporal(archivo=Path(directorio) / 'bench.sqlite3') as conexion:
+                inicio = time.perf_counter()
+                sembrar_catalogo(options['categorias'], options['escenas'], options['ancho'])
+                self.stderr.write(
+                    f"Catálogo de {options['categorias']}×{options['escenas']} escenas creado "
+                    f"en {time.perf_counter() - inicio:.1f} s"
+                )
+                usuario = get_user_model().objects.create_superuser('bench', 'bench@example.com', None)
+                conexion.close()
+                resultados = self.medir(escenarios, clientes, options, usuario)
+        finally:
+            shutil.rmtree(directorio, ignore_errors=True)
+        catalogo = {
+            'categorias': options['categorias'],
+            'escenas_por_categoria': options['escenas'],
+            'ancho': options['ancho'],
+        }
+        return resultados, catalogo
+
+    def rutas(self, escenarios):
+        """URLs de cada escenario sobre el catálogo cargado"""
+        imagenes = [escena.imagen.url for escena in Escena360.objects.filter(activa=True).only('imagen')[:20]]
+        rutas = {
+            'visor': [reverse('cms:visor_360')],
+            'api': [reverse('cms:api_categorias')],
+            'admin_escenas': [reverse('admin:cms_escena360_changelist')],
+            'admin_categorias': [reverse('admin:cms_categoriaescena_changelist')],
+            'media': imagenes,
+        }
+        return {escenario: rutas[escenario] for escenario in escenarios if rutas[escenario]}
+
+    def medir(self, escenarios, clientes, options, usuario):
+        aplicacion = get_wsgi_application()
+        if getattr(settings, 'CMS_SERVIR_ESTATICOS', False):
+            # Como core/wsgi.py, creado aquí para que vea el MEDIA_ROOT temporal
+            from apps.cms.servidor_estaticos import ServidorEstaticos
+
+            aplicacion = ServidorEstaticos(aplicacion)
+
+        # Con ALLOWED_HOSTS de producción 127.0.0.1 recibiría un 400
+        host = next((nombre.lstrip('.') for nombre in settings.ALLOWED_HOSTS if nombre != '*'), None)
+        cabeceras_publicas = {'Host': host} if host else {}
+        cabeceras_admin = None
+        if usuario is not None:
+            navegador = Client()
+            navegador.force_login(usuario)
+            cookie = navegador.cookies[settings.SESSION_COOKIE_NAME].value
+            cabeceras_admin = {**cabeceras_publicas, 'Cookie': f'{settings.SESSION_COOKIE_NAME}={cookie}'}
+
+        filas = []
+        for escenario, rutas in self.rutas(escenarios).items():
+            cabeceras = cabeceras_publicas
+            if escenario.startswith('admin_'):
+                if cabeceras_admin is None:
+                    self.stderr.write(self.style.WARNING(f"{escenario}: se omite, falta --usuario"))
+                    continue
+                cabeceras = cabeceras_admin
+            # Primera pasada fuera de la medición: calienta cachés y conexiones
+            for ruta in rutas:
+                peticion_wsgi(aplicacion, ruta, cabeceras=cabeceras)
+            for total in clientes:
+                resultado = medir_carga(aplicacion, rutas, total, options['peticiones'], cabeceras)
+                filas.append({'escenario': escenario, 'rutas': len(rutas), 'clientes': total, **resultado})
+        return filas
@@ -0,0 +1,88 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.cms.benchmark import (
+    base_de_datos_temporal,
+    crear_catalogo_sintetico,
+    cronometrar,
+    formatear_tabla,
+    resumir,
+    volcar_json,
+)
+from apps.cms.catalogo import categorias_activas, escenas_activas, escenas_con_video
+from apps.cms.models import CategoriaEscena, Escena360, LogoCreador
+
+COLUMNAS = ('consulta', 'indices', 'sql_ms', 'media_ms', 'p50_ms', 'p95_ms', 'ordena')
+
+
+def consultas_del_catalogo(categorias):
+    """Consultas públicas del visor y la API sobre un catálogo ya creado"""
+    ids = [categoria.pk for categoria in categorias]
+    return {
+        'categorías activas': lambda: categorias_activas(),
+        'escenas de una categoría': lambda: escenas_activas().filter(categoria_id=ids[len(ids) // 2]),
+        'escenas del catálogo': lambda: escenas_activas().filter(categoria_id__in=ids),
+        'escenas con video': lambda: escenas_con_video().filter(categoria_id=ids[0]),
+        'logos activos': lambda: LogoCreador.objects.filter(activo=True),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Muestra el plan y el tiempo de las consultas del catálogo con y sin los índices "
+        "de Meta.indexes sobre un catálogo sintético en una base de datos temporal"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escenas', type=int, default=100_000, help="Escenas del catálogo sintético")
+        parser.add_argument('--categorias', type=int, default=50, help="Categorías del catálogo sintético")
+        parser.add_argument('--repeticiones', type=int, default=20, help="Ejecuciones de cada consulta")
+        parser.add_argument('--json', action='store_true', help="Imprime los resultados en JSON")
+
+    def handle(self, *args, **options):
+        resultados = []
+        with base_de_datos_temporal() as conexion:
+            inicio = time.perf_counter()
+            categorias = crear_catalogo_sintetico(options['escenas'], options['categorias'])
+            with conexion.cursor() as cursor:
+                if conexion.vendor == 'sqlite':
+                    cursor.execute('ANALYZE')
+            self.stderr.write(f"Catálogo de {options['escenas']} escenas creado en {time.perf_counter() - inicio:.1f} s")
+
+            consultas = consultas_del_catalogo(categorias)
+            resultados += self.medir(consultas, 'con', options['repeticiones'])
+            with conexion.schema_editor() as editor:
+                for modelo in (CategoriaEscena, Escena360, LogoCreador):
+                    for indice in modelo._meta.indexes:
+                        editor.remove_index(modelo, indice)
+            resultados += self.medir(consultas, 'sin', options['repeticiones'])
+
+        if options['json']:
+            self.stdout.write(volcar_json(resultados))
+            return
+        for resultado in resultados:
+            self.stdout.write(f"\n{resultado['consulta']} ({resultado['indices']} índices):")
+            for linea in resultado['plan'].splitlines():
+                self.stdout.write(f"    {linea}")
+        self.stdout.write('')
+        for linea in formatear_tabla(resultados, COLUMNAS):
+            self.stdout.write(linea)
+
+    def medir(self, consultas, indices, repeticiones):
+        filas = []
+        for nombre, consulta in consultas.items():
+            plan = consulta().explain()
+            # Solo la base de datos: mismo WHERE y ORDER BY sin construir modelos
+            sql = cronometrar(lambda: list(consulta().values_list('pk', flat=True)), repeticiones)
+            latencias = cronometrar(lambda: list(consulta()), repeticiones)
+            filas.append({
+                'consulta': nombre,
+                'indices': indices,
+                'plan': plan,
+                'sql_ms': round(sorted(sql)[len(sql) // 2] * 1000, 3),
+                # SQLite indica con "TEMP B-TREE" que ordena las filas en memoria
+                'ordena': 'sí' if 'TEMP B-TREE' in plan.upper() else 'no',
+                **resumir(latencias, sum(latencias)),
+            })
+        return filas
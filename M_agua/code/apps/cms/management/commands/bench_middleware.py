@@ -0,0 +1,147 @@
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from apps.cms.benchmark import (
+    base_de_datos_temporal,
+    commit_actual,
+    cronometrar,
+    formatear_tabla,
+    peticion_wsgi,
+    resumir,
+    sembrar_catalogo,
+    volcar_json,
+)
+
+ESCENARIOS = {
+    # Página del visor ya cacheada: casi todo el tiempo es la pila de middleware
+    'visor': '/',
+    'api': '/api/categorias/',
+    # Sin caché: cada petición renderiza la plantilla con sus context processors
+    'visor_sin_cache': '/',
+    # Control: el admin recorre la pila completa en las dos variantes
+    'admin': '/admin/login/',
+}
+
+# Middleware de Django que sustituye cada clase de apps/cms/middleware.py
+ORIGINALES = {
+    'apps.cms.middleware.SesionMiddleware': 'django.contrib.sessions.middleware.SessionMiddleware',
+    'apps.cms.middleware.CsrfMiddleware': 'django.middleware.csrf.CsrfViewMiddleware',
+    'apps.cms.middleware.AutenticacionMiddleware': 'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.cms.middleware.MensajesMiddleware': 'django.contrib.messages.middleware.MessageMiddleware',
+}
+
+COLUMNAS = ('escenario', 'pila', 'media_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'ahorro_us', 'ahorro_pct', 'errores')
+
+
+def ajustes_pila_completa():
+    """MIDDLEWARE y TEMPLATES de Django sin la pila ligera ni el motor 'publico'"""
+    return {
+        'MIDDLEWARE': [ORIGINALES.get(ruta, ruta) for ruta in settings.MIDDLEWARE],
+        'TEMPLATES': [motor for motor in settings.TEMPLATES if motor.get('NAME') != 'publico'],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide cuánto tarda cada petición al visor público y a la API con la pila de middleware "
+        "ligera de apps/cms/middleware.py y con la pila completa de Django, sobre un catálogo "
+        "de relleno en una base de datos temporal"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--escenarios',
+            default=','.join(ESCENARIOS),
+            help=f"Escenarios separados por comas ({', '.join(ESCENARIOS)})",
+        )
+        parser.add_argument('--peticiones', type=int, default=500, help="Peticiones seguidas por ronda, escenario y pila")
+        parser.add_argument('--rondas', type=int, default=4, help="Rondas en que se alternan las dos pilas")
+        parser.add_argument('--categorias', type=int, default=5, help="Categorías del catálogo de relleno")
+        parser.add_argument('--escenas', type=int, default=10, help="Escenas por categoría del catálogo de relleno")
+        parser.add_argument('--json', action='store_true', help="Imprime los resultados en JSON")
+        parser.add_argument('--salida', help="Guarda también los resultados en este archivo JSON")
+
+    def handle(self, *args, **options):
+        escenarios = [escenario.strip() for escenario in options['escenarios'].split(',') if escenario.strip()]
+        desconocidos = set(escenarios) - set(ESCENARIOS)
+        if desconocidos:
+            raise CommandError(f"Escenarios desconocidos: {', '.join(sorted(desconocidos))}")
+        if options['peticiones'] < 1 or options['rondas'] < 1:
+            raise CommandError("--peticiones y --rondas deben ser al menos 1")
+
+        directorio = tempfile.mkdtemp()
+        try:
+            with override_settings(MEDIA_ROOT=directorio), \
+                    base_de_datos_temporal(archivo=Path(directorio) / 'bench.sqlite3'):
+                sembrar_catalogo(options['categorias'], options['escenas'], ancho=256, lado_icono=32)
+                resultados = [
+                    fila for escenario in escenarios for fila in self.medir(escenario, options['peticiones'], options['rondas'])
+                ]
+        finally:
+            shutil.rmtree(directorio, ignore_errors=True)
+
+        informe = {
+            'commit': commit_actual(),
+            'ajustes': settings.SETTINGS_MODULE,
+            'catalogo': {'categorias': options['categorias'], 'escenas_por_categoria': options['escenas']},
+            'resultados': resultados,
+        }
+        if options['salida']:
+            Path(options['salida']).write_text(volcar_json(informe) + '\n', encoding='utf-8')
+        if options['json']:
+            self.stdout.write(volcar_json(informe))
+            return
+        for linea in formatear_tabla(resultados, COLUMNAS):
+            self.stdout.write(linea)
+
+    def medir(self, escenario, peticiones, rondas):
+        """
+        Filas de la pila completa y la ligera de un escenario; la ligera lleva el ahorro por petición.
+
+        Las dos pilas se alternan en ``rondas`` tandas para que las variaciones
+        de la máquina durante la medición afecten a ambas por igual.
+        """
+        ruta = ESCENARIOS[escenario]
+        # Con ALLOWED_HOSTS de producción 127.0.0.1 recibiría un 400
+        host = next((nombre.lstrip('.') for nombre in settings.ALLOWED_HOSTS if nombre != '*'), None)
+        cabeceras = {'Host': host} if host else {}
+        ajustes_escenario = {}
+        if escenario == 'visor_sin_cache':
+            # Las páginas caducan nada más guardarse: cada petición renderiza
+            ajustes_escenario['CMS_CACHE_PAGINAS'] = {'TIMEOUT': 0}
+            cache.clear()
+
+        pilas = {'completa': ajustes_pila_completa(), 'ligera': {}}
+        latencias = {pila: [] for pila in pilas}
+        errores = {pila: 0 for pila in pilas}
+        for ronda in range(rondas + 1):
+            for pila, ajustes in pilas.items():
+                with override_settings(**ajustes_escenario, **ajustes):
+                    aplicacion = WSGIHandler()
+                    estados = []
+
+                    def pedir():
+                        estados.append(peticion_wsgi(aplicacion, ruta, cabeceras=cabeceras)[0])
+
+                    # La primera ronda no se mide: calienta cachés, plantillas y conexiones
+                    medidas = cronometrar(pedir, peticiones if ronda else min(peticiones, 50))
+                if ronda:
+                    latencias[pila] += medidas
+                    errores[pila] += sum(estado >= 400 for estado in estados)
+
+        filas = {
+            pila: {'escenario': escenario, 'pila': pila, **resumir(medidas, sum(medidas)), 'errores': errores[pila]}
+            for pila, medidas in latencias.items()
+        }
+        completa, ligera = filas['completa'], filas['ligera']
+        ahorro = completa['media_ms'] - ligera['media_ms']
+        ligera['ahorro_us'] = round(ahorro * 1000, 1)
+        ligera['ahorro_pct'] = round(ahorro / completa['media_ms'] * 100, 1) if completa['media_ms'] else 0.0
+        return [completa, ligera]
@@ -0,0 +1,106 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from apps.cms.cache import invalidar_catalogo
+from apps.cms.metadatos import leer_metadatos
+from apps.cms.models import MetadatosMixin
+
+
+def _leer(modelo, pk, campo, nombre):
+    storage = apps.get_model(modelo)._meta.get_field(campo).storage
+    try:
+        return modelo, pk, campo, leer_metadatos(nombre, storage), None
+    except (OSError, ValueError) as error:
+        return modelo, pk, campo, None, str(error)
+
+
+class Command(BaseCommand):
+    help = (
+        "Lee dimensiones, tamaño, formato y hash de las imágenes ya subidas y los guarda "
+        "en los modelos, repartiendo la lectura de archivos entre varios procesos"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--procesos',
+            type=int,
+            default=None,
+            help="Procesos que leen imágenes (por defecto, uno por CPU)",
+        )
+        parser.add_argument(
+            '--forzar',
+            action='store_true',
+            help="Vuelve a leer también las imágenes que ya tienen metadatos",
+        )
+
+    def pendientes(self, forzar):
+        """(modelo, pk, campo, nombre) de cada imagen sin metadatos al día"""
+        for modelo in apps.get_app_config('cms').get_models():
+            if not issubclass(modelo, MetadatosMixin):
+                continue
+            campos = modelo.campos_imagen()
+            for objeto in modelo.objects.order_by('pk').iterator():
+                for campo in campos:
+                    nombre = getattr(objeto, campo.name).name
+                    if not nombre:
+                        continue
+                    completo = getattr(objeto, campo.width_field) is not None
+                    if forzar or not completo or objeto.get_metadatos(campo.name).get('fuente') != nombre:
+                        yield modelo._meta.label, objeto.pk, campo.name, nombre
+
+    def handle(self, *args, **options):
+        tareas = list(self.pendientes(options['forzar']))
+        procesos = options['procesos'] or os.cpu_count()
+        inicio = time.perf_counter()
+
+        resultados = {}
+        errores = 0
+        for modelo, pk, campo, datos, error in self.leer(tareas, procesos):
+            if error:
+                errores += 1
+                self.stderr.write(self.style.ERROR(f"{modelo} {pk} {campo}: {error}"))
+                continue
+            resultados.setdefault((modelo, pk), {})[campo] = datos
+
+        for (etiqueta, pk), campos in resultados.items():
+            self.guardar(apps.get_model(etiqueta), pk, campos)
+        if resultados:
+            # Las dimensiones viajan en la API y en la página del visor
+            invalidar_catalogo()
+
+        segundos = time.perf_counter() - inicio
+        leidas = len(tareas) - errores
+        self.stdout.write(self.style.SUCCESS(
+            f"{leidas} imágenes leídas en {segundos:.1f} s con {procesos} procesos "
+            f"({leidas / segundos if segundos else 0:.0f} imágenes/s)"
+            + (f"; {errores} con errores" if errores else "")
+        ))
+
+    def leer(self, tareas, procesos):
+        if procesos == 1 or len(tareas) <= 1:
+            for datos in tareas:
+                yield _leer(*datos)
+            return
+        # Los procesos hijos no deben heredar las conexiones abiertas del padre
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=procesos, initializer=django.setup) as pool:
+            for tarea in as_completed([pool.submit(_leer, *datos) for datos in tareas]):
+                yield tarea.result()
+
+    def guardar(self, modelo, pk, campos):
+        objeto = modelo.objects.filter(pk=pk).only('metadatos').first()
+        if objeto is None:
+            return
+        metadatos = {**(objeto.metadatos or {}), **campos}
+        cambios = {}
+        for nombre, datos in campos.items():
+            campo = modelo._meta.get_field(nombre)
+            cambios[campo.width_field] = datos['ancho']
+            cambios[campo.height_field] = datos['alto']
+        modelo.objects.filter(pk=pk).update(metadatos=metadatos, **cambios)
@@ -0,0 +1,41 @@
+import shutil
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.cms.exportacion import ExportadorVisor
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporta el visor 360 con sus estáticos, imágenes, rendiciones y teselas a un "
+        "directorio autocontenido que puede servir cualquier servidor estático"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('destino', help="Directorio donde se escribe la exportación")
+        parser.add_argument(
+            '--hilos',
+            type=int,
+            default=None,
+            help="Hilos para copiar y comprimir archivos (por defecto, uno por CPU)",
+        )
+        parser.add_argument(
+            '--limpiar',
+            action='store_true',
+            help="Borra el directorio de destino antes de exportar",
+        )
+
+    def handle(self, *args, **options):
+        destino = Path(options['destino'])
+        if destino.exists() and any(destino.iterdir()):
+            if not options['limpiar']:
+                raise CommandError(f"{destino} no está vacío; usa --limpiar para reemplazarlo")
+            shutil.rmtree(destino)
+
+        exportador = ExportadorVisor(destino, hilos=options['hilos'])
+        total = exportador.exportar()
+
+        for url in sorted(exportador.faltantes):
+            self.stderr.write(self.style.WARNING(f"No se encontró {url}"))
+        self.stdout.write(self.style.SUCCESS(f"{total} archivos exportados en {destino}"))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from apps.cms.models import Escena360
+
+
+class Command(BaseCommand):
+    help = "Genera las teselas multiresolución de las escenas 360 existentes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--forzar',
+            action='store_true',
+            help="Regenera también las escenas que ya tienen teselas",
+        )
+        parser.add_argument(
+            'ids',
+            nargs='*',
+            type=int,
+            help="IDs de escenas a procesar (por defecto, todas)",
+        )
+
+    def handle(self, *args, **options):
+        escenas = Escena360.objects.order_by('pk')
+        if options['ids']:
+            escenas = escenas.filter(pk__in=options['ids'])
+
+        generadas = 0
+        for escena in escenas.iterator():
+            try:
+                if not escena.actualizar_multires(forzar=options['forzar']):
+                    continue
+            except (OSError, ValueError) as error:
+                self.stderr.write(self.style.ERROR(f"{escena.pk} - {escena.titulo}: {error}"))
+                continue
+            generadas += 1
+            estado = "teselada" if escena.get_multires_config() else "sin proporción 2:1, se omite"
+            self.stdout.write(f"{escena.pk} - {escena.titulo}: {estado}")
+
+        self.stdout.write(self.style.SUCCESS(f"{generadas} escenas procesadas"))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from apps.cms.models import CategoriaEscena, Escena360, LogoCreador
+
+
+class Command(BaseCommand):
+    help = "Genera las rendiciones de iconos, logos e imágenes de categoría existentes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--forzar',
+            action='store_true',
+            help="Regenera también las imágenes que ya tienen rendiciones",
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        for modelo in (CategoriaEscena, Escena360, LogoCreador):
+            procesados = 0
+            for objeto in modelo.objects.order_by('pk').iterator():
+                try:
+                    if objeto.actualizar_rendiciones(forzar=options['forzar']):
+                        procesados += 1
+                except (OSError, ValueError) as error:
+                    self.stderr.write(self.style.ERROR(f"{modelo.__name__} {objeto.pk}: {error}"))
+            self.stdout.write(f"{modelo._meta.verbose_name_plural}: {procesados} procesados")
+            total += procesados
+
+        self.stdout.write(self.style.SUCCESS(f"{total} objetos con rendiciones nuevas"))
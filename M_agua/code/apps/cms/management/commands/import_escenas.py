@@ -0,0 +1,80 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.cms.importacion import Diario, ErrorImportacion, ImportadorEscenas, leer_origen, ruta_diario
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa escenas 360 desde un directorio (una carpeta por categoría) o un manifiesto "
+        "CSV/YAML, procesando las imágenes en paralelo e insertando todo en una transacción"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'origen',
+            help=(
+                "Directorio con una subcarpeta por categoría, o manifiesto .csv/.yaml con las columnas "
+                "categoria, titulo, imagen, icono, descripcion, orden, video_youtube y activa"
+            ),
+        )
+        parser.add_argument(
+            '--procesos',
+            type=int,
+            default=None,
+            help="Procesos para validar y procesar imágenes (por defecto, uno por CPU)",
+        )
+        parser.add_argument(
+            '--diario',
+            default=None,
+            help="Archivo donde se anotan las escenas procesadas para reanudar (por defecto, junto al origen)",
+        )
+        parser.add_argument(
+            '--desde-cero',
+            action='store_true',
+            help="Ignora el diario de una importación interrumpida y vuelve a procesar todo",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            filas = leer_origen(options['origen'])
+        except ErrorImportacion as error:
+            raise CommandError(str(error))
+        if not filas:
+            raise CommandError(f"No hay escenas que importar en {options['origen']}")
+
+        ruta = Path(options['diario']) if options['diario'] else ruta_diario(options['origen'])
+        if options['desde_cero']:
+            ruta.unlink(missing_ok=True)
+        diario = Diario(ruta)
+        if diario.entradas:
+            self.stdout.write(f"Reanudando: {len(diario.entradas)} escenas ya procesadas en {ruta}")
+
+        importador = ImportadorEscenas(
+            filas,
+            diario,
+            procesos=options['procesos'],
+            avisar=self.stdout.write if options['verbosity'] > 1 else None,
+        )
+        estadisticas = importador.importar()
+
+        for indice, mensaje in importador.errores:
+            titulo = filas[indice].get('titulo') or filas[indice].get('imagen') or f"fila {indice + 1}"
+            self.stderr.write(self.style.ERROR(f"{titulo}: {mensaje}"))
+
+        segundos = estadisticas['segundos_proceso']
+        megas = estadisticas['bytes'] / 1024 / 1024
+        self.stdout.write(
+            f"Procesadas {estadisticas['procesadas']} escenas ({megas:.1f} MB) en {segundos:.1f} s: "
+            f"{estadisticas['procesadas'] / segundos if segundos else 0:.2f} escenas/s, "
+            f"{megas / segundos if segundos else 0:.1f} MB/s con {importador.procesos} procesos"
+        )
+        if estadisticas['reanudadas']:
+            self.stdout.write(f"{estadisticas['reanudadas']} escenas reutilizadas del diario")
+        if estadisticas['existentes']:
+            self.stdout.write(f"{estadisticas['existentes']} escenas ya estaban importadas")
+        self.stdout.write(self.style.SUCCESS(
+            f"{estadisticas['creadas']} escenas creadas en {estadisticas['segundos_insercion']:.2f} s"
+            + (f"; {estadisticas['errores']} filas con errores" if estadisticas['errores'] else "")
+        ))
@@ -0,0 +1,97 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import models
+
+from apps.cms.storage import (
+    AlmacenamientoPorContenido,
+    es_nombre_por_contenido,
+    hash_contenido,
+    nombre_por_contenido,
+    storage_contenido,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Renombra las imágenes existentes de media/ por el hash de su contenido, "
+        "actualiza las referencias de los modelos y elimina las copias duplicadas"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--simular',
+            action='store_true',
+            help="Muestra lo que se haría sin mover archivos ni tocar la base de datos",
+        )
+        parser.add_argument(
+            '--sin-derivados',
+            action='store_true',
+            help="No regenera teselas ni rendiciones de los objetos migrados",
+        )
+
+    def campos_por_contenido(self, modelo):
+        return [
+            campo for campo in modelo._meta.get_fields()
+            if isinstance(campo, models.FileField) and isinstance(campo.storage, AlmacenamientoPorContenido)
+        ]
+
+    def handle(self, *args, **options):
+        storage = storage_contenido()
+        simular = options['simular']
+        originales = set()
+        referencias = set()
+        nuevos = set()
+
+        for modelo in apps.get_app_config('cms').get_models():
+            campos = self.campos_por_contenido(modelo)
+            if not campos:
+                continue
+
+            for objeto in modelo.objects.order_by('pk').iterator():
+                cambios = {}
+                for campo in campos:
+                    nombre = getattr(objeto, campo.name).name
+                    if not nombre:
+                        continue
+                    if es_nombre_por_contenido(nombre) or not storage.exists(nombre):
+                        if not storage.exists(nombre):
+                            self.stderr.write(self.style.WARNING(f"No existe {nombre} ({modelo.__name__} {objeto.pk})"))
+                        referencias.add(nombre)
+                        continue
+
+                    with storage.open(nombre, 'rb') as archivo:
+                        if simular:
+                            nuevo = nombre_por_contenido(nombre, hash_contenido(archivo))
+                        else:
+                            nuevo = storage.save(nombre, archivo)
+                    originales.add(nombre)
+                    referencias.add(nuevo)
+                    nuevos.add(nuevo)
+                    cambios[campo.name] = nuevo
+                    self.stdout.write(f"{nombre} -> {nuevo}")
+
+                if cambios and not simular:
+                    modelo.objects.filter(pk=objeto.pk).update(**cambios)
+                    if not options['sin_derivados']:
+                        self.regenerar_derivados(modelo.objects.get(pk=objeto.pk))
+
+        liberados = 0
+        borrados = 0
+        for nombre in sorted(originales - referencias):
+            liberados += storage.size(nombre)
+            borrados += 1
+            if not simular:
+                storage.delete(nombre)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(originales)} archivos migrados a {len(nuevos)} archivos únicos; "
+            f"{borrados} originales eliminados ({liberados / 1024:.0f} KB)"
+            + (" [simulación]" if simular else "")
+        ))
+
+    def regenerar_derivados(self, objeto):
+        # Las teselas y rendiciones cuelgan del nombre de la imagen original
+        if hasattr(objeto, 'actualizar_rendiciones'):
+            objeto.actualizar_rendiciones()
+        if hasattr(objeto, 'actualizar_multires'):
+            objeto.actualizar_multires()
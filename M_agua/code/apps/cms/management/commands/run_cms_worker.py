@@ -0,0 +1,101 @@
+import multiprocessing
+import signal
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from apps.cms.tareas import nombre_trabajador, obtener_configuracion, procesar_cola, recuperar_abandonadas
+
+
+def _trabajar(indice, parar):
+    # Ctrl+C llega a todo el grupo de procesos: los hijos terminan la tarea en
+    # curso y salen cuando el padre activa ``parar``
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    try:
+        procesar_cola(nombre_trabajador(indice), parar)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        "Procesa la cola de tareas de imagen (teselas y rendiciones) que encola el admin "
+        "cuando CMS_TAREAS['EN_SEGUNDO_PLANO'] está activo"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procesos', type=int, default=1, help="Procesos trabajadores en paralelo")
+        parser.add_argument(
+            '--una-vez',
+            action='store_true',
+            help="Procesa las tareas disponibles en este proceso y termina, sin esperar tareas nuevas",
+        )
+
+    def handle(self, *args, **options):
+        recuperadas = recuperar_abandonadas()
+        if recuperadas:
+            self.stdout.write(f"{recuperadas} tareas abandonadas devueltas a la cola")
+
+        if options['una_vez']:
+            procesadas = procesar_cola(nombre_trabajador(), una_vez=True)
+            self.stdout.write(self.style.SUCCESS(f"{procesadas} tareas procesadas"))
+            return
+        self.supervisar(options['procesos'])
+
+    def supervisar(self, total):
+        """Mantiene ``total`` trabajadores vivos hasta recibir SIGINT o SIGTERM"""
+        self.detener = False
+
+        def detener(numero, marco):
+            # Solo se anota: activar el Event desde el manejador se bloquea si
+            # la señal llega mientras este mismo proceso tiene tomado su candado
+            self.detener = True
+
+        signal.signal(signal.SIGINT, detener)
+        signal.signal(signal.SIGTERM, detener)
+
+        if total <= 1:
+            # Un solo trabajador: un hilo, para que el principal atienda las señales
+            parar = threading.Event()
+            trabajadores = {0: threading.Thread(target=procesar_cola, args=(nombre_trabajador(), parar))}
+            trabajadores[0].start()
+        else:
+            parar = multiprocessing.Event()
+            trabajadores = {}
+            # Los hijos abren sus propias conexiones; no heredan las del padre
+            connections.close_all()
+
+        revision = time.monotonic()
+        while not self.detener:
+            if total <= 1:
+                if not trabajadores[0].is_alive():
+                    break
+            else:
+                self.reiniciar_muertos(trabajadores, total, parar)
+            time.sleep(0.2)
+            if time.monotonic() - revision > obtener_configuracion()['INTERVALO'] * 10:
+                recuperar_abandonadas()
+                connections.close_all()
+                revision = time.monotonic()
+
+        self.stdout.write("Esperando a que los trabajadores terminen su tarea actual...")
+        parar.set()
+        for trabajador in trabajadores.values():
+            trabajador.join()
+        self.stdout.write(self.style.SUCCESS("Trabajadores detenidos"))
+
+    def reiniciar_muertos(self, procesos, total, parar):
+        for indice in range(total):
+            proceso = procesos.get(indice)
+            if proceso is not None and proceso.is_alive():
+                continue
+            if proceso is not None:
+                self.stderr.write(self.style.WARNING(
+                    f"El trabajador {indice} terminó con código {proceso.exitcode}; se reinicia"
+                ))
+            proceso = multiprocessing.Process(target=_trabajar, args=(indice, parar), daemon=True)
+            proceso.start()
+            procesos[indice] = proceso
@@ -0,0 +1,66 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.cms.benchmark import sembrar_catalogo
+from apps.cms.cache import invalidar_catalogo
+from apps.cms.models import CategoriaEscena, Escena360, TareaImagen
+
+
+class Command(BaseCommand):
+    help = (
+        "Crea un catálogo de prueba de N categorías × M escenas con imágenes de relleno "
+        "generadas, para medir el visor y el admin con catálogos grandes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categorias', type=int, default=10, help="Categorías a crear")
+        parser.add_argument('--escenas', type=int, default=20, help="Escenas por categoría")
+        parser.add_argument('--ancho', type=int, default=2048, help="Ancho en píxeles de las panorámicas 2:1")
+        parser.add_argument('--prefijo', default="Semilla", help="Prefijo del título de las categorías creadas")
+        parser.add_argument(
+            '--borrar',
+            action='store_true',
+            help="Borra antes las categorías (y sus escenas) de una siembra anterior con el mismo prefijo",
+        )
+        parser.add_argument(
+            '--derivados',
+            action='store_true',
+            help="Encola las teselas y rendiciones para que las genere run_cms_worker",
+        )
+
+    def handle(self, *args, **options):
+        if options['categorias'] < 1 or options['escenas'] < 0:
+            raise CommandError("Se necesita al menos una categoría y un número de escenas no negativo")
+        if options['ancho'] < 16:
+            raise CommandError("--ancho debe ser de al menos 16 píxeles")
+
+        inicio = time.perf_counter()
+        with transaction.atomic():
+            if options['borrar']:
+                borradas, _ = CategoriaEscena.objects.filter(titulo__startswith=f"{options['prefijo']} ").delete()
+                if borradas:
+                    self.stdout.write(f"{borradas} objetos de la siembra anterior borrados")
+
+            categorias = sembrar_catalogo(
+                options['categorias'], options['escenas'], options['ancho'], prefijo=options['prefijo'],
+            )
+            if options['derivados']:
+                self.encolar_derivados(categorias)
+            # bulk_create no envía post_save: se publica una única versión del catálogo
+            transaction.on_commit(invalidar_catalogo)
+
+        total = len(categorias) * options['escenas']
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(categorias)} categorías y {total} escenas creadas en {time.perf_counter() - inicio:.1f} s"
+        ))
+
+    def encolar_derivados(self, categorias):
+        tareas = [TareaImagen(modelo=CategoriaEscena._meta.label_lower, objeto_id=categoria.pk) for categoria in categorias]
+        tareas += [
+            TareaImagen(modelo=Escena360._meta.label_lower, objeto_id=pk)
+            for pk in Escena360.objects.filter(categoria__in=categorias).values_list('pk', flat=True)
+        ]
+        TareaImagen.objects.bulk_create(tareas)
+        self.stdout.write(f"{len(tareas)} tareas encoladas; ejecute run_cms_worker para procesarlas")
@@ -0,0 +1,100 @@
+"""
+Metadatos de las imágenes subidas: dimensiones, tamaño, formato y hash.
+
+Se leen una vez al guardar (solo la cabecera de la imagen y el tamaño del
+archivo) y se guardan en el modelo, de modo que el visor, la API y los
+comandos no necesitan abrir los archivos para conocerlos.
+"""
+
+import posixpath
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.images import get_image_dimensions
+from django.db import models
+from PIL import Image
+
+from .storage import LONGITUD_HASH, es_nombre_por_contenido, hash_contenido
+
+CONFIGURACION_POR_DEFECTO = {
+    # Diferencia relativa admitida entre el ancho y el doble del alto
+    'TOLERANCIA_PROPORCION': 0.01,
+    # Píxeles máximos de una imagen 360 (por defecto, 11584×5792)
+    'MAX_PIXELES': 8192 * 4096 * 2,
+}
+
+
+def obtener_configuracion():
+    """Devuelve la configuración de imágenes combinada con CMS_IMAGENES"""
+    return {**CONFIGURACION_POR_DEFECTO, **getattr(settings, 'CMS_IMAGENES', {})}
+
+
+class CampoImagen(models.ImageField):
+    """
+    ImageField que rellena ``width_field`` y ``height_field`` solo al asignar un archivo.
+
+    El ImageField de Django también lo intenta en ``post_init`` cuando las
+    dimensiones están vacías, lo que abre el archivo por cada fila cargada
+    (y falla si falta en disco); aquí las filas sin dimensiones se dejan al
+    comando ``completar_metadatos``.
+    """
+
+    def update_dimension_fields(self, instance, force=False, *args, **kwargs):
+        if force:
+            super().update_dimension_fields(instance, force=True, *args, **kwargs)
+
+
+def comprobar_panoramica(ancho, alto):
+    """Lanza ValidationError si la imagen 360 no es 2:1 o supera el presupuesto de píxeles"""
+    config = obtener_configuracion()
+    if abs(ancho - 2 * alto) > ancho * config['TOLERANCIA_PROPORCION']:
+        raise ValidationError(
+            "La imagen 360 debe ser equirectangular con proporción 2:1 (es %(ancho)d×%(alto)d).",
+            code='proporcion',
+            params={'ancho': ancho, 'alto': alto},
+        )
+    if ancho * alto > config['MAX_PIXELES']:
+        raise ValidationError(
+            "La imagen 360 tiene %(pixeles)s píxeles; el máximo es %(maximo)s.",
+            code='pixeles',
+            params={'pixeles': f'{ancho * alto:,}', 'maximo': f"{config['MAX_PIXELES']:,}"},
+        )
+
+
+def validar_panoramica(archivo):
+    """Validador del campo de imagen 360; solo comprueba las imágenes recién subidas"""
+    if getattr(archivo, '_committed', False):
+        # Ya está en el storage y se validó al subirla: al editar otros campos
+        # el formulario la reasigna y su archivo queda cerrado
+        return
+    ancho, alto = get_image_dimensions(archivo)
+    if ancho is None:
+        raise ValidationError("No se pudo leer la imagen.", code='invalida')
+    comprobar_panoramica(ancho, alto)
+
+
+def leer_metadatos(nombre, storage):
+    """
+    ``{'fuente', 'ancho', 'alto', 'bytes', 'formato', 'hash'}`` de un archivo del storage.
+
+    El hash son los primeros caracteres del SHA-256 del contenido, como en los
+    nombres por contenido: si el nombre ya lo es se toma de él sin leer el archivo.
+    """
+    with storage.open(nombre, 'rb') as archivo:
+        # Image.open solo lee la cabecera hasta que se piden los píxeles
+        with Image.open(archivo) as imagen:
+            ancho, alto = imagen.size
+            formato = imagen.format
+        if es_nombre_por_contenido(nombre):
+            digest = posixpath.splitext(posixpath.basename(nombre))[0]
+        else:
+            digest = hash_contenido(File(archivo))[:LONGITUD_HASH]
+    return {
+        'fuente': nombre,
+        'ancho': ancho,
+        'alto': alto,
+        'bytes': storage.size(nombre),
+        'formato': formato,
+        'hash': digest,
+    }
@@ -0,0 +1,193 @@
+"""
+Métricas de Prometheus de las peticiones, la base de datos, las plantillas y la caché.
+
+``MetricasMiddleware`` mide cada petición por vista: duración, consultas
+SQL y su tiempo, y tiempo de renderizado de plantillas, de modo que una
+carga lenta del visor se puede atribuir a la base de datos, a la plantilla
+o al media. ``/metrics`` las expone en el formato de texto de Prometheus.
+
+``prometheus_client`` es opcional: sin él el middleware se retira solo y
+``/metrics`` responde 404. Con varios procesos (gunicorn) hay que definir
+``PROMETHEUS_MULTIPROC_DIR`` para que ``/metrics`` sume los de todos.
+"""
+
+import os
+import re
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.backends.signals import connection_created
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:
+    prometheus_client = None
+
+CONFIGURACION_POR_DEFECTO = {
+    'ACTIVAS': True,
+    # Direcciones que pueden leer /metrics; None permite cualquiera
+    'IPS_PERMITIDAS': ['127.0.0.1', '::1'],
+}
+
+# Medición de la petición en curso; los hilos de sync_to_async heredan el contexto
+_peticion = ContextVar('cms_metricas_peticion', default=None)
+
+if prometheus_client is not None:
+    LATENCIA = prometheus_client.Histogram(
+        'cms_peticion_segundos', "Duración de las peticiones", ['vista', 'metodo', 'estado'],
+    )
+    CONSULTAS = prometheus_client.Histogram(
+        'cms_peticion_consultas', "Consultas SQL por petición", ['vista'],
+        buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144, float('inf')),
+    )
+    TIEMPO_CONSULTAS = prometheus_client.Histogram(
+        'cms_peticion_consultas_segundos', "Tiempo en la base de datos por petición", ['vista'],
+    )
+    TIEMPO_PLANTILLAS = prometheus_client.Histogram(
+        'cms_peticion_plantillas_segundos', "Tiempo de renderizado de plantillas por petición", ['vista'],
+    )
+    PLANTILLAS = prometheus_client.Histogram(
+        'cms_plantilla_segundos', "Duración de cada renderizado de plantilla", ['plantilla'],
+    )
+    CACHE = prometheus_client.Counter(
+        'cms_cache_catalogo', "Lecturas de las cachés del catálogo", ['cache', 'resultado'],
+    )
+    MEDIA_BYTES = prometheus_client.Counter(
+        'cms_media_bytes', "Bytes de media enviados", ['servidor'],
+    )
+
+
+def obtener_configuracion():
+    """Devuelve la configuración de métricas combinada con CMS_METRICAS"""
+    return {**CONFIGURACION_POR_DEFECTO, **getattr(settings, 'CMS_METRICAS', {})}
+
+
+def activas():
+    return prometheus_client is not None and obtener_configuracion()['ACTIVAS']
+
+
+def registrar_cache(clave, resultado):
+    """Cuenta una lectura de caché; los identificadores se quitan de la clave"""
+    if prometheus_client is not None:
+        CACHE.labels(re.sub(r':\d+$', '', clave), resultado).inc()
+
+
+def registrar_media(bytes_enviados, servidor):
+    if prometheus_client is not None and bytes_enviados:
+        MEDIA_BYTES.labels(servidor).inc(bytes_enviados)
+
+
+def medir_consulta(execute, sql, params, many, context):
+    """``execute_wrapper`` que suma las consultas a la petición en curso"""
+    medicion = _peticion.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion['consultas'] += 1
+        medicion['tiempo_consultas'] += time.perf_counter() - inicio
+
+
+def _instrumentar_conexion(sender, connection, **kwargs):
+    # El wrapper de la conexión sobrevive a las reconexiones
+    if medir_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(medir_consulta)
+
+
+def _instrumentar_plantillas():
+    """Mide los renderizados de primer nivel (render_to_string, TemplateResponse), sin los include"""
+    from django.template.backends.django import Template
+
+    original = Template.render
+    if getattr(original, 'medido', False):
+        return
+
+    @wraps(original)
+    def render(self, context=None, request=None):
+        inicio = time.perf_counter()
+        try:
+            return original(self, context, request)
+        finally:
+            duracion = time.perf_counter() - inicio
+            PLANTILLAS.labels(self.origin.template_name or '').observe(duracion)
+            medicion = _peticion.get()
+            if medicion is not None:
+                medicion['plantillas'] += duracion
+
+    render.medido = True
+    Template.render = render
+
+
+def instalar():
+    """Engancha la medición de consultas y plantillas; se llama desde ``CmsConfig.ready``"""
+    if not activas():
+        return
+    connection_created.connect(_instrumentar_conexion, dispatch_uid='cms_metricas_consultas')
+    _instrumentar_plantillas()
+
+
+def exponer():
+    """(contenido, content type) de /metrics"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registro = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+    else:
+        registro = prometheus_client.REGISTRY
+    return prometheus_client.generate_latest(registro), prometheus_client.CONTENT_TYPE_LATEST
+
+
+class MetricasMiddleware:
+    """Primer middleware de la pila: mide la petición completa por vista"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not activas():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        medicion, token = self.iniciar()
+        try:
+            respuesta = self.get_response(request)
+        finally:
+            _peticion.reset(token)
+        self.registrar(request, respuesta, medicion)
+        return respuesta
+
+    async def __acall__(self, request):
+        medicion, token = self.iniciar()
+        try:
+            respuesta = await self.get_response(request)
+        finally:
+            _peticion.reset(token)
+        self.registrar(request, respuesta, medicion)
+        return respuesta
+
+    def iniciar(self):
+        medicion = {'inicio': time.perf_counter(), 'consultas': 0, 'tiempo_consultas': 0.0, 'plantillas': 0.0}
+        return medicion, _peticion.set(medicion)
+
+    def registrar(self, request, respuesta, medicion):
+        duracion = time.perf_counter() - medicion['inicio']
+        # Las URLs sin vista comparten etiqueta para no crear una serie por ruta
+        coincidencia = getattr(request, 'resolver_match', None)
+        vista = coincidencia.view_name if coincidencia else 'sin_vista'
+        LATENCIA.labels(vista, request.method, str(respuesta.status_code)).observe(duracion)
+        CONSULTAS.labels(vista).observe(medicion['consultas'])
+        TIEMPO_CONSULTAS.labels(vista).observe(medicion['tiempo_consultas'])
+        TIEMPO_PLANTILLAS.labels(vista).observe(medicion['plantillas'])
+        if respuesta.status_code in (200, 206) and request.path.startswith(settings.MEDIA_URL):
+            registrar_media(int(respuesta.get('Content-Length') or 0), 'django')
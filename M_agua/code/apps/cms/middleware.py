@@ -0,0 +1,121 @@
+"""
+Pila de middleware ligera para las URLs públicas del CMS.
+
+El visor, la API, ``/metrics`` y el media son anónimos y de solo lectura:
+no usan la sesión, el usuario, los mensajes ni el token CSRF. Estas
+subclases de los middleware de Django no intervienen en los GET y HEAD a
+esas rutas, de modo que no se crea la sesión, no se prepara el usuario ni
+el almacén de mensajes y no se revisan sus cambios al responder. En el
+resto de rutas (el admin) y con los demás métodos se comportan igual que
+el original.
+
+Las rutas públicas son las de ``apps/cms/urls.py`` con el prefijo con que
+las incluye ``ROOT_URLCONF``, más ``MEDIA_URL``.
+
+``security.W003`` busca ``CsrfViewMiddleware`` por su ruta exacta y no
+reconoce la subclase; ``core/settings/base.py`` lo silencia y
+``comprobar_csrf`` lo sustituye admitiendo subclases.
+"""
+
+import re
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.core.checks import Tags, Warning, register
+from django.contrib.messages.middleware import MessageMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.middleware.csrf import CsrfViewMiddleware
+from django.urls import URLResolver, get_resolver
+from django.utils.module_loading import import_string
+
+URLCONF_PUBLICO = 'apps.cms.urls'
+
+METODOS_LIGEROS = ('GET', 'HEAD')
+
+
+@lru_cache
+def patron_publico(urlconf, media_url):
+    """
+    Expresión única de las rutas públicas, sin la barra inicial.
+
+    Combina las rutas de ``URLCONF_PUBLICO`` con el prefijo de su ``include``
+    y el prefijo de ``MEDIA_URL`` si el media es local.
+    """
+    alternativas = []
+    for incluido in get_resolver(urlconf).url_patterns:
+        modulo = getattr(incluido, 'urlconf_name', None)
+        if isinstance(incluido, URLResolver) and getattr(modulo, '__name__', modulo) == URLCONF_PUBLICO:
+            prefijo = incluido.pattern.regex.pattern.removeprefix('^')
+            alternativas += [prefijo + patron.pattern.regex.pattern.removeprefix('^') for patron in incluido.url_patterns]
+    if media_url and not urlsplit(media_url).netloc:
+        alternativas.append(re.escape(media_url.lstrip('/')))
+    # Los grupos con nombre se repetirían entre alternativas
+    alternativas = [re.sub(r'\(\?P<\w+>', '(?:', alternativa) for alternativa in alternativas]
+    return re.compile('|'.join(f'(?:{alternativa})' for alternativa in alternativas) or r'(?!)')
+
+
+def es_ruta_publica(ruta):
+    """Indica si ``ruta`` (``path_info``) es del visor público"""
+    # Los patrones de Django no llevan la barra inicial
+    return patron_publico(settings.ROOT_URLCONF, settings.MEDIA_URL).match(ruta, 1) is not None
+
+
+def pila_ligera(request):
+    """Indica si la petición se salta la sesión, el usuario, los mensajes y el CSRF; se calcula una vez"""
+    try:
+        return request.cms_pila_ligera
+    except AttributeError:
+        request.cms_pila_ligera = request.method in METODOS_LIGEROS and es_ruta_publica(request.path_info)
+        return request.cms_pila_ligera
+
+
+class LigeroEnRutasPublicasMixin:
+    """No interviene en las peticiones que van por la pila ligera"""
+
+    def __call__(self, request):
+        if pila_ligera(request):
+            # Bajo ASGI devuelve la corrutina del siguiente middleware, que se espera fuera
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class SesionMiddleware(LigeroEnRutasPublicasMixin, SessionMiddleware):
+    pass
+
+
+class CsrfMiddleware(LigeroEnRutasPublicasMixin, CsrfViewMiddleware):
+
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        # Django llama a process_view aparte de __call__
+        if pila_ligera(request):
+            return None
+        return super().process_view(request, callback, callback_args, callback_kwargs)
+
+
+class AutenticacionMiddleware(LigeroEnRutasPublicasMixin, AuthenticationMiddleware):
+    pass
+
+
+class MensajesMiddleware(LigeroEnRutasPublicasMixin, MessageMiddleware):
+    pass
+
+
+@register(Tags.security, deploy=True)
+def comprobar_csrf(app_configs, **kwargs):
+    """security.W003 que admite subclases de CsrfViewMiddleware, como ``CsrfMiddleware``"""
+    for ruta in settings.MIDDLEWARE:
+        try:
+            clase = import_string(ruta)
+        except ImportError:
+            continue
+        if isinstance(clase, type) and issubclass(clase, CsrfViewMiddleware):
+            return []
+    return [
+        Warning(
+            "Ningún middleware de MIDDLEWARE es CsrfViewMiddleware ni una subclase suya "
+            "(apps.cms.middleware.CsrfMiddleware): los formularios quedan sin protección CSRF.",
+            id='cms.W003',
+        )
+    ]
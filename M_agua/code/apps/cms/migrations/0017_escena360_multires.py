@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0016_escena360_video_youtube'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='escena360',
+            name='multires',
+            field=models.JSONField(blank=True, editable=False, help_text='Metadatos de la pirámide de teselas generada a partir de la imagen 360', null=True, verbose_name='Teselas multiresolución'),
+        ),
+    ]
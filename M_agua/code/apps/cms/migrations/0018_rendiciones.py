@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0017_escena360_multires'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categoriaescena',
+            name='rendiciones',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Variantes reducidas generadas a partir de las imágenes subidas', verbose_name='Rendiciones'),
+        ),
+        migrations.AddField(
+            model_name='escena360',
+            name='rendiciones',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Variantes reducidas generadas a partir de las imágenes subidas', verbose_name='Rendiciones'),
+        ),
+        migrations.AddField(
+            model_name='logocreador',
+            name='rendiciones',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Variantes reducidas generadas a partir de las imágenes subidas', verbose_name='Rendiciones'),
+        ),
+    ]
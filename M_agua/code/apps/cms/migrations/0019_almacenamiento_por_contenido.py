@@ -0,0 +1,44 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:06
+
+import apps.cms.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0018_rendiciones'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='categoriaescena',
+            name='icono',
+            field=models.ImageField(storage=apps.cms.storage.storage_contenido, upload_to='categorias/', verbose_name='Icono de la categoría'),
+        ),
+        migrations.AlterField(
+            model_name='categoriaescena',
+            name='imagen_fondo',
+            field=models.ImageField(blank=True, help_text='Imagen que se mostrará al seleccionar esta categoría (opcional)', null=True, storage=apps.cms.storage.storage_contenido, upload_to='categorias/', verbose_name='Imagen de fondo'),
+        ),
+        migrations.AlterField(
+            model_name='configuracioninterfaz',
+            name='imagen_fondo_descripcion',
+            field=models.ImageField(blank=True, help_text='Imagen de fondo para el panel de descripción lateral', null=True, storage=apps.cms.storage.storage_contenido, upload_to='config/', verbose_name='Imagen de fondo para descripción'),
+        ),
+        migrations.AlterField(
+            model_name='escena360',
+            name='icono',
+            field=models.ImageField(storage=apps.cms.storage.storage_contenido, upload_to='iconos/', verbose_name='Icono de la escena'),
+        ),
+        migrations.AlterField(
+            model_name='escena360',
+            name='imagen',
+            field=models.ImageField(storage=apps.cms.storage.storage_contenido, upload_to='escenas/', verbose_name='Imagen 360'),
+        ),
+        migrations.AlterField(
+            model_name='logocreador',
+            name='logo',
+            field=models.ImageField(storage=apps.cms.storage.storage_contenido, upload_to='logos/', verbose_name='Logo'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0019_almacenamiento_por_contenido'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='logocreador',
+            name='fecha_modificacion',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:12
+
+import apps.cms.storage
+from django.db import migrations, models
+
+
+def compilar_temas(apps, schema_editor):
+    """Compila la hoja de estilos de las configuraciones ya guardadas"""
+    from apps.cms.models import ConfiguracionInterfaz as Actual
+
+    ConfiguracionInterfaz = apps.get_model('cms', 'ConfiguracionInterfaz')
+    for historica in ConfiguracionInterfaz.objects.filter(tema_css='').iterator():
+        # La plantilla usa las propiedades del modelo actual; los campos que
+        # aún no existen en este punto toman su valor por defecto
+        config = Actual(**{
+            campo.attname: getattr(historica, campo.attname)
+            for campo in ConfiguracionInterfaz._meta.concrete_fields
+        })
+        config.actualizar_tema()
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0020_logocreador_fecha_modificacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='configuracioninterfaz',
+            name='tema_css',
+            field=models.FileField(blank=True, editable=False, help_text='CSS generado a partir de esta configuración, con nombre por contenido', storage=apps.cms.storage.storage_contenido, upload_to='tema/', verbose_name='Hoja de estilos del tema'),
+        ),
+        migrations.RunPython(compilar_temas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:23
+
+import apps.cms.youtube
+from django.db import migrations, models
+
+
+def extraer_videos(apps, schema_editor):
+    """Rellena el identificador y las URLs canónicas de las escenas existentes"""
+    from apps.cms.youtube import extraer_id_youtube, url_embed, url_watch
+
+    Escena360 = apps.get_model('cms', 'Escena360')
+    escenas = []
+    for escena in Escena360.objects.exclude(video_youtube='').only('pk', 'video_youtube').iterator():
+        video_id = extraer_id_youtube(escena.video_youtube)
+        if video_id:
+            escena.youtube_id = video_id
+            escena.youtube_embed_url = url_embed(video_id)
+            escena.youtube_watch_url = url_watch(video_id)
+            escenas.append(escena)
+    Escena360.objects.bulk_update(
+        escenas, ['youtube_id', 'youtube_embed_url', 'youtube_watch_url'], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0021_configuracioninterfaz_tema_css'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='escena360',
+            name='youtube_embed_url',
+            field=models.URLField(blank=True, editable=False, verbose_name='URL embebible del video'),
+        ),
+        migrations.AddField(
+            model_name='escena360',
+            name='youtube_id',
+            field=models.CharField(blank=True, editable=False, help_text='Extraído de la URL de YouTube al guardar; vacío si la escena no tiene video', max_length=11, verbose_name='Identificador del video'),
+        ),
+        migrations.AddField(
+            model_name='escena360',
+            name='youtube_watch_url',
+            field=models.URLField(blank=True, editable=False, verbose_name='URL del video en YouTube'),
+        ),
+        migrations.AlterField(
+            model_name='escena360',
+            name='video_youtube',
+            field=models.URLField(blank=True, help_text='URL del video de YouTube (ej: https://www.youtube.com/watch?v=VIDEO_ID)', validators=[apps.cms.youtube.validar_url_youtube], verbose_name='Video de YouTube (opcional)'),
+        ),
+        migrations.RunPython(extraer_videos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0022_escena360_youtube'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='categoriaescena',
+            index=models.Index(condition=models.Q(('activa', True)), fields=['orden', 'titulo'], name='cms_categoria_activa_orden'),
+        ),
+        migrations.AddIndex(
+            model_name='escena360',
+            index=models.Index(condition=models.Q(('activa', True)), fields=['categoria', 'orden', 'titulo'], name='cms_escena_activa_orden'),
+        ),
+        migrations.AddIndex(
+            model_name='logocreador',
+            index=models.Index(condition=models.Q(('activo', True)), fields=['orden', 'nombre'], name='cms_logo_activo_orden'),
+        ),
+    ]
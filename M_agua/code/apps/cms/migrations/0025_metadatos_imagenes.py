@@ -0,0 +1,125 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:47
+
+import apps.cms.metadatos
+import apps.cms.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0024_tareaimagen'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categoriaescena',
+            name='icono_alto',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Alto del icono (px)'),
+        ),
+        migrations.AddField(
+            model_name='categoriaescena',
+            name='icono_ancho',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Ancho del icono (px)'),
+        ),
+        migrations.AddField(
+            model_name='categoriaescena',
+            name='imagen_fondo_alto',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Alto de la imagen de fondo (px)'),
+        ),
+        migrations.AddField(
+            model_name='categoriaescena',
+            name='imagen_fondo_ancho',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Ancho de la imagen de fondo (px)'),
+        ),
+        migrations.AddField(
+            model_name='categoriaescena',
+            name='metadatos',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Tamaño en bytes, formato y hash de cada imagen subida', verbose_name='Metadatos de imagen'),
+        ),
+        migrations.AddField(
+            model_name='configuracioninterfaz',
+            name='imagen_fondo_descripcion_alto',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Alto de la imagen de fondo (px)'),
+        ),
+        migrations.AddField(
+            model_name='configuracioninterfaz',
+            name='imagen_fondo_descripcion_ancho',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Ancho de la imagen de fondo (px)'),
+        ),
+        migrations.AddField(
+            model_name='configuracioninterfaz',
+            name='metadatos',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Tamaño en bytes, formato y hash de cada imagen subida', verbose_name='Metadatos de imagen'),
+        ),
+        migrations.AddField(
+            model_name='escena360',
+            name='icono_alto',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Alto del icono (px)'),
+        ),
+        migrations.AddField(
+            model_name='escena360',
+            name='icono_ancho',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Ancho del icono (px)'),
+        ),
+        migrations.AddField(
+            model_name='escena360',
+            name='imagen_alto',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Alto de la imagen 360 (px)'),
+        ),
+        migrations.AddField(
+            model_name='escena360',
+            name='imagen_ancho',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Ancho de la imagen 360 (px)'),
+        ),
+        migrations.AddField(
+            model_name='escena360',
+            name='metadatos',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Tamaño en bytes, formato y hash de cada imagen subida', verbose_name='Metadatos de imagen'),
+        ),
+        migrations.AddField(
+            model_name='logocreador',
+            name='logo_alto',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Alto del logo (px)'),
+        ),
+        migrations.AddField(
+            model_name='logocreador',
+            name='logo_ancho',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Ancho del logo (px)'),
+        ),
+        migrations.AddField(
+            model_name='logocreador',
+            name='metadatos',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Tamaño en bytes, formato y hash de cada imagen subida', verbose_name='Metadatos de imagen'),
+        ),
+        migrations.AlterField(
+            model_name='categoriaescena',
+            name='icono',
+            field=apps.cms.metadatos.CampoImagen(height_field='icono_alto', storage=apps.cms.storage.storage_contenido, upload_to='categorias/', verbose_name='Icono de la categoría', width_field='icono_ancho'),
+        ),
+        migrations.AlterField(
+            model_name='categoriaescena',
+            name='imagen_fondo',
+            field=apps.cms.metadatos.CampoImagen(blank=True, height_field='imagen_fondo_alto', help_text='Imagen que se mostrará al seleccionar esta categoría (opcional)', null=True, storage=apps.cms.storage.storage_contenido, upload_to='categorias/', verbose_name='Imagen de fondo', width_field='imagen_fondo_ancho'),
+        ),
+        migrations.AlterField(
+            model_name='configuracioninterfaz',
+            name='imagen_fondo_descripcion',
+            field=apps.cms.metadatos.CampoImagen(blank=True, height_field='imagen_fondo_descripcion_alto', help_text='Imagen de fondo para el panel de descripción lateral', null=True, storage=apps.cms.storage.storage_contenido, upload_to='config/', verbose_name='Imagen de fondo para descripción', width_field='imagen_fondo_descripcion_ancho'),
+        ),
+        migrations.AlterField(
+            model_name='escena360',
+            name='icono',
+            field=apps.cms.metadatos.CampoImagen(height_field='icono_alto', storage=apps.cms.storage.storage_contenido, upload_to='iconos/', verbose_name='Icono de la escena', width_field='icono_ancho'),
+        ),
+        migrations.AlterField(
+            model_name='escena360',
+            name='imagen',
+            field=apps.cms.metadatos.CampoImagen(height_field='imagen_alto', help_text='Equirectangular con proporción 2:1', storage=apps.cms.storage.storage_contenido, upload_to='escenas/', validators=[apps.cms.metadatos.validar_panoramica], verbose_name='Imagen 360', width_field='imagen_ancho'),
+        ),
+        migrations.AlterField(
+            model_name='logocreador',
+            name='logo',
+            field=apps.cms.metadatos.CampoImagen(height_field='logo_alto', storage=apps.cms.storage.storage_contenido, upload_to='logos/', verbose_name='Logo', width_field='logo_ancho'),
+        ),
+    ]
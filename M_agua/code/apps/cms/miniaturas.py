@@ -0,0 +1,132 @@
+"""
+Rendiciones de tamaño fijo para iconos, logos e imágenes de categoría.
+
+Cada imagen subida se reduce a los tamaños con que la pinta el visor (1x y
+2x) en los formatos modernos disponibles (AVIF, WebP) más un respaldo JPEG,
+o PNG si la imagen tiene transparencia. Cada generación se guarda en su
+propio directorio bajo el nombre de la imagen original.
+"""
+
+import posixpath
+import uuid
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+from .multires import borrar_directorio_vacio
+
+
+CONFIGURACION_POR_DEFECTO = {
+    'DIRECTORIO': 'rendiciones',
+    'CALIDAD': 80,
+    # Cajas (ancho, alto) máximas por tipo de imagen, de 1x a 2x
+    'TAMANOS': {
+        'icono': ((80, 80), (160, 160)),
+        'logo': ((240, 50), (480, 100)),
+        'fondo': ((2048, 1024), (4096, 2048)),
+    },
+}
+
+TIPOS_MIME = {
+    'avif': 'image/avif',
+    'webp': 'image/webp',
+    'jpeg': 'image/jpeg',
+    'png': 'image/png',
+}
+
+EXTENSIONES = {'avif': 'avif', 'webp': 'webp', 'jpeg': 'jpg', 'png': 'png'}
+
+
+def obtener_configuracion():
+    """Devuelve la configuración de rendiciones combinada con CMS_MINIATURAS"""
+    return {**CONFIGURACION_POR_DEFECTO, **getattr(settings, 'CMS_MINIATURAS', {})}
+
+
+def formatos_modernos():
+    """Formatos modernos que soporta la instalación de Pillow, del más eficiente al menos"""
+    return [formato for formato in ('avif', 'webp') if features.check(formato)]
+
+
+def ruta_rendiciones(nombre_imagen):
+    """
+    Directorio nuevo (relativo al storage) para las rendiciones de una imagen.
+
+    Cada objeto y campo tiene el suyo aunque la imagen sea la misma, de modo
+    que borrar un objeto no deja sin iconos a otro que subió los mismos bytes.
+    """
+    base = posixpath.splitext(nombre_imagen)[0]
+    return posixpath.join(obtener_configuracion()['DIRECTORIO'], base, uuid.uuid4().hex[:12])
+
+
+def borrar_variantes(variantes, storage=default_storage):
+    """
+    Elimina los archivos de unas rendiciones y su directorio de generación.
+
+    Las rendiciones anteriores a los directorios por generación comparten
+    directorio entre objetos, así que solo se quita si queda vacío.
+    """
+    directorios = set()
+    for variante in variantes:
+        storage.delete(variante['nombre'])
+        directorios.add(posixpath.dirname(variante['nombre']))
+    for directorio in directorios:
+        borrar_directorio_vacio(directorio, storage)
+
+
+def _tiene_transparencia(imagen):
+    if imagen.mode in ('RGBA', 'LA'):
+        return imagen.getchannel('A').getextrema()[0] < 255
+    return imagen.mode == 'P' and 'transparency' in imagen.info
+
+
+def generar_rendiciones(nombre_imagen, tipo, storage=default_storage):
+    """
+    Genera las rendiciones de una imagen del storage.
+
+    Devuelve la lista de variantes ``{'nombre', 'ancho', 'alto', 'formato',
+    'densidad'}`` ordenada por densidad y con los formatos modernos antes que
+    el respaldo, que es el orden en que las consume ``image-set``.
+    """
+    config = obtener_configuracion()
+    with storage.open(nombre_imagen, 'rb') as archivo:
+        original = Image.open(archivo)
+        original.load()
+    original = ImageOps.exif_transpose(original)
+
+    transparente = _tiene_transparencia(original)
+    original = original.convert('RGBA' if transparente else 'RGB')
+    respaldo = 'png' if transparente else 'jpeg'
+
+    ruta = ruta_rendiciones(nombre_imagen)
+
+    variantes = []
+    tamanos_generados = set()
+    for densidad, caja in enumerate(config['TAMANOS'][tipo], start=1):
+        reducida = original.copy()
+        reducida.thumbnail(caja, Image.Resampling.LANCZOS)
+        if reducida.size in tamanos_generados:
+            # La original es más pequeña que la caja: no se amplía
+            continue
+        tamanos_generados.add(reducida.size)
+
+        ancho, alto = reducida.size
+        for formato in formatos_modernos() + [respaldo]:
+            buffer = BytesIO()
+            opciones = {'optimize': True} if formato in ('jpeg', 'png') else {}
+            if formato != 'png':
+                opciones['quality'] = config['CALIDAD']
+            reducida.save(buffer, formato.upper(), **opciones)
+            nombre = posixpath.join(ruta, f'{ancho}x{alto}.{EXTENSIONES[formato]}')
+            storage.save(nombre, ContentFile(buffer.getvalue()))
+            variantes.append({
+                'nombre': nombre,
+                'ancho': ancho,
+                'alto': alto,
+                'formato': formato,
+                'densidad': densidad,
+            })
+
+    return variantes
@@ -1,23 +1,210 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
 from django.db import models
+from django.template.loader import render_to_string
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .metadatos import CampoImagen, leer_metadatos, validar_panoramica
+from .miniaturas import TIPOS_MIME, borrar_variantes, generar_rendiciones
+from .multires import borrar_directorio, generar_multires
+from .storage import storage_contenido
+from .youtube import extraer_id_youtube, url_embed, url_watch, validar_url_youtube
+
+# Caracteres que no pueden aparecer literalmente dentro de un <script>
+_ESCAPES_JSON = {ord('<'): '\\u003C', ord('>'): '\\u003E', ord('&'): '\\u0026'}
+
 
-class CategoriaEscena(models.Model):
+class RendicionesMixin(models.Model):
+    """Rendiciones de tamaño fijo para los campos de imagen listados en CAMPOS_RENDICION"""
+    
+    # Campo de imagen -> tipo de rendición (ver miniaturas.CONFIGURACION_POR_DEFECTO)
+    CAMPOS_RENDICION = {}
+    
+    rendiciones = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name="Rendiciones",
+        help_text="Variantes reducidas generadas a partir de las imágenes subidas"
+    )
+    
+    class Meta:
+        abstract = True
+    
+    def actualizar_rendiciones(self, forzar=False):
+        """Regenera las rendiciones de los campos cuya imagen cambió"""
+        rendiciones = dict(self.rendiciones or {})
+        cambios = False
+        for campo, tipo in self.CAMPOS_RENDICION.items():
+            archivo = getattr(self, campo)
+            anterior = rendiciones.get(campo) or {}
+            if not forzar and anterior.get('fuente') == (archivo.name or None):
+                continue
+            
+            borrar_variantes(anterior.get('variantes', []))
+            if archivo:
+                rendiciones[campo] = {
+                    'fuente': archivo.name,
+                    'variantes': generar_rendiciones(archivo.name, tipo),
+                }
+            else:
+                rendiciones.pop(campo, None)
+            cambios = True
+        
+        if cambios:
+            self.rendiciones = rendiciones
+            type(self).objects.filter(pk=self.pk).update(rendiciones=rendiciones)
+        return cambios
+    
+    def rendiciones_pendientes(self):
+        """Indica si alguna imagen cambió desde que se generaron sus rendiciones"""
+        return any(
+            ((self.rendiciones or {}).get(campo) or {}).get('fuente') != (getattr(self, campo).name or None)
+            for campo in self.CAMPOS_RENDICION
+        )
+    
+    def get_rendiciones(self, campo):
+        """Variantes generadas para un campo; vacío si la imagen aún no se procesó"""
+        datos = (self.rendiciones or {}).get(campo) or {}
+        if datos.get('fuente') != getattr(self, campo).name:
+            return []
+        return datos.get('variantes', [])
+    
+    def get_srcset(self, campo, formato):
+        """Atributo srcset (descriptores 1x/2x) de un campo en un formato"""
+        return ", ".join(
+            f"{default_storage.url(variante['nombre'])} {variante['densidad']}x"
+            for variante in self.get_rendiciones(campo)
+            if variante['formato'] == formato
+        )
+    
+    def get_formatos_rendicion(self, campo):
+        """Formatos disponibles de un campo, el de respaldo al final"""
+        formatos = []
+        for variante in self.get_rendiciones(campo):
+            if variante['formato'] not in formatos:
+                formatos.append(variante['formato'])
+        return formatos
+    
+    def get_image_set(self, campo):
+        """Valor CSS image-set() con todas las variantes de un campo"""
+        candidatos = [
+            f"url('{default_storage.url(variante['nombre'])}') "
+            f"type('{TIPOS_MIME[variante['formato']]}') {variante['densidad']}x"
+            for variante in self.get_rendiciones(campo)
+        ]
+        if not candidatos:
+            return ""
+        return f"image-set({', '.join(candidatos)})"
+    
+    def get_url_rendicion(self, campo):
+        """URL de la rendición de respaldo más grande, o de la imagen original"""
+        variantes = self.get_rendiciones(campo)
+        if variantes:
+            return default_storage.url(variantes[-1]['nombre'])
+        archivo = getattr(self, campo)
+        return archivo.url if archivo else ""
+
+    def get_url_miniatura(self, campo):
+        """URL de la rendición de respaldo más pequeña (1x), o de la imagen original"""
+        variantes = self.get_rendiciones(campo)
+        if variantes:
+            respaldo = variantes[-1]['formato']
+            return default_storage.url(next(v['nombre'] for v in variantes if v['formato'] == respaldo))
+        archivo = getattr(self, campo)
+        return archivo.url if archivo else ""
+
+
+class MetadatosMixin(models.Model):
+    """Dimensiones, tamaño, formato y hash de cada campo de imagen, leídos al guardar"""
+    
+    metadatos = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name="Metadatos de imagen",
+        help_text="Tamaño en bytes, formato y hash de cada imagen subida"
+    )
+    
+    class Meta:
+        abstract = True
+    
+    @classmethod
+    def campos_imagen(cls):
+        return [campo for campo in cls._meta.fields if isinstance(campo, models.ImageField)]
+    
+    def actualizar_metadatos(self, forzar=False):
+        """Lee los metadatos de las imágenes que cambiaron; las dimensiones van a sus columnas"""
+        metadatos = dict(self.metadatos or {})
+        cambios = {}
+        for campo in self.campos_imagen():
+            archivo = getattr(self, campo.name)
+            anterior = metadatos.get(campo.name) or {}
+            completo = getattr(self, campo.width_field) is not None or not archivo
+            if not forzar and completo and anterior.get('fuente') == (archivo.name or None):
+                continue
+            
+            if archivo:
+                datos = leer_metadatos(archivo.name, campo.storage)
+                metadatos[campo.name] = datos
+                cambios[campo.width_field] = datos['ancho']
+                cambios[campo.height_field] = datos['alto']
+            else:
+                metadatos.pop(campo.name, None)
+                cambios[campo.width_field] = cambios[campo.height_field] = None
+        
+        if not cambios:
+            return False
+        for nombre, valor in cambios.items():
+            setattr(self, nombre, valor)
+        self.metadatos = metadatos
+        type(self).objects.filter(pk=self.pk).update(metadatos=metadatos, **cambios)
+        return True
+    
+    def get_metadatos(self, campo):
+        """Metadatos de un campo; vacío si la imagen aún no se leyó"""
+        datos = (self.metadatos or {}).get(campo) or {}
+        if datos.get('fuente') != getattr(self, campo).name:
+            return {}
+        return datos
+
+
+class CategoriaEscena(MetadatosMixin, RendicionesMixin, models.Model):
     """Categoría para agrupar escenas 360"""
     titulo = models.CharField(max_length=200, verbose_name="Título de la categoría")
-    icono = models.ImageField(upload_to='categorias/', verbose_name="Icono de la categoría")
+    icono = CampoImagen(
+        upload_to='categorias/',
+        storage=storage_contenido,
+        width_field='icono_ancho',
+        height_field='icono_alto',
+        verbose_name="Icono de la categoría"
+    )
+    icono_ancho = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name="Ancho del icono (px)")
+    icono_alto = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name="Alto del icono (px)")
     color_fondo = models.CharField(
         max_length=7,
         default="#ffffff",
         verbose_name="Color de fondo",
         help_text="Color hexadecimal (ej: #ffffff para blanco)"
     )
-    imagen_fondo = models.ImageField(
+    imagen_fondo = CampoImagen(
         upload_to='categorias/',
+        storage=storage_contenido,
+        width_field='imagen_fondo_ancho',
+        height_field='imagen_fondo_alto',
         blank=True,
         null=True,
         verbose_name="Imagen de fondo",
         help_text="Imagen que se mostrará al seleccionar esta categoría (opcional)"
     )
+    imagen_fondo_ancho = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name="Ancho de la imagen de fondo (px)")
+    imagen_fondo_alto = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name="Alto de la imagen de fondo (px)")
     orden = models.IntegerField(default=0, verbose_name="Orden de visualización")
     activa = models.BooleanField(default=True, verbose_name="Categoría activa")
     fecha_creacion = models.DateTimeField(auto_now_add=True)
@@ -27,12 +214,23 @@ class CategoriaEscena(models.Model):
         verbose_name = "Categoría de Escena"
         verbose_name_plural = "Categorías de Escenas"
         ordering = ['orden', 'titulo']
+        indexes = [
+            # Índices parciales sobre las filas visibles; Django los omite en los
+            # backends que no los soportan
+            models.Index(
+                fields=['orden', 'titulo'],
+                condition=models.Q(activa=True),
+                name='cms_categoria_activa_orden',
+            ),
+        ]
+    
+    CAMPOS_RENDICION = {'icono': 'icono', 'imagen_fondo': 'fondo'}
     
     def __str__(self):
         return self.titulo
 
 
-class Escena360(models.Model):
+class Escena360(MetadatosMixin, RendicionesMixin, models.Model):
     """Escena 360 individual"""
     categoria = models.ForeignKey(
         CategoriaEscena,
@@ -42,15 +240,50 @@ class Escena360(models.Model):
     )
     titulo = models.CharField(max_length=200, verbose_name="Título de la escena")
     descripcion = models.TextField(blank=True, verbose_name="Descripción")
-    imagen = models.ImageField(upload_to='escenas/', verbose_name="Imagen 360")
-    icono = models.ImageField(upload_to='iconos/', verbose_name="Icono de la escena")
+    imagen = CampoImagen(
+        upload_to='escenas/',
+        storage=storage_contenido,
+        width_field='imagen_ancho',
+        height_field='imagen_alto',
+        validators=[validar_panoramica],
+        verbose_name="Imagen 360",
+        help_text="Equirectangular con proporción 2:1"
+    )
+    imagen_ancho = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name="Ancho de la imagen 360 (px)")
+    imagen_alto = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name="Alto de la imagen 360 (px)")
+    icono = CampoImagen(
+        upload_to='iconos/',
+        storage=storage_contenido,
+        width_field='icono_ancho',
+        height_field='icono_alto',
+        verbose_name="Icono de la escena"
+    )
+    icono_ancho = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name="Ancho del icono (px)")
+    icono_alto = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name="Alto del icono (px)")
     video_youtube = models.URLField(
         blank=True,
+        validators=[validar_url_youtube],
         verbose_name="Video de YouTube (opcional)",
         help_text="URL del video de YouTube (ej: https://www.youtube.com/watch?v=VIDEO_ID)"
     )
+    youtube_id = models.CharField(
+        max_length=11,
+        blank=True,
+        editable=False,
+        verbose_name="Identificador del video",
+        help_text="Extraído de la URL de YouTube al guardar; vacío si la escena no tiene video"
+    )
+    youtube_embed_url = models.URLField(blank=True, editable=False, verbose_name="URL embebible del video")
+    youtube_watch_url = models.URLField(blank=True, editable=False, verbose_name="URL del video en YouTube")
     orden = models.IntegerField(default=0, verbose_name="Orden de visualización")
     activa = models.BooleanField(default=True, verbose_name="Escena activa")
+    multires = models.JSONField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="Teselas multiresolución",
+        help_text="Metadatos de la pirámide de teselas generada a partir de la imagen 360"
+    )
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     fecha_modificacion = models.DateTimeField(auto_now=True)
     
@@ -58,64 +291,108 @@ class Escena360(models.Model):
         verbose_name = "Escena 360"
         verbose_name_plural = "Escenas 360"
         ordering = ['categoria', 'orden', 'titulo']
+        indexes = [
+            # Escenas visibles de una o varias categorías ya en el orden del visor
+            models.Index(
+                fields=['categoria', 'orden', 'titulo'],
+                condition=models.Q(activa=True),
+                name='cms_escena_activa_orden',
+            ),
+        ]
+    
+    CAMPOS_RENDICION = {'icono': 'icono'}
     
     def __str__(self):
         return f"{self.categoria.titulo} - {self.titulo}"
     
-    def get_youtube_embed_url(self):
-        """Convierte URL de YouTube a formato embed"""
-        if not self.video_youtube:
-            return None
-        
-        video_id = None
-        if 'youtube.com/watch?v=' in self.video_youtube:
-            video_id = self.video_youtube.split('watch?v=')[1].split('&')[0]
-        elif 'youtu.be/' in self.video_youtube:
-            video_id = self.video_youtube.split('youtu.be/')[1].split('?')[0]
-        elif 'youtube.com/embed/' in self.video_youtube:
-            video_id = self.video_youtube.split('embed/')[1].split('?')[0]
+    def actualizar_multires(self, forzar=False):
+        """Regenera las teselas multiresolución si la imagen 360 cambió"""
+        anterior = self.multires or {}
+        if not forzar and anterior.get('fuente') == (self.imagen.name or None):
+            return False
         
-        if video_id:
-            return f"https://www.youtube.com/embed/{video_id}"
-        return None
+        if anterior.get('ruta'):
+            borrar_directorio(anterior['ruta'])
+        self.multires = generar_multires(self.imagen.name) if self.imagen else None
+        Escena360.objects.filter(pk=self.pk).update(multires=self.multires)
+        return True
     
-    def get_youtube_watch_url(self):
-        """Obtiene la URL directa de YouTube para abrir en nueva pestaña"""
-        if not self.video_youtube:
+    def multires_pendiente(self):
+        """Indica si la imagen 360 cambió desde que se generaron las teselas"""
+        return (self.multires or {}).get('fuente') != (self.imagen.name or None)
+    
+    def get_multires_config(self):
+        """Configuración 'multiRes' de Pannellum, o None si no hay teselas de la imagen actual"""
+        if not self.multires or 'ruta' not in self.multires or self.multires_pendiente():
             return None
-        
-        video_id = None
-        if 'youtube.com/watch?v=' in self.video_youtube:
-            return self.video_youtube
-        elif 'youtu.be/' in self.video_youtube:
-            video_id = self.video_youtube.split('youtu.be/')[1].split('?')[0]
-        elif 'youtube.com/embed/' in self.video_youtube:
-            video_id = self.video_youtube.split('embed/')[1].split('?')[0]
-        
-        if video_id:
-            return f"https://www.youtube.com/watch?v={video_id}"
-        return self.video_youtube
+        config = {clave: valor for clave, valor in self.multires.items() if clave not in ('fuente', 'ruta')}
+        config['basePath'] = default_storage.url(self.multires['ruta'])
+        return config
+    
+    def get_multires_json(self):
+        """Configuración multires serializada para incrustar en un <script>"""
+        return json.dumps(self.get_multires_config()).translate(_ESCAPES_JSON)
+    
+    def save(self, *args, **kwargs):
+        self.actualizar_youtube()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'video_youtube' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'youtube_id', 'youtube_embed_url', 'youtube_watch_url'}
+        super().save(*args, **kwargs)
+    
+    def actualizar_youtube(self):
+        """Calcula el identificador y las URLs canónicas del video a partir de video_youtube"""
+        video_id = extraer_id_youtube(self.video_youtube)
+        self.youtube_id = video_id or ''
+        self.youtube_embed_url = url_embed(video_id) if video_id else ''
+        self.youtube_watch_url = url_watch(video_id) if video_id else ''
+    
+    def get_youtube_embed_url(self):
+        """URL embed del video, calculada al guardar"""
+        return self.youtube_embed_url or None
+    
+    def get_youtube_watch_url(self):
+        """URL directa de YouTube para abrir en nueva pestaña, calculada al guardar"""
+        return self.youtube_watch_url or None
 
 
-class LogoCreador(models.Model):
+class LogoCreador(MetadatosMixin, RendicionesMixin, models.Model):
     """Logos de los creadores que aparecen en la parte superior"""
     nombre = models.CharField(max_length=200, verbose_name="Nombre del creador")
-    logo = models.ImageField(upload_to='logos/', verbose_name="Logo")
+    logo = CampoImagen(
+        upload_to='logos/',
+        storage=storage_contenido,
+        width_field='logo_ancho',
+        height_field='logo_alto',
+        verbose_name="Logo"
+    )
+    logo_ancho = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name="Ancho del logo (px)")
+    logo_alto = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name="Alto del logo (px)")
     url = models.URLField(blank=True, verbose_name="URL (opcional)", help_text="Enlace al hacer clic en el logo")
     orden = models.IntegerField(default=0, verbose_name="Orden de visualización")
     activo = models.BooleanField(default=True, verbose_name="Logo activo")
     fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_modificacion = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name = "Logo de Creador"
         verbose_name_plural = "Logos de Creadores"
         ordering = ['orden', 'nombre']
+        indexes = [
+            models.Index(
+                fields=['orden', 'nombre'],
+                condition=models.Q(activo=True),
+                name='cms_logo_activo_orden',
+            ),
+        ]
+    
+    CAMPOS_RENDICION = {'logo': 'logo'}
     
     def __str__(self):
         return self.nombre
 
 
-class ConfiguracionInterfaz(models.Model):
+class ConfiguracionInterfaz(MetadatosMixin, models.Model):
     """Configuración de colores y fondos de la interfaz"""
     
     FUENTES_CHOICES = [
@@ -161,13 +438,18 @@ class ConfiguracionInterfaz(models.Model):
         verbose_name="Usar imagen de fondo en descripción",
         help_text="Si está activado, se usará la imagen en lugar del color"
     )
-    imagen_fondo_descripcion = models.ImageField(
+    imagen_fondo_descripcion = CampoImagen(
         upload_to='config/',
+        storage=storage_contenido,
+        width_field='imagen_fondo_descripcion_ancho',
+        height_field='imagen_fondo_descripcion_alto',
         blank=True,
         null=True,
         verbose_name="Imagen de fondo para descripción",
         help_text="Imagen de fondo para el panel de descripción lateral"
     )
+    imagen_fondo_descripcion_ancho = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name="Ancho de la imagen de fondo (px)")
+    imagen_fondo_descripcion_alto = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name="Alto de la imagen de fondo (px)")
     color_descripcion = models.CharField(
         max_length=7,
         default="#ffffff",
@@ -226,6 +508,15 @@ class ConfiguracionInterfaz(models.Model):
         help_text="0 = transparente, 100 = opaco"
     )
     
+    tema_css = models.FileField(
+        upload_to='tema/',
+        storage=storage_contenido,
+        blank=True,
+        editable=False,
+        verbose_name="Hoja de estilos del tema",
+        help_text="CSS generado a partir de esta configuración, con nombre por contenido"
+    )
+    
     fecha_modificacion = models.DateTimeField(auto_now=True)
     
     class Meta:
@@ -235,21 +526,149 @@ class ConfiguracionInterfaz(models.Model):
     def __str__(self):
         return "Configuración de Interfaz"
     
+    # Copia en memoria del proceso: (versión del catálogo, instancia)
+    _cache_local = None
+    
+    @classmethod
+    def get_solo(cls):
+        """
+        Devuelve la configuración única, o una sin guardar con los valores por defecto.
+        
+        La instancia se guarda en memoria del proceso y en la caché compartida
+        bajo la versión vigente del catálogo; como guardar la configuración
+        publica una versión nueva, ningún proceso sigue usando una copia vieja.
+        """
+        from .cache import version_catalogo
+        
+        version = version_catalogo()
+        local = cls._cache_local
+        if local is not None and local[0] == version:
+            return local[1]
+        
+        clave = f'cms:configuracion:{version}'
+        config = cache.get(clave)
+        if config is None:
+            # Sin configuración guardada se usan los valores por defecto: un GET no escribe
+            config = cls.objects.order_by('pk').first() or cls()
+            config.precalcular()
+            cache.set(clave, config, None)
+        
+        cls._cache_local = (version, config)
+        return config
+    
+    @classmethod
+    async def aget_solo(cls):
+        """Versión asíncrona de ``get_solo``; sin consultas si la copia local está al día"""
+        from .cache import aversion_catalogo
+        
+        version = await aversion_catalogo()
+        local = cls._cache_local
+        if local is not None and local[0] == version:
+            return local[1]
+        return await sync_to_async(cls.get_solo)()
+    
+    @classmethod
+    def limpiar_cache(cls):
+        """Olvida la copia en memoria del proceso"""
+        cls._cache_local = None
+    
     def save(self, *args, **kwargs):
         if not self.pk and ConfiguracionInterfaz.objects.exists():
             raise ValueError("Solo puede existir una configuración de interfaz")
         super().save(*args, **kwargs)
+        for valor in ('rgba_descripcion', 'rgba_logos'):
+            self.__dict__.pop(valor, None)
+        ConfiguracionInterfaz.limpiar_cache()
     
-    def get_rgba_descripcion(self):
-        """Convierte el color hex y transparencia a rgba"""
-        hex_color = self.color_descripcion.lstrip('#')
+    def actualizar_tema(self):
+        """Compila la hoja de estilos del tema; el nombre cambia solo si cambia el CSS"""
+        css = render_to_string('cms/tema.css', {'config': self})
+        anterior = self.tema_css.name
+        self.tema_css.save('visor360-tema.css', ContentFile(css.encode()), save=False)
+        if self.tema_css.name != anterior:
+            ConfiguracionInterfaz.objects.filter(pk=self.pk).update(tema_css=self.tema_css.name)
+            if anterior:
+                self.tema_css.storage.delete(anterior)
+            return True
+        return False
+    
+    def precalcular(self):
+        """Calcula los valores derivados para que viajen con la instancia cacheada"""
+        self.rgba_descripcion
+        self.rgba_logos
+    
+    @staticmethod
+    def _hex_a_rgba(color, transparencia):
+        hex_color = color.lstrip('#')
         r, g, b = tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
-        alpha = self.transparencia_descripcion / 100
+        alpha = transparencia / 100
         return f"rgba({r}, {g}, {b}, {alpha})"
     
+    @cached_property
+    def rgba_descripcion(self):
+        return self._hex_a_rgba(self.color_descripcion, self.transparencia_descripcion)
+    
+    @cached_property
+    def rgba_logos(self):
+        return self._hex_a_rgba(self.color_logos, self.transparencia_logos)
+    
+    def get_rgba_descripcion(self):
+        """Convierte el color hex y transparencia a rgba"""
+        return self.rgba_descripcion
+    
     def get_rgba_logos(self):
         """Convierte el color hex y transparencia a rgba"""
-        hex_color = self.color_logos.lstrip('#')
-        r, g, b = tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
-        alpha = self.transparencia_logos / 100
-        return f"rgba({r}, {g}, {b}, {alpha})"
\ No newline at end of file
+        return self.rgba_logos
+
+
+class TareaImagen(models.Model):
+    """Generación en segundo plano de los derivados de imagen de un objeto del catálogo"""
+    
+    PENDIENTE = 'pendiente'
+    EN_PROCESO = 'en_proceso'
+    COMPLETADA = 'completada'
+    FALLIDA = 'fallida'
+    ESTADOS_CHOICES = [
+        (PENDIENTE, 'Pendiente'),
+        (EN_PROCESO, 'En proceso'),
+        (COMPLETADA, 'Completada'),
+        (FALLIDA, 'Fallida'),
+    ]
+    
+    modelo = models.CharField(max_length=100, verbose_name="Modelo", help_text="Etiqueta app.modelo del objeto")
+    objeto_id = models.PositiveBigIntegerField(verbose_name="ID del objeto")
+    estado = models.CharField(max_length=20, choices=ESTADOS_CHOICES, default=PENDIENTE, verbose_name="Estado")
+    intentos = models.PositiveSmallIntegerField(default=0, verbose_name="Intentos")
+    disponible_desde = models.DateTimeField(
+        default=timezone.now,
+        verbose_name="Disponible desde",
+        help_text="Un trabajador no la toma antes de esta fecha (espera entre reintentos)"
+    )
+    trabajador = models.CharField(max_length=100, blank=True, verbose_name="Trabajador")
+    error = models.TextField(blank=True, verbose_name="Último error")
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_inicio = models.DateTimeField(null=True, blank=True, verbose_name="Inicio")
+    fecha_fin = models.DateTimeField(null=True, blank=True, verbose_name="Fin")
+    
+    class Meta:
+        verbose_name = "Tarea de imagen"
+        verbose_name_plural = "Tareas de imagen"
+        ordering = ['-fecha_creacion']
+        indexes = [
+            # La cola: pendientes por orden de llegada
+            models.Index(
+                fields=['disponible_desde', 'id'],
+                condition=models.Q(estado='pendiente'),
+                name='cms_tarea_pendiente',
+            ),
+            models.Index(fields=['modelo', 'objeto_id'], name='cms_tarea_objeto'),
+        ]
+    
+    def __str__(self):
+        return f"{self.modelo} {self.objeto_id} ({self.get_estado_display()})"
+    
+    def get_objeto(self):
+        """Objeto a procesar, o None si se borró mientras esperaba"""
+        from django.apps import apps
+        
+        return apps.get_model(self.modelo).objects.filter(pk=self.objeto_id).first()
@@ -0,0 +1,246 @@
+"""
+Generación de teselas multiresolución para Pannellum.
+
+Corta una imagen equirectangular en las seis caras de un cubo y cada cara en
+una pirámide de teselas con el formato "multires" de Pannellum, de modo que
+el visor pinte primero unas pocas teselas de baja resolución en lugar de
+descargar la panorámica completa.
+"""
+
+import math
+import os
+import posixpath
+import uuid
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+# Letras de cara que usa Pannellum: frente, derecha, atrás, izquierda, arriba, abajo
+CARAS = ('f', 'r', 'b', 'l', 'u', 'd')
+
+CONFIGURACION_POR_DEFECTO = {
+    'TAMANO_TESELA': 512,
+    'TAMANO_RESPALDO': 1024,
+    'CALIDAD': 85,
+    'TOLERANCIA_PROPORCION': 0.01,
+    'DIRECTORIO': 'multires',
+}
+
+
+def obtener_configuracion():
+    """Devuelve la configuración de teselado combinada con CMS_MULTIRES"""
+    return {**CONFIGURACION_POR_DEFECTO, **getattr(settings, 'CMS_MULTIRES', {})}
+
+
+def ruta_teselas(nombre_imagen):
+    """
+    Directorio nuevo (relativo al storage) para las teselas de una imagen.
+
+    Con nombres por contenido, varias escenas pueden compartir la misma
+    imagen; cada generación escribe en su propio subdirectorio para que
+    borrar o regenerar las teselas de una no toque las de las demás.
+    """
+    base = posixpath.splitext(nombre_imagen)[0]
+    return posixpath.join(obtener_configuracion()['DIRECTORIO'], base, uuid.uuid4().hex[:12])
+
+
+def borrar_directorio(ruta, storage=default_storage):
+    """Elimina recursivamente un directorio del storage usando solo su API pública"""
+    try:
+        directorios, archivos = storage.listdir(ruta)
+    except FileNotFoundError:
+        return
+    for archivo in archivos:
+        storage.delete(posixpath.join(ruta, archivo))
+    for directorio in directorios:
+        borrar_directorio(posixpath.join(ruta, directorio), storage)
+    borrar_directorio_vacio(ruta, storage)
+
+
+def borrar_directorio_vacio(ruta, storage=default_storage):
+    """
+    Elimina un directorio vacío del storage.
+
+    Solo los storages locales tienen directorios; en los demás, o si el
+    directorio aún guarda archivos de otro objeto, no hace nada.
+    """
+    try:
+        os.rmdir(storage.path(ruta))
+    except (NotImplementedError, OSError):
+        pass
+
+
+def _direccion(cara, u, v):
+    """Vector de vista para la coordenada (u, v) en [-1, 1] de una cara del cubo"""
+    if cara == 'f':
+        return u, -v, 1.0
+    if cara == 'r':
+        return 1.0, -v, -u
+    if cara == 'b':
+        return -u, -v, -1.0
+    if cara == 'l':
+        return -1.0, -v, u
+    if cara == 'u':
+        return u, 1.0, v
+    return u, -1.0, -v
+
+
+def _angulos(cara, u, v):
+    """Devuelve (yaw, pitch) de un punto de la cara; yaw es None en los polos"""
+    x, y, z = _direccion(cara, u, v)
+    horizontal = math.hypot(x, z)
+    pitch = math.atan2(y, horizontal)
+    if horizontal < 1e-9:
+        return None, pitch
+    return math.atan2(x, z), pitch
+
+
+def _proyectar_cara(fuente, ancho, alto, cara, tamano):
+    """
+    Proyecta una cara del cubo desde la equirectangular extendida.
+
+    Usa una transformación MESH de Pillow: la cara se divide en una rejilla
+    y cada celda se aproxima con el cuadrilátero correspondiente en la
+    imagen fuente, lo que evita depender de numpy o de herramientas externas.
+    """
+    divisiones = max(8, (tamano // 32) // 2 * 2)
+    vertices = [
+        [
+            _angulos(cara, 2 * j / divisiones - 1, 2 * i / divisiones - 1)
+            for j in range(divisiones + 1)
+        ]
+        for i in range(divisiones + 1)
+    ]
+
+    malla = []
+    for i in range(divisiones):
+        for j in range(divisiones):
+            caja = (
+                round(j * tamano / divisiones),
+                round(i * tamano / divisiones),
+                round((j + 1) * tamano / divisiones),
+                round((i + 1) * tamano / divisiones),
+            )
+            # Orden de Pillow: superior izquierda, inferior izquierda,
+            # inferior derecha, superior derecha
+            esquinas = [vertices[i][j], vertices[i + 1][j], vertices[i + 1][j + 1], vertices[i][j + 1]]
+            yaws = [yaw for yaw, _ in esquinas]
+            conocidos = [yaw for yaw in yaws if yaw is not None]
+            if max(conocidos) - min(conocidos) > math.pi:
+                # La celda cruza la costura de ±180°: se desenrolla hacia la copia derecha
+                yaws = [yaw + 2 * math.pi if yaw is not None and yaw < 0 else yaw for yaw in yaws]
+                conocidos = [yaw for yaw in yaws if yaw is not None]
+            # En el polo el yaw no está definido; se usa el de sus vecinos
+            medio = sum(conocidos) / len(conocidos)
+            cuadrilatero = []
+            for yaw, (_, pitch) in zip(yaws, esquinas):
+                if yaw is None:
+                    yaw = medio
+                cuadrilatero.append((yaw / (2 * math.pi) + 0.5) * ancho)
+                cuadrilatero.append((0.5 - pitch / math.pi) * alto)
+            malla.append((caja, cuadrilatero))
+
+    return fuente.transform((tamano, tamano), Image.Transform.MESH, malla, Image.Resampling.BILINEAR)
+
+
+def _guardar_jpeg(imagen, ruta, calidad, storage):
+    buffer = BytesIO()
+    imagen.save(buffer, 'JPEG', quality=calidad, optimize=True)
+    storage.save(ruta, ContentFile(buffer.getvalue()))
+
+
+def calcular_niveles(tamano_cubo, tamano_tesela):
+    """Número de niveles de la pirámide, con el mismo criterio que generate.py de Pannellum"""
+    if tamano_cubo <= tamano_tesela:
+        return 1
+    niveles = int(math.ceil(math.log(tamano_cubo / tamano_tesela, 2))) + 1
+    if round(tamano_cubo / 2 ** (niveles - 2)) == tamano_tesela:
+        niveles -= 1
+    return niveles
+
+
+def teselas_base(multires):
+    """Rutas de las teselas del nivel 1, las primeras que pide Pannellum de cada cara"""
+    tamano = multires['cubeResolution']
+    for _ in range(multires['maxLevel'] - 1):
+        tamano = int(tamano / 2)
+    teselas = int(math.ceil(tamano / multires['tileResolution']))
+    return [
+        posixpath.join(multires['ruta'], '1', f'{cara}{fila}_{columna}.jpg')
+        for cara in CARAS
+        for fila in range(teselas)
+        for columna in range(teselas)
+    ]
+
+
+def generar_multires(nombre_imagen, storage=default_storage):
+    """
+    Genera la pirámide de teselas de una imagen equirectangular del storage.
+
+    Devuelve el diccionario de metadatos que se guarda en
+    ``Escena360.multires``; si la imagen no tiene proporción 2:1 solo se
+    registra la fuente y el visor sigue usando la imagen completa.
+    """
+    config = obtener_configuracion()
+    with storage.open(nombre_imagen, 'rb') as archivo:
+        imagen = Image.open(archivo)
+        imagen.load()
+
+    ancho, alto = imagen.size
+    if abs(ancho - 2 * alto) > ancho * config['TOLERANCIA_PROPORCION']:
+        return {'fuente': nombre_imagen}
+
+    imagen = imagen.convert('RGB')
+    tamano_cubo = max(8, 8 * int(ancho / math.pi / 8))
+    tamano_tesela = min(config['TAMANO_TESELA'], tamano_cubo)
+    niveles = calcular_niveles(tamano_cubo, tamano_tesela)
+    tamano_respaldo = min(config['TAMANO_RESPALDO'], tamano_cubo)
+
+    # Copia horizontal de la panorámica para que las celdas que cruzan la
+    # costura de ±180° tengan píxeles contiguos a la derecha
+    fuente = Image.new('RGB', (ancho * 2, alto))
+    fuente.paste(imagen, (0, 0))
+    fuente.paste(imagen, (ancho, 0))
+
+    ruta = ruta_teselas(nombre_imagen)
+
+    for cara in CARAS:
+        imagen_cara = _proyectar_cara(fuente, ancho, alto, cara, tamano_cubo)
+        tamano = tamano_cubo
+        for nivel in range(niveles, 0, -1):
+            nivel_cara = imagen_cara if tamano == tamano_cubo else imagen_cara.resize(
+                (tamano, tamano), Image.Resampling.LANCZOS
+            )
+            teselas = int(math.ceil(tamano / tamano_tesela))
+            for fila in range(teselas):
+                for columna in range(teselas):
+                    tesela = nivel_cara.crop((
+                        columna * tamano_tesela,
+                        fila * tamano_tesela,
+                        min((columna + 1) * tamano_tesela, tamano),
+                        min((fila + 1) * tamano_tesela, tamano),
+                    ))
+                    _guardar_jpeg(
+                        tesela,
+                        posixpath.join(ruta, str(nivel), f'{cara}{fila}_{columna}.jpg'),
+                        config['CALIDAD'],
+                        storage,
+                    )
+            tamano = int(tamano / 2)
+
+        respaldo = imagen_cara.resize((tamano_respaldo, tamano_respaldo), Image.Resampling.LANCZOS)
+        _guardar_jpeg(respaldo, posixpath.join(ruta, 'fallback', f'{cara}.jpg'), config['CALIDAD'], storage)
+
+    return {
+        'fuente': nombre_imagen,
+        'ruta': ruta,
+        'path': '/%l/%s%y_%x',
+        'fallbackPath': '/fallback/%s',
+        'extension': 'jpg',
+        'tileResolution': tamano_tesela,
+        'maxLevel': niveles,
+        'cubeResolution': tamano_cubo,
+    }
@@ -0,0 +1,65 @@
+"""
+Paginación del admin con recuentos estimados para tablas grandes.
+
+La lista de cambios cuenta las filas con ``COUNT(*)`` en cada petición, y
+eso recorre la tabla o un índice entero. Sin filtros ni búsqueda, el total
+se toma de lo que el motor ya sabe (``pg_class.reltuples``,
+``information_schema.TABLES`` y, en SQLite, el ``MAX(rowid)`` que devuelve
+el extremo del árbol de la clave primaria) cuando supera el umbral; por
+debajo, o con filtros, se cuenta de verdad. En SQLite es una cota superior:
+los huecos que dejan los borrados cuentan como filas.
+"""
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+CONFIGURACION_POR_DEFECTO = {
+    # Filas a partir de las cuales se usa la estimación en lugar de COUNT(*)
+    'UMBRAL_ESTIMACION': 10000,
+}
+
+
+def obtener_configuracion():
+    """Devuelve la configuración de paginación combinada con CMS_PAGINACION_ADMIN"""
+    return {**CONFIGURACION_POR_DEFECTO, **getattr(settings, 'CMS_PAGINACION_ADMIN', {})}
+
+
+def filas_estimadas(modelo, alias='default'):
+    """Filas de la tabla de ``modelo`` según las estadísticas del motor, o None si no hay"""
+    conexion = connections[alias]
+    tabla = modelo._meta.db_table
+    with conexion.cursor() as cursor:
+        if conexion.vendor == 'sqlite':
+            # La clave primaria entera de Django es el rowid: se lee sin recorrer la tabla
+            cursor.execute(f'SELECT MAX(rowid) FROM {conexion.ops.quote_name(tabla)}')
+        elif conexion.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples FROM pg_class WHERE oid = to_regclass(%s)', [tabla])
+        elif conexion.vendor == 'mysql':
+            cursor.execute(
+                'SELECT TABLE_ROWS FROM information_schema.TABLES '
+                'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s',
+                [tabla],
+            )
+        else:
+            return None
+        fila = cursor.fetchone()
+    # reltuples es -1 en las tablas que aún no se han analizado
+    if fila is None or fila[0] is None or fila[0] < 0:
+        return None
+    return int(fila[0])
+
+
+class PaginadorEstimado(Paginator):
+    """Paginator de las listas del admin que estima el total de las consultas sin filtros"""
+
+    @cached_property
+    def count(self):
+        consulta = self.object_list
+        if isinstance(consulta, QuerySet) and not consulta.query.where:
+            estimadas = filas_estimadas(consulta.model, consulta.db)
+            if estimadas is not None and estimadas >= obtener_configuracion()['UMBRAL_ESTIMACION']:
+                return estimadas
+        return super().count
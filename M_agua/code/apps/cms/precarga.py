@@ -0,0 +1,100 @@
+"""
+Indicaciones de precarga de las panorámicas del visor.
+
+La página del visor anuncia, con etiquetas ``<link>`` y con la cabecera
+``Link``, los archivos que Pannellum pedirá para la escena inicial y para
+las siguientes escenas de su categoría, de modo que al pulsar una escena la
+panorámica ya esté en la caché del navegador.
+
+La escena inicial se anuncia con ``preload`` porque se pinta enseguida; las
+siguientes con ``prefetch``, que el navegador descarga con la prioridad más
+baja y no compite con la primera.
+"""
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from .multires import teselas_base
+
+CONFIGURACION_POR_DEFECTO = {
+    # Escenas de la categoría inicial que se precargan además de la primera
+    'ESCENAS': 3,
+    # Bytes que pueden sumar las escenas siguientes; la inicial no cuenta
+    'PRESUPUESTO_BYTES': 8 * 1024 * 1024,
+}
+
+
+def obtener_configuracion():
+    """Devuelve la configuración de precarga combinada con CMS_PRECARGA"""
+    return {**CONFIGURACION_POR_DEFECTO, **getattr(settings, 'CMS_PRECARGA', {})}
+
+
+def _tamano(nombre, storage):
+    try:
+        return storage.size(nombre)
+    except OSError:
+        return None
+
+
+def recursos_escena(escena):
+    """
+    Archivos que Pannellum pide primero al abrir la escena: ``{'url', 'como', 'bytes'}``.
+
+    Con teselas son las del nivel 1 de cada cara, que se cargan como imágenes
+    con CORS anónimo; sin ellas, la panorámica completa, que Pannellum
+    descarga con XMLHttpRequest para leer sus metadatos XMP. ``como`` debe
+    coincidir con esa petición o el navegador descarga el archivo dos veces.
+    Devuelve None si falta algún archivo.
+    """
+    if escena.get_multires_config() is not None:
+        recursos = []
+        for nombre in teselas_base(escena.multires):
+            tamano = _tamano(nombre, default_storage)
+            if tamano is None:
+                return None
+            recursos.append({'url': default_storage.url(nombre), 'como': 'image', 'bytes': tamano})
+        return recursos
+
+    tamano = escena.get_metadatos('imagen').get('bytes') or _tamano(escena.imagen.name, escena.imagen.storage)
+    if tamano is None:
+        return None
+    return [{'url': escena.imagen.url, 'como': 'fetch', 'bytes': tamano}]
+
+
+def recursos_precarga(escenas):
+    """
+    Recursos a anunciar para una lista de escenas ordenada por ``orden``.
+
+    La primera escena siempre se precarga; de las ``ESCENAS`` siguientes se
+    añaden, en orden, las que caben en ``PRESUPUESTO_BYTES``.
+    """
+    config = obtener_configuracion()
+    if not escenas:
+        return []
+
+    resultado = []
+    inicial = recursos_escena(escenas[0])
+    if inicial:
+        resultado.extend({**recurso, 'rel': 'preload'} for recurso in inicial)
+
+    presupuesto = config['PRESUPUESTO_BYTES']
+    for escena in escenas[1:config['ESCENAS'] + 1]:
+        recursos = recursos_escena(escena)
+        if not recursos:
+            continue
+        tamano = sum(recurso['bytes'] for recurso in recursos)
+        if tamano > presupuesto:
+            # Las escenas siguientes se abren después; saltarse una grande
+            # desordenaría la caché respecto a lo que verá el usuario
+            break
+        presupuesto -= tamano
+        resultado.extend({**recurso, 'rel': 'prefetch'} for recurso in recursos)
+    return resultado
+
+
+def cabecera_link(recursos):
+    """Valor de la cabecera ``Link`` con los mismos recursos que las etiquetas de la página"""
+    return ', '.join(
+        f"<{recurso['url']}>; rel={recurso['rel']}; as={recurso['como']}; crossorigin"
+        for recurso in recursos
+    )
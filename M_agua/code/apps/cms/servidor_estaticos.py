@@ -0,0 +1,134 @@
+"""
+Servidor WSGI de estáticos y media para producción.
+
+Envuelve la aplicación de Django y responde directamente las peticiones bajo
+``STATIC_URL`` y ``MEDIA_URL`` leyendo ``STATIC_ROOT`` y ``MEDIA_ROOT``, sin
+pasar por middleware, URLconf ni vistas. Elige la variante precomprimida
+(``.br`` o ``.gz``) que acepte el cliente, marca como inmutables los
+archivos con huella en el nombre y atiende Range y revalidaciones
+(apps/cms/envio.py).
+"""
+
+import mimetypes
+import os
+import re
+from http import HTTPStatus
+from urllib.parse import unquote, urlsplit
+from wsgiref.util import FileWrapper
+
+from django.conf import settings
+
+from .compresion import CODIFICACIONES, es_comprimible
+from .envio import TAMANO_BLOQUE, abrir_tramo, cabecera_delegacion, leer_tramo, preparar_envio
+from .metricas import registrar_media
+from .storage import CACHE_INMUTABLE, es_nombre_por_contenido
+
+# Huella que añade ManifestStaticFilesStorage: nombre.<12 hex>.ext
+_HUELLA_MANIFIESTO = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+
+
+def _codificaciones_aceptadas(cabecera):
+    """Codificaciones de Accept-Encoding con calidad mayor que cero"""
+    aceptadas = set()
+    for parte in cabecera.split(','):
+        codificacion, _, parametros = parte.partition(';')
+        calidad = parametros.strip()
+        if calidad.startswith('q='):
+            try:
+                if float(calidad[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        aceptadas.add(codificacion.strip().lower())
+    return aceptadas
+
+
+def tiene_huella(nombre):
+    """Indica si el nombre cambia cuando cambia el contenido"""
+    return es_nombre_por_contenido(nombre) or bool(_HUELLA_MANIFIESTO.search(nombre))
+
+
+class ServidorEstaticos:
+    """Middleware WSGI que sirve archivos de disco antes de llegar a Django"""
+
+    def __init__(self, aplicacion, directorios=None, max_age=None):
+        self.aplicacion = aplicacion
+        if directorios is None:
+            directorios = [
+                (settings.STATIC_URL, settings.STATIC_ROOT),
+                (settings.MEDIA_URL, settings.MEDIA_ROOT),
+            ]
+        self.directorios = [
+            (urlsplit(prefijo).path, os.path.realpath(raiz))
+            for prefijo, raiz in directorios if prefijo and raiz
+        ]
+        if max_age is None:
+            max_age = getattr(settings, 'CMS_ESTATICOS_MAX_AGE', 60 * 60)
+        self.max_age = max_age
+        self.raiz_media = os.path.realpath(settings.MEDIA_ROOT) if settings.MEDIA_ROOT else None
+
+    def __call__(self, environ, start_response):
+        if environ.get('REQUEST_METHOD') in ('GET', 'HEAD'):
+            archivo = self.buscar(environ.get('PATH_INFO', ''))
+            if archivo is not None:
+                return self.servir(environ, start_response, archivo)
+        return self.aplicacion(environ, start_response)
+
+    def buscar(self, ruta_url):
+        """Ruta en disco del archivo pedido, o None si no está bajo ningún directorio"""
+        for prefijo, raiz in self.directorios:
+            if not ruta_url.startswith(prefijo):
+                continue
+            ruta = os.path.realpath(os.path.join(raiz, unquote(ruta_url[len(prefijo):])))
+            # realpath resuelve '..' y enlaces: no se sale nunca de la raíz
+            if ruta.startswith(raiz + os.sep) and os.path.isfile(ruta):
+                return ruta
+        return None
+
+    def variante(self, environ, ruta):
+        """(ruta a enviar, Content-Encoding) según lo que acepta el cliente"""
+        if es_comprimible(ruta):
+            aceptadas = _codificaciones_aceptadas(environ.get('HTTP_ACCEPT_ENCODING', ''))
+            for codificacion, sufijo in CODIFICACIONES.items():
+                if codificacion in aceptadas and os.path.isfile(ruta + sufijo):
+                    return ruta + sufijo, codificacion
+        return ruta, None
+
+    def servir(self, environ, start_response, ruta):
+        tipo, _ = mimetypes.guess_type(ruta)
+        tipo = tipo or 'application/octet-stream'
+        if tipo.startswith('text/') or tipo in ('application/javascript', 'application/json'):
+            tipo += '; charset=utf-8'
+
+        if tiene_huella(os.path.basename(ruta)):
+            cache_control = f'public, max-age={CACHE_INMUTABLE}, immutable'
+        else:
+            cache_control = f'public, max-age={self.max_age}'
+
+        delegacion = self.delegacion(ruta)
+        if delegacion is not None:
+            start_response('200 OK', [('Cache-Control', cache_control), ('Content-Type', tipo), delegacion])
+            return []
+
+        enviada, codificacion = self.variante(environ, ruta)
+        comunes = [('Cache-Control', cache_control)]
+        if es_comprimible(ruta):
+            comunes.append(('Vary', 'Accept-Encoding'))
+        estado, cabeceras, tramo = preparar_envio(environ, enviada, tipo, comunes, codificacion)
+        start_response(f'{estado} {HTTPStatus(estado).phrase}', cabeceras)
+        if tramo is None or environ['REQUEST_METHOD'] == 'HEAD':
+            return []
+        if self.raiz_media and ruta.startswith(self.raiz_media + os.sep):
+            registrar_media(tramo[1], 'wsgi')
+        archivo, hasta_el_final = abrir_tramo(enviada, *tramo)
+        if hasta_el_final:
+            envoltorio = environ.get('wsgi.file_wrapper', FileWrapper)
+            return envoltorio(archivo, TAMANO_BLOQUE)
+        return leer_tramo(archivo, tramo[1])
+
+    def delegacion(self, ruta):
+        """Cabecera X-Accel-Redirect/X-Sendfile para los archivos de MEDIA_ROOT, si está configurada"""
+        if self.raiz_media and ruta.startswith(self.raiz_media + os.sep):
+            relativa = os.path.relpath(ruta, self.raiz_media).replace(os.sep, '/')
+            return cabecera_delegacion(relativa, ruta)
+        return None
@@ -0,0 +1,93 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import invalidar_catalogo
+from .models import CategoriaEscena, ConfiguracionInterfaz, Escena360, LogoCreador
+from .miniaturas import borrar_variantes
+from .multires import borrar_directorio
+from .sqlite import aplicar_pragmas
+from .tareas import en_segundo_plano, encolar
+
+MODELOS_CON_RENDICIONES = (CategoriaEscena, Escena360, LogoCreador)
+MODELOS_DEL_CATALOGO = (CategoriaEscena, Escena360, LogoCreador, ConfiguracionInterfaz)
+
+
+def registrar_metadatos(sender, instance, raw=False, **kwargs):
+    """Guarda dimensiones, tamaño, formato y hash de las imágenes que cambiaron"""
+    if raw:
+        return
+    instance.actualizar_metadatos()
+
+
+# Primero los metadatos: solo leen cabeceras y no dependen de las teselas
+for modelo in MODELOS_DEL_CATALOGO:
+    post_save.connect(registrar_metadatos, sender=modelo, dispatch_uid=f'metadatos_{modelo.__name__}')
+
+
+@receiver(post_save, sender=Escena360)
+def generar_teselas_escena(sender, instance, raw=False, **kwargs):
+    """Corta la imagen 360 en teselas multiresolución al guardar la escena"""
+    if raw:
+        return
+    if en_segundo_plano():
+        encolar(instance)
+        return
+    instance.actualizar_multires()
+
+
+@receiver(post_delete, sender=Escena360)
+def borrar_teselas_escena(sender, instance, **kwargs):
+    """Elimina las teselas de una escena borrada"""
+    if instance.multires and instance.multires.get('ruta'):
+        borrar_directorio(instance.multires['ruta'])
+
+
+def generar_rendiciones(sender, instance, raw=False, **kwargs):
+    """Genera las rendiciones de iconos, logos e imágenes de categoría al guardar"""
+    if raw:
+        return
+    if en_segundo_plano():
+        # Una sola tarea por objeto genera rendiciones y teselas
+        encolar(instance)
+        return
+    instance.actualizar_rendiciones()
+
+
+def borrar_rendiciones(sender, instance, **kwargs):
+    """Elimina las rendiciones de un objeto borrado"""
+    for datos in (instance.rendiciones or {}).values():
+        borrar_variantes(datos.get('variantes', []))
+
+
+for modelo in MODELOS_CON_RENDICIONES:
+    post_save.connect(generar_rendiciones, sender=modelo, dispatch_uid=f'rendiciones_{modelo.__name__}')
+    post_delete.connect(borrar_rendiciones, sender=modelo, dispatch_uid=f'borrar_rendiciones_{modelo.__name__}')
+
+
+@receiver(post_save, sender=ConfiguracionInterfaz)
+def compilar_tema(sender, instance, raw=False, **kwargs):
+    """Regenera la hoja de estilos del tema al guardar la configuración"""
+    if raw:
+        return
+    instance.actualizar_tema()
+
+
+@receiver(connection_created)
+def configurar_sqlite(sender, connection, **kwargs):
+    """Aplica los PRAGMA de CMS_SQLITE_PRAGMAS a cada conexión SQLite nueva"""
+    aplicar_pragmas(connection)
+
+
+def invalidar_paginas(sender, raw=False, **kwargs):
+    """Publica una versión nueva del catálogo tras cualquier edición"""
+    if raw:
+        return
+    invalidar_catalogo()
+
+
+# Se conecta al final para que las teselas y rendiciones ya estén guardadas
+# cuando otro worker vuelva a renderizar la página
+for modelo in MODELOS_DEL_CATALOGO:
+    post_save.connect(invalidar_paginas, sender=modelo, dispatch_uid=f'invalidar_{modelo.__name__}')
+    post_delete.connect(invalidar_paginas, sender=modelo, dispatch_uid=f'invalidar_borrado_{modelo.__name__}')
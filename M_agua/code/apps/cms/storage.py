@@ -0,0 +1,97 @@
+"""
+Almacenamiento direccionado por contenido para las imágenes del CMS.
+
+Los archivos se guardan con el hash de sus bytes como nombre dentro del
+directorio de ``upload_to``; subir de nuevo los mismos bytes reutiliza el
+archivo existente en vez de crear una copia con sufijo aleatorio. Como un
+nombre nunca cambia de contenido, las URLs se pueden cachear para siempre.
+"""
+
+import hashlib
+import posixpath
+import re
+from pathlib import Path
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, storages
+from django.core.files.utils import validate_file_name
+
+from .compresion import precomprimir
+
+# Caracteres hexadecimales del SHA-256 que se usan en el nombre del archivo
+LONGITUD_HASH = 32
+
+# Un archivo con nombre por contenido nunca cambia: se puede cachear un año
+CACHE_INMUTABLE = 60 * 60 * 24 * 365
+
+_NOMBRE_HASH = re.compile(r'^[0-9a-f]{%d}(\.[\w]+)?$' % LONGITUD_HASH)
+
+
+def hash_contenido(contenido):
+    """SHA-256 hexadecimal de un archivo, leído por bloques"""
+    sha = hashlib.sha256()
+    if hasattr(contenido, 'seek'):
+        contenido.seek(0)
+    for bloque in contenido.chunks():
+        sha.update(bloque)
+    if hasattr(contenido, 'seek'):
+        contenido.seek(0)
+    return sha.hexdigest()
+
+
+def nombre_por_contenido(nombre, digest):
+    """Nombre direccionado por contenido conservando directorio y extensión"""
+    directorio, base = posixpath.split(nombre)
+    extension = posixpath.splitext(base)[1].lower()
+    return posixpath.join(directorio, digest[:LONGITUD_HASH] + extension)
+
+
+def es_nombre_por_contenido(nombre):
+    """Indica si un nombre ya tiene la forma <hash>.<ext>"""
+    return bool(_NOMBRE_HASH.match(posixpath.basename(nombre or '')))
+
+
+class AlmacenamientoPorContenido(FileSystemStorage):
+    """FileSystemStorage que nombra los archivos por el hash de su contenido"""
+
+    def __init__(self, **kwargs):
+        # Sobrescribir un nombre solo puede escribir los mismos bytes, así que
+        # dos subidas idénticas simultáneas no necesitan un sufijo aleatorio
+        kwargs.setdefault('allow_overwrite', True)
+        super().__init__(**kwargs)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        nombre = nombre_por_contenido(name, hash_contenido(content))
+        validate_file_name(nombre, allow_relative_path=True)
+        if self.exists(nombre):
+            return nombre
+        return self._save(nombre, content)
+
+
+class EstaticosPrecomprimidos(ManifestStaticFilesStorage):
+    """
+    Estáticos con huella en el nombre y variantes .gz/.br generadas en
+    ``collectstatic``, para que el servidor nunca comprima por petición.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        publicados = set()
+        for nombre, nombre_con_huella, procesado in super().post_process(paths, dry_run, **options):
+            if not isinstance(procesado, Exception) and nombre_con_huella:
+                publicados.update((nombre, nombre_con_huella))
+            yield nombre, nombre_con_huella, procesado
+
+        if not dry_run:
+            for nombre in sorted(publicados):
+                precomprimir(Path(self.path(nombre)))
+
+
+def storage_contenido():
+    """Storage de las imágenes subidas (alias 'contenido' de STORAGES)"""
+    return storages['contenido']
@@ -0,0 +1,184 @@
+"""
+Cola de tareas en la base de datos para los derivados de imagen.
+
+Con ``CMS_TAREAS['EN_SEGUNDO_PLANO']`` activo, guardar una imagen en el
+admin solo encola una ``TareaImagen`` en la misma transacción y la petición
+vuelve enseguida; ``manage.py run_cms_worker`` genera después las teselas y
+rendiciones. La cola no necesita más que la base de datos: un trabajador
+reclama una tarea cambiando su estado con un UPDATE condicionado al estado
+anterior, así que dos procesos nunca toman la misma.
+"""
+
+import os
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .cache import invalidar_catalogo
+from .models import TareaImagen
+
+CONFIGURACION_POR_DEFECTO = {
+    # Encolar los derivados en lugar de generarlos durante el guardado
+    'EN_SEGUNDO_PLANO': False,
+    # Intentos de una tarea antes de marcarla como fallida
+    'INTENTOS': 3,
+    # Segundos de espera antes del primer reintento; se duplica en cada uno
+    'RETARDO_REINTENTO': 30,
+    # Segundos entre consultas a la cola cuando está vacía
+    'INTERVALO': 1.0,
+    # Segundos tras los que una tarea en proceso se da por abandonada
+    'TIEMPO_MAXIMO': 15 * 60,
+}
+
+
+def obtener_configuracion():
+    """Devuelve la configuración de la cola combinada con CMS_TAREAS"""
+    return {**CONFIGURACION_POR_DEFECTO, **getattr(settings, 'CMS_TAREAS', {})}
+
+
+def en_segundo_plano():
+    return obtener_configuracion()['EN_SEGUNDO_PLANO']
+
+
+def derivados_pendientes(instancia):
+    """Indica si alguna imagen del objeto no tiene aún sus teselas o rendiciones"""
+    if hasattr(instancia, 'multires_pendiente') and instancia.multires_pendiente():
+        return True
+    return hasattr(instancia, 'rendiciones_pendientes') and instancia.rendiciones_pendientes()
+
+
+def generar_derivados(instancia):
+    """Regenera las rendiciones y teselas que no correspondan a las imágenes actuales"""
+    cambios = False
+    if hasattr(instancia, 'actualizar_rendiciones'):
+        cambios |= instancia.actualizar_rendiciones()
+    if hasattr(instancia, 'actualizar_multires'):
+        cambios |= instancia.actualizar_multires()
+    return cambios
+
+
+def encolar(instancia):
+    """
+    Encola los derivados del objeto si les falta algo y no hay ya una tarea pendiente.
+
+    Se llama desde ``post_save``: la tarea se crea en la misma transacción
+    que el guardado, así que ningún trabajador la ve antes de que se confirme.
+    """
+    if not derivados_pendientes(instancia):
+        return None
+    modelo = instancia._meta.label_lower
+    pendiente = TareaImagen.objects.filter(modelo=modelo, objeto_id=instancia.pk, estado=TareaImagen.PENDIENTE)
+    if pendiente.exists():
+        return None
+    return TareaImagen.objects.create(modelo=modelo, objeto_id=instancia.pk)
+
+
+def nombre_trabajador(indice=0):
+    return f'{socket.gethostname()}:{os.getpid()}:{indice}'
+
+
+def reclamar(trabajador):
+    """
+    Toma la tarea pendiente más antigua, o devuelve None si no hay ninguna.
+
+    El UPDATE solo afecta a la fila si sigue pendiente; si otro trabajador
+    la tomó antes se prueba con la siguiente.
+    """
+    while True:
+        ahora = timezone.now()
+        tarea = (
+            TareaImagen.objects
+            .filter(estado=TareaImagen.PENDIENTE, disponible_desde__lte=ahora)
+            .order_by('disponible_desde', 'id')
+            .first()
+        )
+        if tarea is None:
+            return None
+        tomada = TareaImagen.objects.filter(pk=tarea.pk, estado=TareaImagen.PENDIENTE).update(
+            estado=TareaImagen.EN_PROCESO,
+            trabajador=trabajador,
+            fecha_inicio=ahora,
+            intentos=tarea.intentos + 1,
+        )
+        if tomada:
+            tarea.refresh_from_db()
+            return tarea
+
+
+def ejecutar(tarea):
+    """Procesa una tarea reclamada y registra el resultado o programa un reintento"""
+    config = obtener_configuracion()
+    try:
+        instancia = tarea.get_objeto()
+        # Un objeto borrado no tiene nada que procesar
+        if instancia is not None and generar_derivados(instancia):
+            invalidar_catalogo()
+    except Exception:
+        tarea.error = traceback.format_exc()
+        if tarea.intentos >= config['INTENTOS']:
+            tarea.estado = TareaImagen.FALLIDA
+            tarea.fecha_fin = timezone.now()
+        else:
+            tarea.estado = TareaImagen.PENDIENTE
+            retardo = config['RETARDO_REINTENTO'] * 2 ** (tarea.intentos - 1)
+            tarea.disponible_desde = timezone.now() + timedelta(seconds=retardo)
+        tarea.save(update_fields=['estado', 'error', 'fecha_fin', 'disponible_desde'])
+        return False
+
+    tarea.estado = TareaImagen.COMPLETADA
+    # El error de un intento anterior ya no describe la tarea
+    tarea.error = ''
+    tarea.fecha_fin = timezone.now()
+    tarea.save(update_fields=['estado', 'error', 'fecha_fin'])
+    return True
+
+
+def recuperar_abandonadas():
+    """
+    Devuelve a la cola las tareas de trabajadores que murieron a medias.
+
+    Una tarea que ya agotó sus intentos se marca como fallida: si es ella la
+    que tumba al trabajador, volver a encolarla lo tumbaría sin fin.
+    """
+    config = obtener_configuracion()
+    ahora = timezone.now()
+    abandonadas = TareaImagen.objects.filter(
+        estado=TareaImagen.EN_PROCESO,
+        fecha_inicio__lt=ahora - timedelta(seconds=config['TIEMPO_MAXIMO']),
+    )
+    abandonadas.filter(intentos__gte=config['INTENTOS']).update(
+        estado=TareaImagen.FALLIDA,
+        error="El trabajador no terminó la tarea en ninguno de sus intentos",
+        fecha_fin=ahora,
+    )
+    return abandonadas.update(
+        estado=TareaImagen.PENDIENTE,
+        disponible_desde=ahora,
+    )
+
+
+def procesar_cola(trabajador, parar=None, una_vez=False):
+    """
+    Bucle de un trabajador: procesa tareas hasta que ``parar`` se active.
+
+    Con ``una_vez`` termina en cuanto la cola queda vacía. Devuelve el
+    número de tareas procesadas.
+    """
+    intervalo = obtener_configuracion()['INTERVALO']
+    parar = parar or threading.Event()
+    procesadas = 0
+    while not parar.is_set():
+        tarea = reclamar(trabajador)
+        if tarea is None:
+            if una_vez:
+                break
+            parar.wait(intervalo)
+            continue
+        ejecutar(tarea)
+        procesadas += 1
+    return procesadas
+
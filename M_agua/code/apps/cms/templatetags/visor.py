@@ -0,0 +1,40 @@
+from django import template
+
+from apps.cms.miniaturas import TIPOS_MIME
+
+register = template.Library()
+
+
+@register.simple_tag
+def srcset(objeto, campo, formato):
+    """srcset 1x/2x de las rendiciones de un campo en un formato"""
+    return objeto.get_srcset(campo, formato)
+
+
+@register.simple_tag
+def image_set(objeto, campo):
+    """Valor CSS image-set() con las rendiciones de un campo"""
+    return objeto.get_image_set(campo)
+
+
+@register.simple_tag
+def url_rendicion(objeto, campo):
+    """URL de la rendición de respaldo más grande de un campo"""
+    return objeto.get_url_rendicion(campo)
+
+
+@register.inclusion_tag('cms/picture.html')
+def picture(objeto, campo, alt=""):
+    """Elemento <picture> con una fuente por formato moderno y respaldo en <img>"""
+    formatos = objeto.get_formatos_rendicion(campo)
+    fuentes = [
+        {'tipo': TIPOS_MIME[formato], 'srcset': objeto.get_srcset(campo, formato)}
+        for formato in formatos[:-1]
+    ]
+    respaldo = objeto.get_srcset(campo, formatos[-1]) if formatos else ""
+    return {
+        'fuentes': fuentes,
+        'src': objeto.get_url_rendicion(campo),
+        'srcset': respaldo,
+        'alt': alt,
+    }
@@ -1,3 +1,1742 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import posixpath
+import re
+import shutil
+import tempfile
+from datetime import timedelta
+from importlib import import_module
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
+from wsgiref.util import setup_testing_defaults
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.checks import Tags, run_checks
+from django.core.exceptions import ValidationError
+from django.db import connection, connections
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import CommandError, call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import FileResponse, Http404
+from django.test.utils import CaptureQueriesContext
+from django.test import AsyncRequestFactory, Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from . import cache as cache_paginas
+from . import metricas, views
+from .benchmark import crear_catalogo_sintetico
+from .management.commands.bench_sqlite import perfil_produccion
+from .catalogo import categorias_activas, escenas_activas, escenas_con_video, serializar_escena
+from .compresion import precomprimir
+from . import importacion
+from .importacion import nombre_panoramica, ruta_diario
+from .middleware import es_ruta_publica
+from .miniaturas import formatos_modernos
+from .models import CategoriaEscena, ConfiguracionInterfaz, Escena360, LogoCreador, TareaImagen
+from .paginacion import PaginadorEstimado, filas_estimadas
+from .servidor_estaticos import ServidorEstaticos
+from .sqlite import aplicar_pragmas
+from .tareas import ejecutar, reclamar, recuperar_abandonadas
+from .storage import es_nombre_por_contenido, storage_contenido
+from .views import servir_media
+from .youtube import extraer_id_youtube
+
+
+def imagen_de_prueba(nombre, tamano, color='red', formato='JPEG'):
+    """Genera un archivo de imagen en memoria para los formularios y modelos"""
+    buffer = BytesIO()
+    Image.new('RGB', tamano, color).save(buffer, formato)
+    return SimpleUploadedFile(nombre, buffer.getvalue(), content_type=f'image/{formato.lower()}')
+
+
+class MediaTemporalMixin:
+    """Redirige MEDIA_ROOT a un directorio temporal durante cada prueba"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        ConfiguracionInterfaz.limpiar_cache()
+        self.media_root = tempfile.mkdtemp()
+        ajustes = override_settings(MEDIA_ROOT=self.media_root)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+
+class MultiresTests(MediaTemporalMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.categoria = CategoriaEscena.objects.create(
+            titulo="Cenotes",
+            icono=imagen_de_prueba('icono.png', (64, 64), formato='PNG'),
+        )
+
+    def crear_escena(self, tamano):
+        return Escena360.objects.create(
+            categoria=self.categoria,
+            titulo="Pozo",
+            imagen=imagen_de_prueba('pano.jpg', tamano),
+            icono=imagen_de_prueba('icono.png', (64, 64), formato='PNG'),
+        )
+
+    def test_guardar_escena_genera_teselas(self):
+        escena = self.crear_escena((1600, 800))
+
+        config = escena.get_multires_config()
+        self.assertEqual(config['cubeResolution'], 504)
+        self.assertEqual(config['maxLevel'], 1)
+        ruta = escena.multires['ruta']
+        for cara in 'frblud':
+            self.assertTrue(default_storage.exists(f'{ruta}/1/{cara}0_0.jpg'))
+            self.assertTrue(default_storage.exists(f'{ruta}/fallback/{cara}.jpg'))
+        self.assertEqual(Escena360.objects.get(pk=escena.pk).multires, escena.multires)
+
+    def test_orientacion_de_caras(self):
+        # Cada cuarto horizontal de la equirectangular tiene un color distinto
+        panorama = Image.new('RGB', (1600, 800))
+        colores = {'b': (255, 0, 0), 'l': (0, 255, 0), 'f': (0, 0, 255), 'r': (255, 255, 0)}
+        for indice, cara in enumerate('lfrb'):
+            inicio = 200 + indice * 400
+            for desplazamiento in (0, -1600):
+                panorama.paste(colores[cara], (inicio + desplazamiento, 0, inicio + desplazamiento + 400, 800))
+        buffer = BytesIO()
+        panorama.save(buffer, 'PNG')
+        escena = self.crear_escena((16, 8))
+        escena.imagen = SimpleUploadedFile('cuartos.png', buffer.getvalue())
+        escena.save()
+
+        ruta = escena.multires['ruta']
+        for cara, color in colores.items():
+            with default_storage.open(f'{ruta}/fallback/{cara}.jpg') as archivo:
+                centro = Image.open(archivo).convert('RGB').getpixel((252, 252))
+            self.assertTrue(all(abs(a - b) < 40 for a, b in zip(centro, color)), (cara, centro))
+
+    def test_imagen_sin_proporcion_2_1_no_se_tesela(self):
+        escena = self.crear_escena((800, 600))
+
+        self.assertIsNone(escena.get_multires_config())
+        self.assertEqual(escena.get_multires_json(), 'null')
+
+    def test_cambiar_imagen_reemplaza_teselas(self):
+        escena = self.crear_escena((1600, 800))
+        ruta_anterior = escena.multires['ruta']
+
+        escena.imagen = imagen_de_prueba('otra.jpg', (1600, 800), color='blue')
+        escena.save()
+
+        self.assertNotEqual(escena.multires['ruta'], ruta_anterior)
+        self.assertFalse(default_storage.exists(f'{ruta_anterior}/1/f0_0.jpg'))
+        self.assertFalse(os.path.exists(default_storage.path(ruta_anterior)))
+
+    def test_visor_usa_teselas(self):
+        escena = self.crear_escena((1600, 800))
+
+        respuesta = self.client.get(reverse('cms:visor_360'))
+
+        self.assertContains(respuesta, '"multires": {"path": "/%l/%s%y_%x"')
+        self.assertContains(respuesta, escena.get_multires_config()['basePath'])
+
+
+class RendicionesTests(MediaTemporalMixin, TestCase):
+
+    def test_icono_genera_rendiciones_1x_2x(self):
+        categoria = CategoriaEscena.objects.create(
+            titulo="Ríos",
+            icono=imagen_de_prueba('icono.jpg', (400, 400)),
+        )
+
+        variantes = categoria.get_rendiciones('icono')
+        self.assertEqual({(v['ancho'], v['densidad']) for v in variantes}, {(80, 1), (160, 2)})
+        self.assertEqual(categoria.get_formatos_rendicion('icono'), formatos_modernos() + ['jpeg'])
+        for variante in variantes:
+            self.assertTrue(default_storage.exists(variante['nombre']))
+        self.assertIn("type('image/jpeg') 2x", categoria.get_image_set('icono'))
+
+    def test_reemplazar_y_borrar_no_dejan_directorios_vacios(self):
+        categoria = CategoriaEscena.objects.create(titulo="Ríos", icono=imagen_de_prueba('icono.jpg', (400, 400)))
+        anterior = posixpath.dirname(categoria.get_rendiciones('icono')[0]['nombre'])
+
+        categoria.icono = imagen_de_prueba('otro.jpg', (400, 400), color='blue')
+        categoria.save()
+        actual = posixpath.dirname(categoria.get_rendiciones('icono')[0]['nombre'])
+        self.assertFalse(os.path.exists(default_storage.path(anterior)))
+
+        categoria.delete()
+        self.assertFalse(os.path.exists(default_storage.path(actual)))
+
+    def test_directorio_compartido_de_rendiciones_antiguas_se_conserva(self):
+        categoria = CategoriaEscena.objects.create(titulo="Ríos", icono=imagen_de_prueba('icono.jpg', (400, 400)))
+        directorio = posixpath.dirname(categoria.get_rendiciones('icono')[0]['nombre'])
+        ajena = default_storage.save(f'{directorio}/otro-objeto.jpg', ContentFile(b'x'))
+
+        categoria.delete()
+
+        self.assertTrue(default_storage.exists(ajena))
+
+    def test_no_se_amplian_imagenes_pequenas(self):
+        logo = LogoCreador.objects.create(
+            nombre="Senderos",
+            logo=imagen_de_prueba('logo.png', (100, 40), formato='PNG'),
+        )
+
+        self.assertEqual({v['ancho'] for v in logo.get_rendiciones('logo')}, {100})
+
+    def test_transparencia_usa_respaldo_png(self):
+        buffer = BytesIO()
+        Image.new('RGBA', (200, 200), (255, 0, 0, 0)).save(buffer, 'PNG')
+        logo = LogoCreador.objects.create(
+            nombre="Agua",
+            logo=SimpleUploadedFile('logo.png', buffer.getvalue()),
+        )
+
+        self.assertEqual(logo.get_formatos_rendicion('logo')[-1], 'png')
+
+    def test_visor_emite_srcset_e_image_set(self):
+        categoria = CategoriaEscena.objects.create(
+            titulo="Ríos",
+            icono=imagen_de_prueba('icono.jpg', (400, 400)),
+            imagen_fondo=imagen_de_prueba('fondo.jpg', (4400, 2200)),
+        )
+        LogoCreador.objects.create(nombre="Senderos", logo=imagen_de_prueba('logo.jpg', (600, 200)))
+
+        respuesta = self.client.get(reverse('cms:visor_360'))
+
+        fondo = categoria.get_url_rendicion('imagen_fondo')
+        self.assertTrue(fondo.endswith('/4096x2048.jpg'))
+        self.assertContains(respuesta, f'data-fondo="{fondo}"')
+        self.assertContains(respuesta, '/150x50.jpg 1x, ')
+        self.assertContains(respuesta, 'background-image: image-set(')
+
+
+class AlmacenamientoPorContenidoTests(MediaTemporalMixin, TestCase):
+
+    def test_mismos_bytes_reutilizan_el_archivo(self):
+        primera = CategoriaEscena.objects.create(titulo="A", icono=imagen_de_prueba('a.jpg', (32, 32)))
+        segunda = CategoriaEscena.objects.create(titulo="B", icono=imagen_de_prueba('b.jpg', (32, 32)))
+
+        self.assertEqual(primera.icono.name, segunda.icono.name)
+        self.assertTrue(es_nombre_por_contenido(primera.icono.name))
+        self.assertTrue(primera.icono.name.startswith('categorias/'))
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'categorias')), [os.path.basename(primera.icono.name)])
+
+    def test_bytes_distintos_generan_nombres_distintos(self):
+        primera = CategoriaEscena.objects.create(titulo="A", icono=imagen_de_prueba('a.jpg', (32, 32)))
+        segunda = CategoriaEscena.objects.create(titulo="B", icono=imagen_de_prueba('a.jpg', (32, 32), color='blue'))
+
+        self.assertNotEqual(primera.icono.name, segunda.icono.name)
+
+    def test_borrar_escena_no_afecta_a_otra_con_la_misma_imagen(self):
+        categoria = CategoriaEscena.objects.create(titulo="A", icono=imagen_de_prueba('a.jpg', (32, 32)))
+        primera, segunda = [
+            Escena360.objects.create(
+                categoria=categoria,
+                titulo=titulo,
+                imagen=imagen_de_prueba('p.jpg', (1600, 800)),
+                icono=imagen_de_prueba('i.png', (64, 64), formato='PNG'),
+            )
+            for titulo in ("Primera", "Segunda")
+        ]
+        self.assertEqual(primera.imagen.name, segunda.imagen.name)
+        self.assertNotEqual(primera.multires['ruta'], segunda.multires['ruta'])
+
+        def archivos_de(escena):
+            return [f"{escena.multires['ruta']}/1/f0_0.jpg"] + [v['nombre'] for v in escena.get_rendiciones('icono')]
+
+        # Regenerar una escena tampoco toca los archivos de la otra
+        primera.actualizar_multires(forzar=True)
+        primera.actualizar_rendiciones(forzar=True)
+        anteriores = archivos_de(primera)
+        primera.delete()
+
+        self.assertTrue(all(default_storage.exists(nombre) for nombre in archivos_de(segunda)))
+        self.assertFalse(any(default_storage.exists(nombre) for nombre in anteriores))
+        self.assertTrue(default_storage.exists(segunda.imagen.name))
+
+    def test_comando_migra_y_elimina_duplicados(self):
+        contenido = imagen_de_prueba('x.jpg', (32, 32)).read()
+        storage = default_storage
+        storage.save('iconos/cenote.jpg', ContentFile(contenido))
+        storage.save('iconos/cenote_2Uz7Fsm.jpg', ContentFile(contenido))
+        categoria = CategoriaEscena.objects.create(titulo="A", icono=imagen_de_prueba('a.jpg', (32, 32)))
+        escenas = [
+            Escena360.objects.create(categoria=categoria, titulo=nombre, imagen=nombre, icono=nombre)
+            for nombre in ('iconos/cenote.jpg', 'iconos/cenote_2Uz7Fsm.jpg')
+        ]
+        Escena360.objects.filter(pk__in=[e.pk for e in escenas]).update(
+            imagen='iconos/cenote.jpg', icono='iconos/cenote_2Uz7Fsm.jpg'
+        )
+
+        call_command('migrar_media_contenido', '--sin-derivados', stdout=StringIO())
+
+        nombres = set(Escena360.objects.values_list('imagen', 'icono'))
+        self.assertEqual(len(nombres), 1)
+        imagen, icono = nombres.pop()
+        self.assertEqual(imagen, icono)
+        self.assertTrue(es_nombre_por_contenido(imagen))
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'iconos')), [os.path.basename(imagen)])
+
+
+class CachePaginaVisorTests(MediaTemporalMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.categoria = CategoriaEscena.objects.create(titulo="Ríos", icono=imagen_de_prueba('i.jpg', (32, 32)))
+        self.escena = Escena360.objects.create(
+            categoria=self.categoria,
+            titulo="Nacimiento",
+            imagen=imagen_de_prueba('p.jpg', (64, 40)),
+            icono=imagen_de_prueba('i.jpg', (32, 32)),
+        )
+        ConfiguracionInterfaz.objects.create()
+        self.url = reverse('cms:visor_360')
+
+    def test_segunda_peticion_no_consulta_la_base(self):
+        self.client.get(self.url)
+
+        with self.assertNumQueries(0):
+            respuesta = self.client.get(self.url)
+        self.assertContains(respuesta, "Nacimiento")
+
+    def test_editar_catalogo_invalida_la_pagina(self):
+        self.client.get(self.url)
+
+        self.escena.titulo = "Manantial"
+        self.escena.save()
+
+        self.assertContains(self.client.get(self.url), "Manantial")
+
+    def test_borrar_y_configurar_invalidan_la_pagina(self):
+        version = cache_paginas.version_catalogo()
+        LogoCreador.objects.create(nombre="Logo", logo=imagen_de_prueba('l.jpg', (32, 32))).delete()
+        self.assertNotEqual(cache_paginas.version_catalogo(), version)
+
+        version = cache_paginas.version_catalogo()
+        ConfiguracionInterfaz.objects.get().save()
+        self.assertNotEqual(cache_paginas.version_catalogo(), version)
+
+    def test_candado_ocupado_sirve_la_ultima_copia(self):
+        contenido, estado = cache_paginas.pagina_cacheada('prueba', lambda: 'v1')
+        self.assertEqual(contenido, 'v1')
+        cache_paginas.invalidar_catalogo()
+        cache.add('prueba:candado', 'otro worker', 30)
+
+        # La copia anterior se devuelve con el estado del catálogo con que se renderizó
+        self.assertEqual(cache_paginas.pagina_cacheada('prueba', lambda: 'v2'), ('v1', estado))
+
+    def test_solo_un_render_por_version(self):
+        llamadas = []
+
+        def generar():
+            llamadas.append(1)
+            return 'html'
+
+        for _ in range(3):
+            cache_paginas.pagina_cacheada('prueba', generar)
+        self.assertEqual(len(llamadas), 1)
+
+
+class GetCondicionalVisorTests(MediaTemporalMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        CategoriaEscena.objects.create(titulo="Ríos", icono=imagen_de_prueba('i.jpg', (32, 32)))
+        ConfiguracionInterfaz.objects.create()
+        self.url = reverse('cms:visor_360')
+
+    def test_if_none_match_responde_304_sin_consultas(self):
+        etag = self.client.get(self.url)['ETag']
+        cache.delete('cms:visor360:pagina:anterior')
+
+        with self.assertNumQueries(0):
+            respuesta = self.client.get(self.url, headers={'if-none-match': etag})
+        self.assertEqual(respuesta.status_code, 304)
+        self.assertEqual(respuesta.content, b'')
+
+    def test_if_modified_since_responde_304(self):
+        respuesta = self.client.get(self.url)
+        self.assertIn('no-cache', respuesta['Cache-Control'])
+
+        respuesta = self.client.get(self.url, headers={'if-modified-since': respuesta['Last-Modified']})
+        self.assertEqual(respuesta.status_code, 304)
+
+    def test_editar_catalogo_cambia_el_etag(self):
+        etag = self.client.get(self.url)['ETag']
+
+        LogoCreador.objects.create(nombre="Logo", logo=imagen_de_prueba('l.jpg', (32, 32)))
+
+        respuesta = self.client.get(self.url, headers={'if-none-match': etag})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta['ETag'], etag)
+
+    def test_copia_anterior_lleva_los_validadores_de_su_version(self):
+        anterior = self.client.get(self.url)
+        api = self.client.get(reverse('cms:api_categorias'))
+        cache_paginas.invalidar_catalogo()
+        vigente = cache_paginas.estado_catalogo()
+        # Otro worker está renderizando la versión nueva
+        cache.add('cms:visor360:pagina:candado', 'otro worker', 30)
+        cache.add('cms:api:categorias:candado', 'otro worker', 30)
+
+        for url, original in ((self.url, anterior), (reverse('cms:api_categorias'), api)):
+            respuesta = self.client.get(url, headers={'if-none-match': original['ETag']})
+            self.assertEqual(respuesta.status_code, 200)
+            self.assertEqual(respuesta.content, original.content)
+            self.assertEqual(respuesta['ETag'], original['ETag'])
+            self.assertEqual(respuesta['Last-Modified'], original['Last-Modified'])
+            self.assertNotEqual(respuesta['ETag'], f'"{vigente["version"]}"')
+
+    def test_huella_sin_cache_es_estable_y_detecta_borrados(self):
+        cache.clear()
+        version = cache_paginas.version_catalogo()
+        cache.clear()
+        self.assertEqual(cache_paginas.version_catalogo(), version)
+
+        CategoriaEscena.objects.all().delete()
+        cache.clear()
+        self.assertNotEqual(cache_paginas.version_catalogo(), version)
+
+
+class CatalogoDePruebaMixin(MediaTemporalMixin):
+    """Dos categorías activas y una oculta, con una escena en borrador"""
+
+    def setUp(self):
+        super().setUp()
+        ConfiguracionInterfaz.objects.create()
+        self.rios = CategoriaEscena.objects.create(titulo="Ríos", orden=1, icono=imagen_de_prueba('i.jpg', (32, 32)))
+        self.cenotes = CategoriaEscena.objects.create(titulo="Cenotes", orden=2, icono=imagen_de_prueba('i.jpg', (32, 32)))
+        CategoriaEscena.objects.create(titulo="Oculta", activa=False, icono=imagen_de_prueba('i.jpg', (32, 32)))
+        for categoria, titulo, activa in (
+            (self.rios, "Nacimiento", True),
+            (self.cenotes, "Pozo Esmeralda", True),
+            (self.cenotes, "Borrador", False),
+        ):
+            Escena360.objects.create(
+                categoria=categoria,
+                titulo=titulo,
+                activa=activa,
+                imagen=imagen_de_prueba('p.jpg', (64, 40)),
+                icono=imagen_de_prueba('i.jpg', (32, 32)),
+            )
+
+
+class ApiCatalogoTests(CatalogoDePruebaMixin, TestCase):
+
+    def test_lista_de_categorias(self):
+        respuesta = self.client.get(reverse('cms:api_categorias'))
+
+        self.assertEqual(respuesta['Content-Type'], 'application/json')
+        self.assertIn('max-age=60', respuesta['Cache-Control'])
+        self.assertTrue(respuesta.has_header('ETag'))
+        self.assertEqual([c['titulo'] for c in respuesta.json()['categorias']], ["Ríos", "Cenotes"])
+
+    def test_escenas_de_una_categoria(self):
+        url = reverse('cms:api_escenas_categoria', args=[self.cenotes.pk])
+        respuesta = self.client.get(url)
+
+        self.assertEqual([e['titulo'] for e in respuesta.json()['escenas']], ["Pozo Esmeralda"])
+        revalidacion = self.client.get(url, headers={'if-none-match': respuesta['ETag']})
+        self.assertEqual(revalidacion.status_code, 304)
+
+    def test_categoria_inactiva_o_inexistente_da_404(self):
+        for pk in (CategoriaEscena.objects.get(activa=False).pk, 999):
+            respuesta = self.client.get(reverse('cms:api_escenas_categoria', args=[pk]))
+            self.assertEqual(respuesta.status_code, 404)
+
+    def test_404_se_cachea_y_no_espera_al_candado(self):
+        url = reverse('cms:api_escenas_categoria', args=[999])
+        self.client.get(url)
+        # Aunque otro worker tenga el candado, la respuesta ya está cacheada
+        cache.add('cms:api:categoria:999:candado', 'otro worker', 30)
+
+        with self.assertNumQueries(0), \
+                mock.patch('apps.cms.cache.time.sleep', side_effect=AssertionError("espera al candado")):
+            respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 404)
+
+    def test_api_solo_admite_lectura(self):
+        respuesta = self.client.post(reverse('cms:api_categorias'))
+
+        self.assertEqual(respuesta.status_code, 405)
+
+    def test_visor_en_carga_diferida_solo_incrusta_la_primera_categoria(self):
+        respuesta = self.client.get(reverse('cms:visor_360'))
+
+        self.assertEqual(set(respuesta.context['escenas_data']), {self.rios.pk})
+        self.assertContains(respuesta, "Nacimiento")
+        self.assertNotContains(respuesta, "Pozo Esmeralda")
+
+    @override_settings(CMS_VISOR_CARGA_DIFERIDA=False)
+    def test_visor_sin_carga_diferida_incrusta_todo_el_catalogo(self):
+        respuesta = self.client.get(reverse('cms:visor_360'))
+
+        self.assertContains(respuesta, "Pozo Esmeralda")
+        self.assertNotContains(respuesta, "Borrador")
+
+
+class VistasAsincronasTests(CatalogoDePruebaMixin, TestCase):
+    """Las vistas ASGI responden lo mismo que las síncronas"""
+
+    async def test_visor_asincrono_igual_al_sincrono(self):
+        sincrono = await sync_to_async(self.client.get)(reverse('cms:visor_360'))
+        await cache.aclear()
+
+        asincrono = await views.visor_360_async(AsyncRequestFactory().get('/'))
+        self.assertEqual(asincrono.content, sincrono.content)
+        self.assertEqual(asincrono['ETag'], f'"{cache_paginas.version_catalogo()}"')
+        self.assertEqual(asincrono['Cache-Control'], 'no-cache')
+
+        revalidacion = await views.visor_360_async(AsyncRequestFactory().get('/', headers={'if-none-match': asincrono['ETag']}))
+        self.assertEqual(revalidacion.status_code, 304)
+
+    async def test_api_asincrona(self):
+        respuesta = await views.api_categorias_async(AsyncRequestFactory().get('/'))
+        self.assertEqual([c['titulo'] for c in json.loads(respuesta.content)['categorias']], ["Ríos", "Cenotes"])
+        self.assertIn('max-age=60', respuesta['Cache-Control'])
+
+        respuesta = await views.api_escenas_categoria_async(AsyncRequestFactory().get('/'), categoria_id=self.cenotes.pk)
+        self.assertEqual([e['titulo'] for e in json.loads(respuesta.content)['escenas']], ["Pozo Esmeralda"])
+
+        with self.assertRaises(Http404):
+            await views.api_escenas_categoria_async(AsyncRequestFactory().get('/'), categoria_id=999)
+
+        respuesta = await views.api_categorias_async(AsyncRequestFactory().post('/'))
+        self.assertEqual(respuesta.status_code, 405)
+
+    async def test_configuracion_asincrona_sin_consultas_con_copia_local(self):
+        config = await ConfiguracionInterfaz.aget_solo()
+
+        self.assertIs(await ConfiguracionInterfaz.aget_solo(), config)
+
+
+class PresupuestoConsultasVisorTests(MediaTemporalMixin, TestCase):
+    """El número de consultas del visor no depende del tamaño del catálogo"""
+
+    # Categorías, escenas (una sola consulta) y logos; la configuración está cacheada
+    CONSULTAS_VISOR = 3
+    CONSULTAS_API_CATEGORIAS = 1
+    CONSULTAS_API_ESCENAS = 2
+
+    def crear_catalogo(self, total_escenas, total_categorias=10):
+        categorias = CategoriaEscena.objects.bulk_create(
+            CategoriaEscena(titulo=f"Categoría {i}", orden=i, icono=f'categorias/{i}.jpg')
+            for i in range(total_categorias)
+        )
+        escenas = [
+            Escena360(
+                categoria=categorias[i % total_categorias],
+                titulo=f"Escena {i}",
+                orden=i,
+                activa=i % 7 != 0,
+                imagen=f'escenas/{i}.jpg',
+                icono=f'iconos/{i}.png',
+                video_youtube='https://youtu.be/AExMQmVgkOI' if i % 5 == 0 else '',
+            )
+            for i in range(total_escenas)
+        ]
+        for escena in escenas:
+            # bulk_create no pasa por save()
+            escena.actualizar_youtube()
+        Escena360.objects.bulk_create(escenas, batch_size=2000)
+        LogoCreador.objects.bulk_create(
+            LogoCreador(nombre=f"Logo {i}", logo=f'logos/{i}.png') for i in range(3)
+        )
+        ConfiguracionInterfaz.objects.create()
+        # La versión del catálogo y la configuración se dejan calculadas para
+        # medir solo el renderizado
+        cache.clear()
+        cache_paginas.version_catalogo()
+        ConfiguracionInterfaz.get_solo()
+        return categorias
+
+    def comprobar_presupuesto(self, total_escenas):
+        categorias = self.crear_catalogo(total_escenas)
+
+        for carga_diferida in (True, False):
+            with self.subTest(carga_diferida=carga_diferida), \
+                    override_settings(CMS_VISOR_CARGA_DIFERIDA=carga_diferida):
+                cache.delete_many(['cms:visor360:pagina:anterior', f'cms:visor360:pagina:{cache_paginas.version_catalogo()}'])
+                with self.assertNumQueries(self.CONSULTAS_VISOR):
+                    respuesta = self.client.get(reverse('cms:visor_360'))
+                self.assertEqual(respuesta.status_code, 200)
+
+        with self.assertNumQueries(self.CONSULTAS_API_CATEGORIAS):
+            self.client.get(reverse('cms:api_categorias'))
+        with self.assertNumQueries(self.CONSULTAS_API_ESCENAS):
+            self.client.get(reverse('cms:api_escenas_categoria', args=[categorias[-1].pk]))
+
+    def test_catalogo_de_10_escenas(self):
+        self.comprobar_presupuesto(10)
+
+    def test_catalogo_de_1000_escenas(self):
+        self.comprobar_presupuesto(1000)
+
+    def test_catalogo_de_10000_escenas(self):
+        self.comprobar_presupuesto(10000)
+
+    def test_visor_sin_configuracion_no_escribe(self):
+        self.crear_catalogo(10)
+        ConfiguracionInterfaz.objects.all().delete()
+        ConfiguracionInterfaz.limpiar_cache()
+        cache.clear()
+        temas = default_storage.listdir('tema')[1]
+
+        respuesta = self.client.get(reverse('cms:visor_360'))
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertFalse(ConfiguracionInterfaz.objects.exists())
+        self.assertEqual(default_storage.listdir('tema')[1], temas)
+
+    def test_escenas_inactivas_no_se_incrustan(self):
+        self.crear_catalogo(10, total_categorias=1)
+
+        with override_settings(CMS_VISOR_CARGA_DIFERIDA=False):
+            escenas_data = self.client.get(reverse('cms:visor_360')).context['escenas_data']
+
+        titulos = [escena['titulo'] for escenas in escenas_data.values() for escena in escenas]
+        self.assertEqual(len(titulos), 8)
+        self.assertNotIn("Escena 0", titulos)
+        self.assertNotIn("Escena 7", titulos)
+
+
+class ConfiguracionInterfazSoloTests(MediaTemporalMixin, TestCase):
+
+    def test_sin_fila_devuelve_los_valores_por_defecto_sin_guardar(self):
+        config = ConfiguracionInterfaz.get_solo()
+
+        self.assertIsNone(config.pk)
+        self.assertEqual(config.titulo_principal, ConfiguracionInterfaz().titulo_principal)
+        self.assertFalse(ConfiguracionInterfaz.objects.exists())
+
+    def test_respeta_una_fila_existente(self):
+        existente = ConfiguracionInterfaz.objects.create(titulo_principal="Agua")
+        ConfiguracionInterfaz.objects.filter(pk=existente.pk).update(id=7)
+        cache.clear()
+
+        self.assertEqual(ConfiguracionInterfaz.get_solo().pk, 7)
+
+    def test_copia_en_memoria_evita_consultas(self):
+        ConfiguracionInterfaz.objects.create()
+        ConfiguracionInterfaz.get_solo()
+
+        with self.assertNumQueries(0):
+            config = ConfiguracionInterfaz.get_solo()
+        self.assertEqual(config.__dict__['rgba_logos'], "rgba(255, 255, 255, 0.9)")
+
+    def test_cache_compartida_evita_consultas_en_otro_proceso(self):
+        ConfiguracionInterfaz.objects.create()
+        ConfiguracionInterfaz.get_solo()
+        ConfiguracionInterfaz.limpiar_cache()
+
+        with self.assertNumQueries(0):
+            ConfiguracionInterfaz.get_solo()
+
+    def test_guardar_invalida_la_copia_y_los_colores(self):
+        config = ConfiguracionInterfaz.get_solo()
+        self.assertEqual(config.get_rgba_descripcion(), "rgba(255, 255, 255, 0.95)")
+
+        config.color_descripcion = "#000000"
+        config.transparencia_descripcion = 50
+        config.save()
+
+        self.assertEqual(config.get_rgba_descripcion(), "rgba(0, 0, 0, 0.5)")
+        self.assertEqual(ConfiguracionInterfaz.get_solo().get_rgba_descripcion(), "rgba(0, 0, 0, 0.5)")
+
+
+class TemaCssTests(MediaTemporalMixin, TestCase):
+
+    def test_guardar_compila_la_hoja_con_nombre_por_contenido(self):
+        config = ConfiguracionInterfaz.objects.create(fuente_titulo_descripcion='"Georgia", serif')
+
+        self.assertTrue(es_nombre_por_contenido(config.tema_css.name))
+        with config.tema_css.open('rb') as archivo:
+            css = archivo.read().decode()
+        self.assertIn('font-family: "Georgia", serif;', css)
+        self.assertEqual(ConfiguracionInterfaz.objects.get().tema_css.name, config.tema_css.name)
+
+    def test_cambiar_el_tema_cambia_el_nombre_y_borra_el_anterior(self):
+        config = ConfiguracionInterfaz.objects.create()
+        anterior = config.tema_css.name
+
+        config.save()
+        self.assertEqual(config.tema_css.name, anterior)
+
+        config.tamano_titulo_principal = 40
+        config.save()
+        self.assertNotEqual(config.tema_css.name, anterior)
+        self.assertFalse(storage_contenido().exists(anterior))
+
+    def test_el_visor_enlaza_la_hoja_del_tema(self):
+        config = ConfiguracionInterfaz.objects.create()
+
+        respuesta = self.client.get(reverse('cms:visor_360'))
+        self.assertContains(respuesta, f'<link rel="stylesheet" href="{config.tema_css.url}">', html=True)
+        self.assertNotContains(respuesta, '<style>')
+
+    def test_la_migracion_compila_las_configuraciones_existentes(self):
+        ConfiguracionInterfaz.objects.bulk_create([ConfiguracionInterfaz(tamano_titulo_principal=40)])
+        migracion = import_module('apps.cms.migrations.0021_configuracioninterfaz_tema_css')
+
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertFalse(ConfiguracionInterfaz.get_solo().tema_css)
+        # Sin hoja compilada, leer la configuración no escribe
+        self.assertTrue(all(consulta['sql'].startswith('SELECT') for consulta in consultas.captured_queries))
+        self.assertEqual(os.listdir(self.media_root), [])
+        migracion.compilar_temas(django_apps, None)
+
+        config = ConfiguracionInterfaz.objects.get()
+        self.assertTrue(es_nombre_por_contenido(config.tema_css.name))
+        with config.tema_css.open('rb') as archivo:
+            self.assertIn('40px', archivo.read().decode())
+
+    def test_media_con_nombre_por_contenido_es_inmutable(self):
+        config = ConfiguracionInterfaz.objects.create()
+        peticion = RequestFactory().get('/media/')
+
+        respuesta = servir_media(peticion, config.tema_css.name, document_root=self.media_root)
+        self.assertIn('immutable', respuesta['Cache-Control'])
+        self.assertIn('max-age=31536000', respuesta['Cache-Control'])
+
+        default_storage.save('otros/archivo.txt', ContentFile(b'x'))
+        respuesta = servir_media(peticion, 'otros/archivo.txt', document_root=self.media_root)
+        self.assertFalse(respuesta.has_header('Cache-Control'))
+
+    def test_media_con_rangos_y_delegacion(self):
+        nombre = default_storage.save('escenas/pano.jpg', ContentFile(bytes(range(256)) * 4))
+
+        respuesta = servir_media(RequestFactory().get('/', headers={'range': 'bytes=10-19'}), nombre)
+        self.assertEqual(respuesta.status_code, 206)
+        self.assertEqual(respuesta['Content-Range'], 'bytes 10-19/1024')
+        self.assertEqual(b''.join(respuesta.streaming_content), bytes(range(10, 20)))
+
+        respuesta = servir_media(RequestFactory().get('/', headers={'range': 'bytes=1000-'}), nombre)
+        self.assertIsInstance(respuesta, FileResponse)
+        self.assertEqual(respuesta['Content-Length'], '24')
+        self.assertEqual(b''.join(respuesta.streaming_content), bytes(range(232, 256)))
+
+        revalidacion = servir_media(RequestFactory().get('/', headers={'if-none-match': respuesta['ETag']}), nombre)
+        self.assertEqual(revalidacion.status_code, 304)
+
+        with override_settings(CMS_ENVIO_ARCHIVOS={'DELEGAR': 'x-accel-redirect', 'UBICACION_INTERNA': '/interna'}):
+            respuesta = servir_media(RequestFactory().get('/'), nombre)
+        self.assertEqual(respuesta['X-Accel-Redirect'], '/interna/escenas/pano.jpg')
+        self.assertEqual(respuesta.content, b'')
+
+        with self.assertRaises(Http404):
+            servir_media(RequestFactory().get('/'), '../fuera.jpg')
+
+
+class ExportarVisorTests(MediaTemporalMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        ConfiguracionInterfaz.objects.create()
+        categoria = CategoriaEscena.objects.create(
+            titulo="Cenotes",
+            icono=imagen_de_prueba('icono.png', (64, 64), formato='PNG'),
+        )
+        self.escena = Escena360.objects.create(
+            categoria=categoria,
+            titulo="Pozo",
+            imagen=imagen_de_prueba('pano.jpg', (1600, 800)),
+            icono=imagen_de_prueba('icono.png', (64, 64), formato='PNG'),
+        )
+        self.destino = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.destino, ignore_errors=True)
+
+    def exportar(self, *argumentos):
+        call_command('export_visor', self.destino, *argumentos, stdout=StringIO(), stderr=StringIO())
+        with open(os.path.join(self.destino, 'index.html'), encoding='utf-8') as archivo:
+            return archivo.read()
+
+    def test_exporta_un_directorio_autocontenido(self):
+        html = self.exportar('--hilos', '2')
+
+        self.assertNotIn('"/media/', html)
+        self.assertNotIn('"/static/', html)
+        referencias = re.findall(r'(?:static|media)/[^"\'\s()<>\\&,`]+', html)
+        self.assertTrue(referencias)
+        for referencia in referencias:
+            self.assertTrue(os.path.exists(os.path.join(self.destino, referencia)), referencia)
+
+        teselas = os.path.join(self.destino, 'media', self.escena.multires['ruta'])
+        self.assertTrue(os.path.exists(os.path.join(teselas, '1', 'f0_0.jpg')))
+        self.assertIn(self.escena.multires['ruta'], html)
+
+    def test_nombres_con_huella_y_variantes_comprimidas(self):
+        self.exportar()
+
+        hojas = os.listdir(os.path.join(self.destino, 'static', 'css'))
+        self.assertTrue(any(re.fullmatch(r'visor360\.[0-9a-f]{12}\.css', hoja) for hoja in hojas), hojas)
+        self.assertTrue(any(hoja.endswith('.css.gz') for hoja in hojas), hojas)
+        self.assertTrue(os.path.exists(os.path.join(self.destino, 'index.html.gz')))
+
+    def test_no_sobrescribe_sin_limpiar(self):
+        self.exportar()
+
+        with self.assertRaises(CommandError):
+            self.exportar()
+        self.exportar('--limpiar')
+
+
+class EstaticosPrecomprimidosTests(TestCase):
+
+    def setUp(self):
+        self.static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.static_root, ignore_errors=True)
+
+    def test_collectstatic_genera_huellas_y_variantes(self):
+        almacenes = {
+            **settings.STORAGES,
+            'staticfiles': {'BACKEND': 'apps.cms.storage.EstaticosPrecomprimidos'},
+        }
+        with override_settings(STATIC_ROOT=self.static_root, STORAGES=almacenes):
+            call_command('collectstatic', interactive=False, verbosity=0)
+
+        hojas = os.listdir(os.path.join(self.static_root, 'css'))
+        huella = next(hoja for hoja in hojas if re.fullmatch(r'visor360\.[0-9a-f]{12}\.css', hoja))
+        self.assertIn(huella + '.gz', hojas)
+        self.assertIn('visor360.css.gz', hojas)
+        self.assertFalse(any(nombre.startswith('360.') and nombre.endswith('.gz') for nombre in os.listdir(self.static_root)))
+
+
+class ServidorEstaticosTests(SimpleTestCase):
+
+    def setUp(self):
+        self.raiz = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.raiz, ignore_errors=True)
+        os.makedirs(os.path.join(self.raiz, 'css'))
+        with open(os.path.join(self.raiz, 'css', 'visor360.0123456789ab.css'), 'w') as archivo:
+            archivo.write('body { margin: 0; }\n' * 50)
+        precomprimir(Path(self.raiz, 'css', 'visor360.0123456789ab.css'))
+        with open(os.path.join(self.raiz, '360.jpg'), 'wb') as archivo:
+            archivo.write(b'\xff\xd8' + b'0' * 100)
+        self.servidor = ServidorEstaticos(self.aplicacion, [('/static/', self.raiz)], max_age=60)
+
+    def aplicacion(self, environ, start_response):
+        start_response('404 Not Found', [('Content-Type', 'text/plain')])
+        return [b'django']
+
+    def pedir(self, ruta, **cabeceras):
+        environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': ruta, **cabeceras}
+        setup_testing_defaults(environ)
+        respuesta = {}
+
+        def start_response(estado, cabeceras_respuesta):
+            respuesta['estado'] = estado
+            respuesta['cabeceras'] = dict(cabeceras_respuesta)
+
+        respuesta['cuerpo'] = b''.join(self.servidor(environ, start_response))
+        return respuesta
+
+    def test_elige_la_variante_comprimida(self):
+        respuesta = self.pedir('/static/css/visor360.0123456789ab.css', HTTP_ACCEPT_ENCODING='gzip, deflate')
+
+        self.assertEqual(respuesta['cabeceras']['Content-Encoding'], 'gzip')
+        self.assertEqual(respuesta['cabeceras']['Vary'], 'Accept-Encoding')
+        self.assertIn('immutable', respuesta['cabeceras']['Cache-Control'])
+        self.assertTrue(respuesta['cabeceras']['Content-Type'].startswith('text/css'))
+        self.assertEqual(gzip.decompress(respuesta['cuerpo']), b'body { margin: 0; }\n' * 50)
+
+        sin_gzip = self.pedir('/static/css/visor360.0123456789ab.css', HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertNotIn('Content-Encoding', sin_gzip['cabeceras'])
+
+    def test_imagenes_sin_huella_ni_compresion(self):
+        respuesta = self.pedir('/static/360.jpg', HTTP_ACCEPT_ENCODING='gzip, br')
+
+        self.assertNotIn('Content-Encoding', respuesta['cabeceras'])
+        self.assertNotIn('Vary', respuesta['cabeceras'])
+        self.assertEqual(respuesta['cabeceras']['Cache-Control'], 'public, max-age=60')
+
+    def test_revalidacion_con_etag(self):
+        etag = self.pedir('/static/360.jpg')['cabeceras']['ETag']
+
+        respuesta = self.pedir('/static/360.jpg', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta['estado'], '304 Not Modified')
+        self.assertEqual(respuesta['cuerpo'], b'')
+
+    def test_lo_demas_pasa_a_django(self):
+        for ruta in ('/', '/static/no-existe.css', '/static/../etc/passwd', '/static/%2e%2e/etc/passwd'):
+            self.assertEqual(self.pedir(ruta)['cuerpo'], b'django', ruta)
+
+    def test_rangos(self):
+        completo = self.pedir('/static/360.jpg')['cuerpo']
+        self.assertEqual(self.pedir('/static/360.jpg')['cabeceras']['Accept-Ranges'], 'bytes')
+
+        for rango, inicio, fin in (('bytes=10-19', 10, 19), ('bytes=90-', 90, 101), ('bytes=-5', 97, 101), ('bytes=100-500', 100, 101)):
+            respuesta = self.pedir('/static/360.jpg', HTTP_RANGE=rango)
+            self.assertEqual(respuesta['estado'], '206 Partial Content', rango)
+            self.assertEqual(respuesta['cabeceras']['Content-Range'], f'bytes {inicio}-{fin}/102')
+            self.assertEqual(respuesta['cuerpo'], completo[inicio:fin + 1])
+            self.assertEqual(respuesta['cabeceras']['Content-Length'], str(fin - inicio + 1))
+
+        fuera = self.pedir('/static/360.jpg', HTTP_RANGE='bytes=200-')
+        self.assertTrue(fuera['estado'].startswith('416 '))
+        self.assertEqual(fuera['cabeceras']['Content-Range'], 'bytes */102')
+
+        for ignorado in ('bytes=0-1,5-6', 'lineas=1-2', 'bytes=5-1'):
+            self.assertEqual(self.pedir('/static/360.jpg', HTTP_RANGE=ignorado)['estado'], '200 OK', ignorado)
+
+    def test_if_range_de_otra_version_envia_el_archivo_completo(self):
+        etag = self.pedir('/static/360.jpg')['cabeceras']['ETag']
+
+        vigente = self.pedir('/static/360.jpg', HTTP_RANGE='bytes=10-', HTTP_IF_RANGE=etag)
+        self.assertEqual(vigente['estado'], '206 Partial Content')
+        antigua = self.pedir('/static/360.jpg', HTTP_RANGE='bytes=10-', HTTP_IF_RANGE='"otra"')
+        self.assertEqual(antigua['estado'], '200 OK')
+        self.assertEqual(len(antigua['cuerpo']), 102)
+
+    def test_revalidacion_con_fecha(self):
+        modificado = self.pedir('/static/360.jpg')['cabeceras']['Last-Modified']
+
+        respuesta = self.pedir('/static/360.jpg', HTTP_IF_MODIFIED_SINCE=modificado)
+        self.assertEqual(respuesta['estado'], '304 Not Modified')
+
+    def test_delega_el_media_en_el_servidor_frontal(self):
+        os.makedirs(os.path.join(self.raiz, 'media', 'escenas'))
+        ruta = os.path.join(self.raiz, 'media', 'escenas', 'pano.jpg')
+        with open(ruta, 'wb') as archivo:
+            archivo.write(b'\xff\xd8' + b'0' * 100)
+        with override_settings(MEDIA_ROOT=os.path.join(self.raiz, 'media')):
+            directorios = [('/static/', self.raiz), ('/media/', os.path.join(self.raiz, 'media'))]
+            self.servidor = ServidorEstaticos(self.aplicacion, directorios, max_age=60)
+            with override_settings(CMS_ENVIO_ARCHIVOS={'DELEGAR': 'x-accel-redirect'}):
+                respuesta = self.pedir('/media/escenas/pano.jpg', HTTP_RANGE='bytes=0-9')
+                self.assertEqual(respuesta['estado'], '200 OK')
+                self.assertEqual(respuesta['cabeceras']['X-Accel-Redirect'], '/media-interna/escenas/pano.jpg')
+                self.assertEqual(respuesta['cuerpo'], b'')
+                # Los estáticos no pasan por la delegación
+                self.assertNotIn('X-Accel-Redirect', self.pedir('/static/360.jpg')['cabeceras'])
+            with override_settings(CMS_ENVIO_ARCHIVOS={'DELEGAR': 'x-sendfile'}):
+                respuesta = self.pedir('/media/escenas/pano.jpg')
+                self.assertEqual(respuesta['cabeceras']['X-Sendfile'], os.path.realpath(ruta))
+
+
+class YoutubeTests(MediaTemporalMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.categoria = CategoriaEscena.objects.create(
+            titulo="Ríos",
+            icono=imagen_de_prueba('i.jpg', (32, 32)),
+        )
+
+    def crear_escena(self, video):
+        return Escena360.objects.create(
+            categoria=self.categoria,
+            titulo="Nacimiento",
+            video_youtube=video,
+            imagen=imagen_de_prueba('p.jpg', (64, 40)),
+            icono=imagen_de_prueba('i.jpg', (32, 32)),
+        )
+
+    def test_formatos_de_url_reconocidos(self):
+        for url in (
+            'https://www.youtube.com/watch?v=AExMQmVgkOI',
+            'https://www.youtube.com/watch?feature=share&v=AExMQmVgkOI',
+            'https://m.youtube.com/watch?v=AExMQmVgkOI&t=42s',
+            'https://youtu.be/AExMQmVgkOI?si=abc',
+            'https://www.youtube.com/embed/AExMQmVgkOI?rel=0',
+            'https://www.youtube.com/shorts/AExMQmVgkOI',
+        ):
+            self.assertEqual(extraer_id_youtube(url), 'AExMQmVgkOI', url)
+
+        for url in ('', 'https://vimeo.com/12345', 'https://www.youtube.com/watch?v=corto', 'https://www.youtube.com/'):
+            self.assertIsNone(extraer_id_youtube(url), url)
+
+    def test_guardar_calcula_las_urls_canonicas(self):
+        escena = self.crear_escena('https://youtu.be/AExMQmVgkOI?si=abc')
+        escena = Escena360.objects.get(pk=escena.pk)
+
+        self.assertEqual(escena.youtube_id, 'AExMQmVgkOI')
+        self.assertEqual(escena.get_youtube_embed_url(), 'https://www.youtube.com/embed/AExMQmVgkOI')
+        self.assertEqual(escena.get_youtube_watch_url(), 'https://www.youtube.com/watch?v=AExMQmVgkOI')
+
+        escena.video_youtube = ''
+        escena.save(update_fields=['video_youtube'])
+        escena = Escena360.objects.get(pk=escena.pk)
+        self.assertEqual(escena.youtube_id, '')
+        self.assertIsNone(escena.get_youtube_embed_url())
+
+    def test_validacion_rechaza_urls_sin_video(self):
+        escena = self.crear_escena('')
+        escena.video_youtube = 'https://vimeo.com/12345'
+
+        with self.assertRaises(ValidationError) as contexto:
+            escena.full_clean()
+        self.assertIn('video_youtube', contexto.exception.message_dict)
+
+    def test_filtrar_escenas_con_video(self):
+        con_video = self.crear_escena('https://www.youtube.com/watch?v=AExMQmVgkOI')
+        self.crear_escena('')
+
+        self.assertEqual(list(escenas_con_video()), [con_video])
+
+
+@skipUnless(connection.vendor == 'sqlite', "El plan se comprueba con la salida de EXPLAIN de SQLite")
+class IndicesCatalogoTests(MediaTemporalMixin, TestCase):
+
+    def test_consultas_publicas_usan_indices_sin_ordenar(self):
+        categorias = crear_catalogo_sintetico(200, categorias=4)
+
+        for consulta, indice in (
+            (categorias_activas(), 'cms_categoria_activa_orden'),
+            (escenas_activas().filter(categoria=categorias[0]), 'cms_escena_activa_orden'),
+            (escenas_activas().filter(categoria__in=categorias), 'cms_escena_activa_orden'),
+            (LogoCreador.objects.filter(activo=True), 'cms_logo_activo_orden'),
+        ):
+            plan = consulta.explain()
+            self.assertIn(indice, plan)
+            self.assertNotIn('TEMP B-TREE', plan)
+
+
+@skipUnless(connection.vendor == 'sqlite', "Los PRAGMA solo se aplican a SQLite")
+class PragmasSqliteTests(SimpleTestCase):
+
+    def abrir(self, directorio, **opciones):
+        ajustes = {**connection.settings_dict, 'NAME': os.path.join(directorio, 'pragmas.sqlite3'), 'OPTIONS': opciones}
+        conexion = type(connections['default'])(ajustes, alias='pragmas')
+        conexion.ensure_connection()
+        self.addCleanup(conexion.close)
+        return conexion
+
+    def pragma(self, conexion, nombre):
+        with conexion.cursor() as cursor:
+            cursor.execute(f'PRAGMA {nombre}')
+            return cursor.fetchone()[0]
+
+    def test_conexion_nueva_recibe_los_pragmas(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+
+        with override_settings(CMS_SQLITE_PRAGMAS={'cache_size': -1000}):
+            conexion = self.abrir(directorio, timeout=20)
+
+        self.assertEqual(self.pragma(conexion, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(conexion, 'synchronous'), 1)
+        self.assertEqual(self.pragma(conexion, 'cache_size'), -1000)
+        # La espera al candado es la de OPTIONS['timeout'], no la sustituye ningún PRAGMA
+        self.assertEqual(self.pragma(conexion, 'busy_timeout'), 20000)
+
+    def test_perfil_del_benchmark_sale_de_los_ajustes_de_produccion(self):
+        produccion = import_module('core.settings.produccion')
+
+        perfil = perfil_produccion()
+
+        self.assertEqual(perfil['opciones'], produccion.DATABASES['default']['OPTIONS'])
+        self.assertTrue(perfil['reutilizar'])
+
+    def test_sin_ajuste_no_se_toca_la_conexion(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+
+        conexion = self.abrir(directorio)
+        self.assertEqual(self.pragma(conexion, 'journal_mode'), 'delete')
+
+    def test_rechaza_valores_que_no_son_pragmas(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+
+        conexion = self.abrir(directorio)
+        with self.assertRaises(ValueError):
+            aplicar_pragmas(conexion, {'journal_mode': 'WAL; DROP TABLE cms_escena360'})
+
+
+class ImportarEscenasTests(MediaTemporalMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.origen = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.origen, ignore_errors=True)
+        self.addCleanup(ruta_diario(self.origen).unlink, missing_ok=True)
+
+    def panoramica(self, ruta, color='blue'):
+        ruta = self.origen / ruta
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        Image.new('RGB', (256, 128), color).save(ruta, 'JPEG')
+        return ruta
+
+    def importar(self, origen=None, *argumentos):
+        salida, errores = StringIO(), StringIO()
+        call_command(
+            'import_escenas', str(origen or self.origen), '--procesos', '1', *argumentos,
+            stdout=salida, stderr=errores,
+        )
+        return salida.getvalue(), errores.getvalue()
+
+    def test_importa_un_directorio_con_una_carpeta_por_categoria(self):
+        self.panoramica('Cenotes/pozo_azul.jpg')
+        Image.new('RGB', (64, 64), 'red').save(self.origen / 'Cenotes' / 'pozo_azul.icono.png')
+        (self.origen / 'Cenotes' / 'pozo_azul.txt').write_text("Agua clara", encoding='utf-8')
+        self.panoramica('Ríos/rio.jpg', color='green')
+        version = cache_paginas.version_catalogo()
+
+        salida, _ = self.importar()
+
+        self.assertIn("2 escenas creadas", salida)
+        self.assertIn("escenas/s", salida)
+        escena = Escena360.objects.get(titulo="Pozo azul")
+        self.assertEqual(escena.categoria.titulo, "Cenotes")
+        self.assertEqual(escena.descripcion, "Agua clara")
+        self.assertTrue(es_nombre_por_contenido(escena.imagen.name))
+        self.assertIsNotNone(escena.get_multires_config())
+        self.assertTrue(escena.get_rendiciones('icono'))
+        # Sin icono propio se recorta uno de la panorámica
+        self.assertTrue(Escena360.objects.get(titulo="Rio").icono)
+        self.assertNotEqual(cache_paginas.version_catalogo(), version)
+
+    def test_manifiesto_csv_con_errores_por_fila(self):
+        self.panoramica('img/uno.jpg')
+        (self.origen / 'img' / 'rota.jpg').write_bytes(b'no es una imagen')
+        manifiesto = self.origen / 'escenas.csv'
+        manifiesto.write_text(
+            "categoria,titulo,imagen,orden,video_youtube,activa\n"
+            "Cenotes,Uno,img/uno.jpg,5,https://youtu.be/AExMQmVgkOI,\n"
+            "Cenotes,Rota,img/rota.jpg,,,\n"
+            "Cenotes,Oculta,img/uno.jpg,,https://example.com/video,no\n",
+            encoding='utf-8',
+        )
+        CategoriaEscena.objects.create(titulo="Cenotes", icono=imagen_de_prueba('icono.png', (64, 64), formato='PNG'))
+
+        salida, errores = self.importar(manifiesto)
+
+        self.assertIn("1 escenas creadas", salida)
+        self.assertIn("Rota", errores)
+        self.assertIn("Oculta", errores)
+        escena = Escena360.objects.get()
+        self.assertEqual((escena.orden, escena.activa, escena.youtube_id), (5, True, 'AExMQmVgkOI'))
+        self.assertEqual(CategoriaEscena.objects.count(), 1)
+
+    def test_orden_no_numerico_es_un_error_de_la_fila(self):
+        self.panoramica('img/uno.jpg')
+        self.panoramica('img/dos.jpg', color='red')
+        manifiesto = self.origen / 'escenas.csv'
+        manifiesto.write_text(
+            "categoria,titulo,imagen,orden\n"
+            "Cenotes,Uno,img/uno.jpg,primero\n"
+            "Cenotes,Dos,img/dos.jpg,3\n",
+            encoding='utf-8',
+        )
+
+        salida, errores = self.importar(manifiesto)
+
+        self.assertIn("1 escenas creadas", salida)
+        self.assertIn("primero", errores)
+        self.assertEqual(Escena360.objects.get().orden, 3)
+        self.assertFalse(ruta_diario(self.origen).exists())
+
+    def test_excepciones_de_imagen_solo_descartan_su_fila(self):
+        Image.new('RGB', (512, 256), 'blue').save(self.panoramica('Cenotes/enorme.jpg'), 'JPEG')
+        Image.new('RGB', (128, 64), 'red').save(self.panoramica('Cenotes/truncada.jpg'), 'JPEG')
+        Image.new('RGB', (128, 64), 'green').save(self.panoramica('Cenotes/normal.jpg'), 'JPEG')
+        generar_multires = importacion.generar_multires
+        truncada = nombre_panoramica(self.origen / 'Cenotes' / 'truncada.jpg')
+
+        def multires_con_fallo(nombre):
+            if nombre == truncada:
+                raise OSError("image file is truncated")
+            return generar_multires(nombre)
+
+        # 512×256 supera el doble de MAX_IMAGE_PIXELS: Pillow lanza DecompressionBombError
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 60000), \
+                mock.patch('apps.cms.importacion.generar_multires', side_effect=multires_con_fallo):
+            salida, errores = self.importar()
+
+        self.assertIn("1 escenas creadas", salida)
+        self.assertIn("enorme.jpg", errores)
+        self.assertIn("truncated", errores)
+        self.assertEqual(Escena360.objects.get().titulo, "Normal")
+
+    def test_volver_a_importar_no_duplica(self):
+        self.panoramica('Cenotes/pozo.jpg')
+        self.importar()
+
+        with mock.patch('apps.cms.importacion.procesar_escena') as procesar:
+            salida, _ = self.importar()
+
+        procesar.assert_not_called()
+        self.assertIn("1 escenas ya estaban importadas", salida)
+        self.assertEqual(Escena360.objects.count(), 1)
+
+    def test_rechaza_panoramicas_que_no_son_2_1(self):
+        Image.new('RGB', (300, 100), 'blue').save(self.panoramica('Cenotes/ancha.jpg'), 'JPEG')
+
+        _, errores = self.importar()
+
+        self.assertIn("2:1", errores)
+        self.assertFalse(Escena360.objects.exists())
+
+    def test_reanuda_una_importacion_interrumpida(self):
+        self.panoramica('Cenotes/a.jpg')
+        self.panoramica('Cenotes/b.jpg', color='red')
+
+        with mock.patch.object(Escena360.objects, 'bulk_create', side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                self.importar()
+        self.assertFalse(Escena360.objects.exists())
+        self.assertTrue(ruta_diario(self.origen).exists())
+
+        with mock.patch('apps.cms.importacion.procesar_escena') as procesar:
+            salida, _ = self.importar()
+
+        procesar.assert_not_called()
+        self.assertIn("2 escenas reutilizadas del diario", salida)
+        self.assertEqual(Escena360.objects.count(), 2)
+        self.assertFalse(ruta_diario(self.origen).exists())
+
+
+@override_settings(CMS_TAREAS={'EN_SEGUNDO_PLANO': True, 'RETARDO_REINTENTO': 0, 'INTENTOS': 2})
+class TareasImagenTests(MediaTemporalMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.categoria = CategoriaEscena.objects.create(
+            titulo="Cenotes",
+            icono=imagen_de_prueba('icono.png', (64, 64), formato='PNG'),
+        )
+        self.escena = Escena360.objects.create(
+            categoria=self.categoria,
+            titulo="Pozo",
+            imagen=imagen_de_prueba('pano.jpg', (256, 128)),
+            icono=imagen_de_prueba('icono.png', (64, 64), formato='PNG'),
+        )
+
+    def procesar(self):
+        call_command('run_cms_worker', '--una-vez', stdout=StringIO(), stderr=StringIO())
+
+    def test_guardar_solo_encola_una_tarea(self):
+        self.escena.refresh_from_db()
+        self.assertIsNone(self.escena.multires)
+        self.assertIsNone(self.escena.get_multires_config())
+        self.assertEqual(self.escena.get_rendiciones('icono'), [])
+        tareas = TareaImagen.objects.filter(modelo='cms.escena360', objeto_id=self.escena.pk)
+        self.assertEqual(list(tareas.values_list('estado', flat=True)), [TareaImagen.PENDIENTE])
+
+        # Guardar sin cambiar imágenes no encola nada más
+        self.escena.titulo = "Pozo azul"
+        self.escena.save()
+        self.assertEqual(tareas.count(), 1)
+
+    def test_el_trabajador_genera_los_derivados(self):
+        version = cache_paginas.version_catalogo()
+
+        self.procesar()
+
+        self.escena.refresh_from_db()
+        self.assertIsNotNone(self.escena.get_multires_config())
+        self.assertTrue(self.escena.get_rendiciones('icono'))
+        self.assertFalse(TareaImagen.objects.exclude(estado=TareaImagen.COMPLETADA).exists())
+        self.assertNotEqual(cache_paginas.version_catalogo(), version)
+
+    def test_reintenta_y_marca_como_fallida(self):
+        with mock.patch('apps.cms.models.generar_multires', side_effect=OSError("disco lleno")):
+            self.procesar()
+
+        tarea = TareaImagen.objects.get(modelo='cms.escena360')
+        self.assertEqual((tarea.estado, tarea.intentos), (TareaImagen.FALLIDA, 2))
+        self.assertIn("disco lleno", tarea.error)
+
+    def test_exito_tras_un_fallo_limpia_el_error(self):
+        TareaImagen.objects.exclude(modelo='cms.escena360').delete()
+        with mock.patch('apps.cms.models.generar_multires', side_effect=[OSError("disco lleno")]):
+            tarea = reclamar('prueba')
+            self.assertFalse(ejecutar(tarea))
+        tarea = reclamar('prueba')
+        self.assertTrue(ejecutar(tarea))
+
+        tarea.refresh_from_db()
+        self.assertEqual((tarea.estado, tarea.intentos, tarea.error), (TareaImagen.COMPLETADA, 2, ''))
+
+    def test_abandonadas_sin_intentos_se_marcan_como_fallidas(self):
+        antes = timezone.now() - timedelta(hours=1)
+        agotada = TareaImagen.objects.get(modelo='cms.escena360')
+        TareaImagen.objects.filter(pk=agotada.pk).update(
+            estado=TareaImagen.EN_PROCESO, intentos=2, fecha_inicio=antes,
+        )
+        pendiente = TareaImagen.objects.create(
+            modelo='cms.categoriaescena', objeto_id=self.categoria.pk,
+            estado=TareaImagen.EN_PROCESO, intentos=1, fecha_inicio=antes,
+        )
+
+        self.assertEqual(recuperar_abandonadas(), 1)
+
+        agotada.refresh_from_db()
+        pendiente.refresh_from_db()
+        self.assertEqual(agotada.estado, TareaImagen.FALLIDA)
+        self.assertIsNotNone(agotada.fecha_fin)
+        self.assertEqual(pendiente.estado, TareaImagen.PENDIENTE)
+
+    def test_objeto_borrado_completa_la_tarea(self):
+        Escena360.objects.filter(pk=self.escena.pk).delete()
+
+        self.procesar()
+
+        self.assertEqual(TareaImagen.objects.get(modelo='cms.escena360').estado, TareaImagen.COMPLETADA)
+
+    def test_estado_en_el_listado_del_admin(self):
+        usuario = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'clave')
+        self.client.force_login(usuario)
+
+        respuesta = self.client.get(reverse('admin:cms_escena360_changelist'))
+
+        self.assertContains(respuesta, "Procesamiento")
+        self.assertContains(respuesta, "Pendiente")
+
+
+class MetadatosImagenTests(MediaTemporalMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.categoria = CategoriaEscena.objects.create(
+            titulo="Cenotes",
+            icono=imagen_de_prueba('icono.png', (64, 48), formato='PNG'),
+        )
+
+    def crear_escena(self, tamano=(400, 200)):
+        return Escena360.objects.create(
+            categoria=self.categoria,
+            titulo="Pozo",
+            imagen=imagen_de_prueba('pano.jpg', tamano),
+            icono=imagen_de_prueba('icono.png', (80, 80), formato='PNG'),
+        )
+
+    def test_guardar_registra_dimensiones_y_metadatos(self):
+        escena = Escena360.objects.get(pk=self.crear_escena().pk)
+
+        self.assertEqual((escena.imagen_ancho, escena.imagen_alto), (400, 200))
+        self.assertEqual((escena.icono_ancho, escena.icono_alto), (80, 80))
+        datos = escena.get_metadatos('imagen')
+        self.assertEqual(datos['formato'], 'JPEG')
+        self.assertEqual(datos['bytes'], escena.imagen.size)
+        self.assertIn(datos['hash'], escena.imagen.name)
+        self.assertEqual((self.categoria.icono_ancho, self.categoria.icono_alto), (64, 48))
+
+        serializada = serializar_escena(escena)
+        self.assertEqual((serializada['imagenAncho'], serializada['imagenAlto']), (400, 200))
+        self.assertEqual(serializada['imagenBytes'], datos['bytes'])
+
+    def test_valida_proporcion_y_presupuesto_de_pixeles(self):
+        escena = Escena360(
+            categoria=self.categoria,
+            titulo="Pozo",
+            imagen=imagen_de_prueba('pano.jpg', (300, 200)),
+            icono=imagen_de_prueba('icono.png', (80, 80), formato='PNG'),
+        )
+        with self.assertRaisesMessage(ValidationError, "2:1"):
+            escena.full_clean()
+
+        escena.imagen = imagen_de_prueba('pano.jpg', (400, 200))
+        escena.full_clean()
+        with override_settings(CMS_IMAGENES={'MAX_PIXELES': 400 * 200 - 1}):
+            with self.assertRaisesMessage(ValidationError, "máximo"):
+                escena.full_clean()
+
+    def test_filas_sin_dimensiones_no_abren_el_archivo(self):
+        escena = self.crear_escena()
+        Escena360.objects.filter(pk=escena.pk).update(imagen='escenas/no-existe.jpg', imagen_ancho=None)
+
+        self.assertIsNone(Escena360.objects.get(pk=escena.pk).imagen_ancho)
+
+    def test_completar_metadatos_rellena_las_filas_existentes(self):
+        escena = self.crear_escena()
+        Escena360.objects.update(metadatos={}, imagen_ancho=None, imagen_alto=None, icono_ancho=None)
+        version = cache_paginas.version_catalogo()
+
+        salida = StringIO()
+        call_command('completar_metadatos', '--procesos', '1', stdout=salida)
+
+        escena.refresh_from_db()
+        self.assertEqual((escena.imagen_ancho, escena.imagen_alto, escena.icono_ancho), (400, 200, 80))
+        self.assertEqual(escena.get_metadatos('imagen')['formato'], 'JPEG')
+        self.assertIn("2 imágenes leídas", salida.getvalue())
+        self.assertNotEqual(cache_paginas.version_catalogo(), version)
+
+
+class PrecargaEscenasTests(MediaTemporalMixin, TestCase):
+    """La página del visor anuncia las primeras escenas de la categoría inicial"""
+
+    def setUp(self):
+        super().setUp()
+        ConfiguracionInterfaz.objects.create()
+        categoria = CategoriaEscena.objects.create(titulo="Cenotes", icono=imagen_de_prueba('i.jpg', (32, 32)))
+        self.escenas = [
+            Escena360.objects.create(
+                categoria=categoria,
+                titulo=f"Escena {orden}",
+                orden=orden,
+                imagen=imagen_de_prueba('p.jpg', (400, 200), color=(orden * 60, 0, 0)),
+                icono=imagen_de_prueba('i.jpg', (32, 32)),
+            )
+            for orden in (4, 3, 2, 1)
+        ][::-1]
+        # Solo la escena inicial conserva sus teselas
+        Escena360.objects.exclude(pk=self.escenas[0].pk).update(multires={})
+        self.url = reverse('cms:visor_360')
+
+    def test_escena_inicial_con_teselas_y_siguientes_por_orden(self):
+        with override_settings(CMS_PRECARGA={'ESCENAS': 2}):
+            respuesta = self.client.get(self.url)
+
+        ruta = default_storage.url(self.escenas[0].multires['ruta'])
+        for cara in 'frblud':
+            self.assertContains(
+                respuesta,
+                f'<link rel="preload" href="{ruta}/1/{cara}0_0.jpg" as="image" crossorigin fetchpriority="high">',
+            )
+        for escena in self.escenas[1:3]:
+            self.assertContains(respuesta, f'<link rel="prefetch" href="{escena.imagen.url}" as="fetch" crossorigin>')
+        self.assertNotContains(respuesta, f'href="{self.escenas[3].imagen.url}"')
+
+        enlaces = respuesta['Link'].split(', ')
+        self.assertEqual(len(enlaces), 8)
+        self.assertEqual(enlaces[0], f'<{ruta}/1/f0_0.jpg>; rel=preload; as=image; crossorigin')
+        self.assertEqual(enlaces[6], f'<{self.escenas[1].imagen.url}>; rel=prefetch; as=fetch; crossorigin')
+
+    def test_presupuesto_de_bytes(self):
+        bytes_escena = self.escenas[1].get_metadatos('imagen')['bytes']
+        with override_settings(CMS_PRECARGA={'ESCENAS': 3, 'PRESUPUESTO_BYTES': bytes_escena}):
+            respuesta = self.client.get(self.url)
+
+        self.assertEqual(respuesta['Link'].count('rel=prefetch'), 1)
+        self.assertNotContains(respuesta, f'href="{self.escenas[2].imagen.url}"')
+
+    async def test_cabecera_link_en_la_vista_asincrona(self):
+        sincrono = await sync_to_async(self.client.get)(self.url)
+        await cache.aclear()
+
+        asincrono = await views.visor_360_async(AsyncRequestFactory().get('/'))
+        self.assertEqual(asincrono['Link'], sincrono['Link'])
+        # La cabecera se sirve desde la caché junto al HTML
+        cacheado = await views.visor_360_async(AsyncRequestFactory().get('/'))
+        self.assertEqual(cacheado['Link'], sincrono['Link'])
+
+
+class CatalogoDeRellenoTests(MediaTemporalMixin, TestCase):
+
+    def test_catalogo_sintetico_no_escribe_en_el_media(self):
+        crear_catalogo_sintetico(10, categorias=2)
+        crear_catalogo_sintetico(10, categorias=2)
+
+        self.assertEqual(ConfiguracionInterfaz.objects.count(), 1)
+        self.assertEqual(os.listdir(self.media_root), [])
+
+    def test_seed_catalog_crea_escenas_con_imagenes(self):
+        call_command('seed_catalog', '--categorias', '2', '--escenas', '3', '--ancho', '64', stdout=StringIO())
+
+        self.assertEqual(CategoriaEscena.objects.filter(titulo__startswith="Semilla ").count(), 2)
+        escenas = list(Escena360.objects.all())
+        self.assertEqual(len(escenas), 6)
+        self.assertEqual(len({escena.imagen.name for escena in escenas}), 6)
+        for escena in escenas:
+            self.assertTrue(default_storage.exists(escena.imagen.name))
+            self.assertEqual((escena.imagen_ancho, escena.imagen_alto), (64, 32))
+            self.assertEqual(escena.get_metadatos('imagen')['bytes'], escena.imagen.size)
+
+        ConfiguracionInterfaz.objects.create()
+        self.assertContains(self.client.get(reverse('cms:visor_360')), "Escena 3")
+
+        call_command(
+            'seed_catalog', '--categorias', '1', '--escenas', '2', '--ancho', '64', '--borrar', '--derivados',
+            stdout=StringIO(),
+        )
+        self.assertEqual(Escena360.objects.count(), 2)
+        self.assertEqual(TareaImagen.objects.filter(estado=TareaImagen.PENDIENTE).count(), 3)
+
+    def test_bench_carga_sobre_el_catalogo_actual(self):
+        call_command('seed_catalog', '--categorias', '1', '--escenas', '2', '--ancho', '64', stdout=StringIO())
+        ConfiguracionInterfaz.objects.create()
+        get_user_model().objects.create_superuser('admin', 'admin@example.com', 'clave')
+
+        salida = StringIO()
+        call_command(
+            'bench_carga', '--catalogo-actual', '--usuario', 'admin', '--escenarios', 'visor,admin_escenas,media',
+            '--clientes', '1', '--peticiones', '3', '--json', stdout=salida, stderr=StringIO(),
+        )
+        informe = json.loads(salida.getvalue())
+        self.assertEqual([fila['escenario'] for fila in informe['resultados']], ['visor', 'admin_escenas', 'media'])
+        for fila in informe['resultados']:
+            self.assertEqual(fila['errores'], 0, fila['escenario'])
+            self.assertEqual(fila['peticiones'], 3)
+            self.assertIn('p99_ms', fila)
+        self.assertGreater(informe['resultados'][1]['consultas_media'], 0)
+
+
+class MetricasTests(MediaTemporalMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        ConfiguracionInterfaz.objects.create()
+        CategoriaEscena.objects.create(titulo="Cenotes", icono=imagen_de_prueba('i.jpg', (32, 32)))
+
+    @override_settings(CMS_METRICAS={'ACTIVAS': False})
+    def test_desactivadas_no_exponen_nada(self):
+        self.assertEqual(self.client.get(reverse('cms:metricas')).status_code, 404)
+
+    @skipUnless(metricas.prometheus_client, "prometheus_client no está instalado")
+    def test_peticiones_consultas_plantillas_cache_y_media(self):
+        valor = metricas.prometheus_client.REGISTRY.get_sample_value
+
+        def muestras():
+            return {
+                'peticiones': valor('cms_peticion_segundos_count', {'vista': 'cms:visor_360', 'metodo': 'GET', 'estado': '200'}),
+                'consultas': valor('cms_peticion_consultas_sum', {'vista': 'cms:visor_360'}),
+                'plantilla': valor('cms_plantilla_segundos_count', {'plantilla': 'cms/visor360.html'}),
+                'fallos': valor('cms_cache_catalogo_total', {'cache': 'cms:visor360:pagina', 'resultado': 'fallo'}),
+                'aciertos': valor('cms_cache_catalogo_total', {'cache': 'cms:visor360:pagina', 'resultado': 'acierto'}),
+                'media': valor('cms_media_bytes_total', {'servidor': 'django'}),
+            }
+
+        antes = {clave: numero or 0 for clave, numero in muestras().items()}
+        self.client.get(reverse('cms:visor_360'))
+        self.client.get(reverse('cms:visor_360'))
+        icono = CategoriaEscena.objects.get().icono
+        self.client.get(icono.url)
+        despues = muestras()
+
+        self.assertEqual(despues['peticiones'] - antes['peticiones'], 2)
+        self.assertGreater(despues['consultas'] - antes['consultas'], 0)
+        self.assertEqual(despues['plantilla'] - antes['plantilla'], 1)
+        self.assertEqual(despues['fallos'] - antes['fallos'], 1)
+        self.assertEqual(despues['aciertos'] - antes['aciertos'], 1)
+        self.assertEqual(despues['media'] - antes['media'], icono.size)
+
+        respuesta = self.client.get(reverse('cms:metricas'))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertContains(respuesta, 'cms_peticion_segundos_bucket')
+        self.assertEqual(self.client.get(reverse('cms:metricas'), REMOTE_ADDR='10.0.0.1').status_code, 403)
+
+
+class PilaLigeraTests(CatalogoDePruebaMixin, TestCase):
+
+    def test_rutas_publicas(self):
+        icono = self.rios.icono.url
+        for ruta in ('/', '/api/categorias/', f'/api/categorias/{self.rios.pk}/escenas/', '/metrics', icono):
+            self.assertTrue(es_ruta_publica(ruta), ruta)
+        for ruta in ('/admin/', '/admin/login/', '/api/', '/metrics/extra'):
+            self.assertFalse(es_ruta_publica(ruta), ruta)
+
+    def test_get_publico_sin_sesion_usuario_ni_mensajes(self):
+        for ruta in (reverse('cms:visor_360'), reverse('cms:api_categorias')):
+            respuesta = self.client.get(ruta)
+            self.assertEqual(respuesta.status_code, 200)
+            for atributo in ('session', 'user', '_messages'):
+                self.assertFalse(hasattr(respuesta.wsgi_request, atributo), (ruta, atributo))
+            self.assertNotIn('Cookie', respuesta.get('Vary', ''))
+            self.assertFalse(respuesta.cookies)
+
+    def test_visor_sin_context_processors_de_auth_ni_messages(self):
+        respuesta = self.client.get(reverse('cms:visor_360'))
+        self.assertEqual(respuesta.templates[0].name, 'cms/visor360.html')
+        self.assertNotIn('user', respuesta.context)
+        self.assertNotIn('messages', respuesta.context)
+
+    def test_admin_conserva_la_pila_completa(self):
+        usuario = get_user_model().objects.create_superuser('editor', 'editor@example.com', 'clave')
+        self.client.force_login(usuario)
+        respuesta = self.client.get(reverse('admin:index'))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.wsgi_request.user.is_authenticated)
+        self.assertIn('messages', respuesta.context)
+
+    def test_post_publico_pasa_por_csrf(self):
+        respuesta = Client(enforce_csrf_checks=True).post(reverse('cms:visor_360'))
+        self.assertEqual(respuesta.status_code, 403)
+        self.assertTrue(hasattr(respuesta.wsgi_request, 'session'))
+
+
+    def test_check_deploy_reconoce_la_subclase_de_csrf(self):
+        def avisos():
+            resultado = run_checks(include_deployment_checks=True, tags=[Tags.security])
+            return {aviso.id for aviso in resultado if not aviso.is_silenced()}
+
+        self.assertFalse({'security.W003', 'cms.W003'} & avisos())
+        with override_settings(MIDDLEWARE=[ruta for ruta in settings.MIDDLEWARE if 'Csrf' not in ruta]):
+            self.assertIn('cms.W003', avisos())
+
+class ListasAdminTests(CatalogoDePruebaMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        usuario = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'clave')
+        self.client.force_login(usuario)
+
+    def test_editar_escena_sin_subir_imagen(self):
+        escena = Escena360.objects.get(titulo="Nacimiento")
+        url = reverse('admin:cms_escena360_change', args=[escena.pk])
+        formulario = self.client.get(url).context['adminform'].form
+        datos = {
+            nombre: valor for nombre, valor in formulario.initial.items()
+            if nombre in formulario.fields and valor is not None and valor is not False and not hasattr(valor, 'url')
+        }
+
+        respuesta = self.client.post(url, {**datos, 'titulo': "Manantial"})
+
+        self.assertRedirects(respuesta, reverse('admin:cms_escena360_changelist'))
+        escena.refresh_from_db()
+        self.assertEqual(escena.titulo, "Manantial")
+        # A nivel de modelo: reasignar la imagen guardada tampoco rompe la validación
+        escena.imagen = escena.imagen
+        escena.full_clean()
+
+    def test_filtro_de_categoria_con_autocompletado(self):
+        url = reverse('admin:cms_escena360_changelist')
+
+        respuesta = self.client.get(url)
+        self.assertContains(respuesta, 'data-field-name="categoria"')
+        self.assertContains(respuesta, 'js/filtro_autocompletar.js')
+        # Sin escenas en la página, la categoría oculta no aparece: el filtro no lista todas
+        self.assertNotContains(respuesta, "Oculta")
+
+        respuesta = self.client.get(url, {'categoria__id__exact': self.cenotes.pk, 'activa__exact': 1})
+        self.assertContains(respuesta, "Pozo Esmeralda")
+        self.assertNotContains(respuesta, "Nacimiento")
+        self.assertContains(respuesta, f'<option value="{self.cenotes.pk}" selected>Cenotes</option>', html=True)
+        self.assertContains(respuesta, 'data-consulta="?activa__exact=1"')
+
+        sugerencias = self.client.get(reverse('admin:autocomplete'), {
+            'app_label': 'cms', 'model_name': 'escena360', 'field_name': 'categoria', 'term': 'Cen',
+        }).json()
+        self.assertEqual([resultado['text'] for resultado in sugerencias['results']], ["Cenotes"])
+
+    def test_consultas_constantes_con_mas_escenas(self):
+        url = reverse('admin:cms_escena360_changelist')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as pocas:
+            self.client.get(url)
+        for indice in range(10):
+            Escena360.objects.create(
+                categoria=CategoriaEscena.objects.create(titulo=f"Nueva {indice}", icono=imagen_de_prueba('i.jpg', (32, 32))),
+                titulo=f"Escena {indice}",
+                imagen=imagen_de_prueba('p.jpg', (64, 32)),
+                icono=imagen_de_prueba('i.jpg', (32, 32)),
+            )
+        with CaptureQueriesContext(connection) as muchas:
+            respuesta = self.client.get(url)
+        self.assertEqual(len(muchas), len(pocas))
+        self.assertContains(respuesta, "Nueva 9 - Escena 9")
+
+    def test_miniatura_usa_la_rendicion_pequena(self):
+        self.rios.actualizar_rendiciones(forzar=True)
+        respaldo = self.rios.get_formatos_rendicion('icono')[-1]
+        pequena = next(v for v in self.rios.get_rendiciones('icono') if v['formato'] == respaldo and v['densidad'] == 1)
+
+        self.assertEqual(self.rios.get_url_miniatura('icono'), default_storage.url(pequena['nombre']))
+        respuesta = self.client.get(reverse('admin:cms_categoriaescena_changelist'))
+        self.assertContains(respuesta, default_storage.url(pequena['nombre']))
+
+    @skipUnless(connection.vendor == 'sqlite', "La estimación de SQLite es MAX(rowid)")
+    def test_estimacion_sqlite_sin_recorrer_la_tabla(self):
+        maximo = Escena360.objects.order_by('-pk').values_list('pk', flat=True).first()
+        Escena360.objects.filter(titulo="Nacimiento").delete()
+        self.assertEqual(filas_estimadas(Escena360), maximo)
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN SELECT MAX(rowid) FROM cms_escena360')
+            self.assertTrue(cursor.fetchone()[-1].startswith('SEARCH'))
+
+        with override_settings(CMS_PAGINACION_ADMIN={'UMBRAL_ESTIMACION': 1}), \
+                CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(PaginadorEstimado(Escena360.objects.order_by('pk'), 100).count, maximo)
+        self.assertFalse(any('COUNT' in consulta['sql'] for consulta in consultas))
+
+    def test_paginador_estima_solo_sin_filtros(self):
+        with mock.patch('apps.cms.paginacion.filas_estimadas', return_value=250000):
+            self.assertEqual(PaginadorEstimado(Escena360.objects.order_by('pk'), 100).count, 250000)
+            self.assertEqual(PaginadorEstimado(Escena360.objects.filter(activa=True), 100).count, 2)
+            with override_settings(CMS_PAGINACION_ADMIN={'UMBRAL_ESTIMACION': 10 ** 6}):
+                self.assertEqual(PaginadorEstimado(Escena360.objects.order_by('pk'), 100).count, 3)
+
+
+class OrdenarAdminTests(CatalogoDePruebaMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        usuario = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'clave')
+        self.client.force_login(usuario)
+        self.url = reverse('admin:cms_categoriaescena_ordenar')
+
+    def test_pagina_lista_los_objetos_en_orden(self):
+        oculta = CategoriaEscena.objects.get(titulo="Oculta")
+        respuesta = self.client.get(self.url)
+        self.assertContains(respuesta, 'js/ordenar.js')
+        self.assertContains(respuesta, f'value="{oculta.pk},{self.rios.pk},{self.cenotes.pk}"')
+        self.assertContains(respuesta, f'data-id="{self.cenotes.pk}"')
+
+        lista = self.client.get(reverse('admin:cms_categoriaescena_changelist'))
+        self.assertContains(lista, f'href="{self.url}"')
+
+    def test_guardar_orden_con_un_solo_update(self):
+        oculta = CategoriaEscena.objects.get(titulo="Oculta")
+        antes = CategoriaEscena.objects.get(pk=self.rios.pk).fecha_modificacion
+        orden = f'{self.cenotes.pk},{oculta.pk},{self.rios.pk}'
+        with mock.patch('apps.cms.admin.invalidar_catalogo') as invalidar, \
+                mock.patch('apps.cms.signals.invalidar_catalogo') as por_senal, \
+                self.captureOnCommitCallbacks(execute=True), \
+                CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.post(self.url, {'orden': orden})
+        # Antes de assertRedirects: la siguiente petición vacía el registro de consultas
+        updates = [consulta['sql'] for consulta in consultas if consulta['sql'].startswith('UPDATE')]
+
+        self.assertEqual(len(updates), 1)
+        self.assertRedirects(respuesta, reverse('admin:cms_categoriaescena_changelist'))
+        invalidar.assert_called_once_with()
+        por_senal.assert_not_called()
+        self.assertEqual(
+            list(CategoriaEscena.objects.order_by('orden').values_list('titulo', 'orden')),
+            [("Cenotes", 0), ("Oculta", 1), ("Ríos", 2)],
+        )
+        self.assertGreater(CategoriaEscena.objects.get(pk=self.rios.pk).fecha_modificacion, antes)
+
+    def test_orden_sin_cambios_no_invalida(self):
+        CategoriaEscena.objects.filter(titulo="Oculta").update(orden=5)
+        ids = ','.join(str(pk) for pk in CategoriaEscena.objects.values_list('pk', flat=True))
+        self.client.post(self.url, {'orden': ids})
+        with mock.patch('apps.cms.admin.invalidar_catalogo') as invalidar, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.url, {'orden': ids})
+        invalidar.assert_not_called()
+
+    def test_ids_distintos_no_guardan_nada(self):
+        antes = list(CategoriaEscena.objects.values_list('pk', 'orden'))
+        for orden in (f'{self.rios.pk},{self.cenotes.pk}', 'a,b', f'{self.rios.pk},{self.cenotes.pk},999'):
+            respuesta = self.client.post(self.url, {'orden': orden}, follow=True)
+            self.assertContains(respuesta, "La lista cambió mientras la ordenaba")
+        self.assertEqual(list(CategoriaEscena.objects.values_list('pk', 'orden')), antes)
+
+    def test_escenas_se_ordenan_dentro_de_su_categoria(self):
+        lista = reverse('admin:cms_escena360_changelist')
+        url = reverse('admin:cms_escena360_ordenar')
+        self.assertNotContains(self.client.get(lista), url)
+        self.assertContains(self.client.get(lista, {'categoria__id__exact': self.cenotes.pk}), f'{url}?categoria={self.cenotes.pk}')
+
+        respuesta = self.client.get(url, follow=True)
+        self.assertRedirects(respuesta, lista)
+        self.assertContains(respuesta, "Filtre la lista por categoría")
+
+        borrador, pozo = Escena360.objects.filter(categoria=self.cenotes).order_by('titulo')
+        respuesta = self.client.post(f'{url}?categoria={self.cenotes.pk}', {'orden': f'{pozo.pk},{borrador.pk}'})
+        self.assertRedirects(respuesta, f'{lista}?categoria__id__exact={self.cenotes.pk}')
+        self.assertEqual(
+            list(Escena360.objects.filter(categoria=self.cenotes).order_by('orden').values_list('titulo', flat=True)),
+            ["Pozo Esmeralda", "Borrador"],
+        )
+        # Una escena de otra categoría no entra en el orden
+        nacimiento = Escena360.objects.get(titulo="Nacimiento")
+        self.client.post(f'{url}?categoria={self.cenotes.pk}', {'orden': f'{nacimiento.pk},{borrador.pk}'})
+        self.assertEqual(Escena360.objects.get(pk=borrador.pk).orden, 1)
+
+    def test_logos(self):
+        primero = LogoCreador.objects.create(nombre="B", logo=imagen_de_prueba('l.png', (40, 20)))
+        segundo = LogoCreador.objects.create(nombre="A", logo=imagen_de_prueba('l.png', (40, 20)))
+        url = reverse('admin:cms_logocreador_ordenar')
+        self.assertContains(self.client.get(url), f'data-id="{primero.pk}"')
+        self.client.post(url, {'orden': f'{primero.pk},{segundo.pk}'})
+        self.assertEqual(list(LogoCreador.objects.values_list('nombre', flat=True)), ["B", "A"])
@@ -1,8 +1,20 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
 app_name = 'cms'
 
-urlpatterns = [
-    path('', views.visor_360, name='visor_360'),
-]
\ No newline at end of file
+if getattr(settings, 'CMS_VISTAS_ASINCRONAS', False):
+    urlpatterns = [
+        path('', views.visor_360_async, name='visor_360'),
+        path('api/categorias/', views.api_categorias_async, name='api_categorias'),
+        path('api/categorias/<int:categoria_id>/escenas/', views.api_escenas_categoria_async, name='api_escenas_categoria'),
+        path('metrics', views.metricas, name='metricas'),
+    ]
+else:
+    urlpatterns = [
+        path('', views.visor_360, name='visor_360'),
+        path('api/categorias/', views.api_categorias, name='api_categorias'),
+        path('api/categorias/<int:categoria_id>/escenas/', views.api_escenas_categoria, name='api_escenas_categoria'),
+        path('metrics', views.metricas, name='metricas'),
+    ]
@@ -1,38 +1,353 @@
-from django.shortcuts import render
-from .models import CategoriaEscena, Escena360, LogoCreador, ConfiguracionInterfaz
+import json
+import mimetypes
+import os
+from datetime import datetime, timezone
+from functools import wraps
 
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden, StreamingHttpResponse
+from django.template import engines
+from django.template.loader import render_to_string
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_safe
+from django.views.static import serve
+from .cache import aestado_catalogo, apagina_cacheada, estado_catalogo, pagina_cacheada
+from .catalogo import (
+    categorias_activas,
+    categorias_con_escenas,
+    escenas_activas,
+    serializar_categoria,
+    serializar_escena,
+)
+from .envio import abrir_tramo, cabecera_delegacion, leer_tramo, preparar_envio
+from .metricas import (
+    activas as metricas_activas,
+    exponer as exponer_metricas,
+    obtener_configuracion as configuracion_metricas,
+)
+from .models import LogoCreador, ConfiguracionInterfaz
+from .precarga import cabecera_link, recursos_precarga
+from .storage import CACHE_INMUTABLE, es_nombre_por_contenido
 
-def visor_360(request):
-    """Vista principal del visor 360"""
+
+def _contexto_visor(carga_diferida=None):
+    """Construye el contexto del visor a partir del catálogo"""
+    
+    if carga_diferida is None:
+        carga_diferida = getattr(settings, 'CMS_VISOR_CARGA_DIFERIDA', False)
+    if carga_diferida:
+        categorias = list(categorias_activas())
+    else:
+        categorias = list(categorias_con_escenas())
+    
+    config = ConfiguracionInterfaz.get_solo()
+    
+    logos = list(LogoCreador.objects.filter(activo=True))
+    
+    escenas_iniciales = None
+    if carga_diferida and categorias:
+        escenas_iniciales = list(escenas_activas().filter(categoria=categorias[0]))
+    
+    return _armar_contexto(categorias, escenas_iniciales, config, logos, carga_diferida)
+
+
+async def _acontexto_visor(carga_diferida=None):
+    """Versión asíncrona de ``_contexto_visor`` con el ORM asíncrono"""
+    
+    if carga_diferida is None:
+        carga_diferida = getattr(settings, 'CMS_VISOR_CARGA_DIFERIDA', False)
+    if carga_diferida:
+        categorias = [categoria async for categoria in categorias_activas()]
+    else:
+        categorias = [categoria async for categoria in categorias_con_escenas()]
+    
+    config = await ConfiguracionInterfaz.aget_solo()
     
-    categorias = CategoriaEscena.objects.filter(activa=True).prefetch_related('escenas')
+    logos = [logo async for logo in LogoCreador.objects.filter(activo=True)]
     
-    config = ConfiguracionInterfaz.objects.first()
-    if not config:
-        config = ConfiguracionInterfaz.objects.create()
+    escenas_iniciales = None
+    if carga_diferida and categorias:
+        escenas_iniciales = [escena async for escena in escenas_activas().filter(categoria=categorias[0])]
     
-    logos = LogoCreador.objects.filter(activo=True)
+    return _armar_contexto(categorias, escenas_iniciales, config, logos, carga_diferida)
+
+
+def _armar_contexto(categorias, escenas_iniciales, config, logos, carga_diferida):
+    """Contexto del visor a partir de los objetos ya cargados; no consulta la base de datos"""
+    
+    categoria_inicial = categorias[0] if categorias else None
+    escenas_data = {}
+    if carga_diferida:
+        # Solo se incrusta la primera categoría; el resto se pide a la API al abrirla
+        if categoria_inicial:
+            escenas_data[categoria_inicial.id] = [serializar_escena(escena) for escena in escenas_iniciales]
+    else:
+        for categoria in categorias:
+            escenas_data[categoria.id] = [serializar_escena(escena) for escena in categoria.escenas_activas]
     
     escena_inicial = None
     imagen_inicial = None
+    precarga = []
     
-    if categorias.exists():
-        primera_categoria = categorias.first()
-        escenas_primera_categoria = primera_categoria.escenas.filter(activa=True)
+    if categoria_inicial:
+        escenas_primera_categoria = escenas_data[categoria_inicial.id]
+        precarga = recursos_precarga(escenas_iniciales if carga_diferida else categoria_inicial.escenas_activas)
         
-        if escenas_primera_categoria.exists():
-            escena_inicial = escenas_primera_categoria.first()
-            imagen_inicial = escena_inicial.imagen.url
-        elif primera_categoria.imagen_fondo:
-            imagen_inicial = primera_categoria.imagen_fondo.url
+        if escenas_primera_categoria:
+            escena_inicial = escenas_primera_categoria[0]
+            imagen_inicial = escena_inicial['imagen']
+        elif categoria_inicial.imagen_fondo:
+            imagen_inicial = categoria_inicial.get_url_rendicion('imagen_fondo')
     
-    context = {
+    return {
         'categorias': categorias,
+        'categoria_inicial': categoria_inicial,
+        'escenas_data': escenas_data,
+        'carga_diferida': carga_diferida,
         'escena_inicial': escena_inicial,
         'imagen_inicial': imagen_inicial,
+        'precarga': precarga,
         'titulo': config.titulo_principal if config else 'Visor 360',
         'logos': logos,
         'config': config,
     }
+
+
+def _renderizar_visor(contexto, request=None):
+    """HTML del visor, con el motor de plantillas 'publico' si está configurado"""
+    motor = 'publico' if 'publico' in engines else None
+    return render_to_string('cms/visor360.html', contexto, request, using=motor)
+
+
+def etag_catalogo(request, *args, **kwargs):
+    """ETag de las páginas públicas: la versión del catálogo"""
+    return estado_catalogo()['version']
+
+
+def ultima_modificacion_catalogo(request, *args, **kwargs):
+    """Last-Modified de las páginas públicas: la última edición del catálogo"""
+    modificado = estado_catalogo()['modificado']
+    if not modificado:
+        return None
+    return datetime.fromtimestamp(modificado, tz=timezone.utc)
+
+
+# no-cache obliga al navegador a revalidar; la respuesta a la revalidación es
+# un 304 que no consulta la base de datos ni renderiza la plantilla
+@cache_control(no_cache=True)
+@condition(etag_func=etag_catalogo, last_modified_func=ultima_modificacion_catalogo)
+def visor_360(request):
+    """Vista principal del visor 360"""
+    
+    def generar():
+        contexto = _contexto_visor()
+        return _renderizar_visor(contexto, request), cabecera_link(contexto['precarga'])
+    
+    contenido, estado = pagina_cacheada('cms:visor360:pagina', generar)
+    return _validadores(_respuesta_visor(*contenido), estado)
+
+
+def _validadores(respuesta, estado):
+    """
+    ETag y Last-Modified del contenido servido.
+
+    Mientras otro worker renderiza la versión nueva se sirve la copia
+    anterior; con los validadores de la versión vigente el cliente la
+    guardaría como actual y recibiría 304 hasta la siguiente edición.
+    """
+    respuesta.headers['ETag'] = quote_etag(estado['version'])
+    if estado['modificado']:
+        respuesta.headers['Last-Modified'] = http_date(int(estado['modificado']))
+    return respuesta
+
+
+def _respuesta_visor(html, enlaces):
+    """Página del visor con la cabecera Link de precarga, cacheada junto al HTML"""
+    respuesta = HttpResponse(html)
+    if enlaces:
+        respuesta.headers['Link'] = enlaces
+    return respuesta
+
+
+# Se cachea en lugar del JSON cuando la categoría no existe o está oculta, para
+# que las peticiones a ese id no esperen al candado de un render que nunca se guarda
+CATEGORIA_INEXISTENTE = ''
+
+
+def _respuesta_json(contenido):
+    return HttpResponse(contenido, content_type='application/json')
+
+
+def _cache_api(vista):
+    """Cabeceras de caché comunes de la API: max-age corto más revalidación por ETag"""
+    max_age = getattr(settings, 'CMS_API_MAX_AGE', 60)
+    vista = condition(etag_func=etag_catalogo, last_modified_func=ultima_modificacion_catalogo)(vista)
+    return require_safe(cache_control(public=True, max_age=max_age)(vista))
+
+
+@_cache_api
+def api_categorias(request):
+    """Lista de categorías activas en JSON"""
+    
+    def generar():
+        categorias = [serializar_categoria(categoria) for categoria in categorias_activas()]
+        return json.dumps({'categorias': categorias})
+    
+    contenido, estado = pagina_cacheada('cms:api:categorias', generar)
+    return _validadores(_respuesta_json(contenido), estado)
+
+
+@_cache_api
+def api_escenas_categoria(request, categoria_id):
+    """Escenas activas de una categoría en JSON"""
+    
+    def generar():
+        if not categorias_activas().filter(pk=categoria_id).exists():
+            return CATEGORIA_INEXISTENTE
+        escenas = escenas_activas().filter(categoria_id=categoria_id)
+        return json.dumps({
+            'categoria': categoria_id,
+            'escenas': [serializar_escena(escena) for escena in escenas],
+        })
+    
+    contenido, estado = pagina_cacheada(f'cms:api:categoria:{categoria_id}', generar)
+    if contenido == CATEGORIA_INEXISTENTE:
+        raise Http404("La categoría no existe o no está activa")
+    return _validadores(_respuesta_json(contenido), estado)
+
+
+def _condicion_catalogo_async(vista):
+    """
+    ``@condition`` con la versión del catálogo para vistas asíncronas.
+
+    ``condition`` llama a sus funciones de forma síncrona, y leer la versión
+    puede consultar la base de datos cuando la caché está vacía.
+    """
+    
+    @wraps(vista)
+    async def envoltorio(request, *args, **kwargs):
+        estado = await aestado_catalogo()
+        etag = quote_etag(estado['version'])
+        modificado = int(estado['modificado']) or None
+        respuesta = get_conditional_response(request, etag=etag, last_modified=modificado)
+        if respuesta is None:
+            respuesta = await vista(request, *args, **kwargs)
+        if request.method in ('GET', 'HEAD'):
+            if modificado and not respuesta.has_header('Last-Modified'):
+                respuesta.headers['Last-Modified'] = http_date(modificado)
+            respuesta.headers.setdefault('ETag', etag)
+        return respuesta
+    
+    return envoltorio
+
+
+# Versiones asíncronas de las vistas públicas, enrutadas cuando
+# CMS_VISTAS_ASINCRONAS está activo (core/asgi.py); una petición lenta no
+# ocupa un hilo mientras espera a la caché o a la base de datos
+
+@cache_control(no_cache=True)
+@_condicion_catalogo_async
+async def visor_360_async(request):
+    """Vista principal del visor 360 para ASGI"""
     
-    return render(request, 'cms/visor360.html', context)
\ No newline at end of file
+    async def generar():
+        contexto = await _acontexto_visor()
+        return _renderizar_visor(contexto, request), cabecera_link(contexto['precarga'])
+    
+    contenido, estado = await apagina_cacheada('cms:visor360:pagina', generar)
+    return _validadores(_respuesta_visor(*contenido), estado)
+
+
+def _cache_api_async(vista):
+    max_age = getattr(settings, 'CMS_API_MAX_AGE', 60)
+    return require_safe(cache_control(public=True, max_age=max_age)(_condicion_catalogo_async(vista)))
+
+
+@_cache_api_async
+async def api_categorias_async(request):
+    """Lista de categorías activas en JSON para ASGI"""
+    
+    async def generar():
+        categorias = [serializar_categoria(categoria) async for categoria in categorias_activas()]
+        return json.dumps({'categorias': categorias})
+    
+    contenido, estado = await apagina_cacheada('cms:api:categorias', generar)
+    return _validadores(_respuesta_json(contenido), estado)
+
+
+@_cache_api_async
+async def api_escenas_categoria_async(request, categoria_id):
+    """Escenas activas de una categoría en JSON para ASGI"""
+    
+    async def generar():
+        if not await categorias_activas().filter(pk=categoria_id).aexists():
+            return CATEGORIA_INEXISTENTE
+        escenas = escenas_activas().filter(categoria_id=categoria_id)
+        return json.dumps({
+            'categoria': categoria_id,
+            'escenas': [serializar_escena(escena) async for escena in escenas],
+        })
+    
+    contenido, estado = await apagina_cacheada(f'cms:api:categoria:{categoria_id}', generar)
+    if contenido == CATEGORIA_INEXISTENTE:
+        raise Http404("La categoría no existe o no está activa")
+    return _validadores(_respuesta_json(contenido), estado)
+
+
+@require_safe
+def servir_media(request, path, document_root=None, show_indexes=False):
+    """
+    Sirve media cuando nada lo hace antes que Django (runserver, ASGI).
+
+    Atiende Range y revalidaciones, y con ``CMS_ENVIO_ARCHIVOS['DELEGAR']``
+    solo responde la cabecera con que el servidor frontal envía el archivo.
+    Los nombres por contenido se marcan como inmutables.
+    """
+    document_root = document_root or settings.MEDIA_ROOT
+    try:
+        ruta = safe_join(document_root, path)
+    except SuspiciousFileOperation:
+        raise Http404("Ruta no válida")
+    if not os.path.isfile(ruta):
+        if show_indexes:
+            return serve(request, path, document_root=document_root, show_indexes=True)
+        raise Http404("El archivo no existe")
+    
+    tipo = mimetypes.guess_type(ruta)[0] or 'application/octet-stream'
+    delegacion = cabecera_delegacion(path, ruta)
+    if delegacion is not None:
+        respuesta = HttpResponse(content_type=tipo)
+        respuesta.headers[delegacion[0]] = delegacion[1]
+    else:
+        estado, cabeceras, tramo = preparar_envio(request.META, ruta, tipo)
+        if tramo is None or request.method == 'HEAD':
+            respuesta = HttpResponse(status=estado)
+        else:
+            archivo, hasta_el_final = abrir_tramo(ruta, *tramo)
+            if hasta_el_final:
+                # FileResponse llega al servidor como wsgi.file_wrapper (sendfile)
+                respuesta = FileResponse(archivo, status=estado)
+            else:
+                respuesta = StreamingHttpResponse(leer_tramo(archivo, tramo[1]), status=estado)
+        for nombre, valor in cabeceras:
+            respuesta.headers[nombre] = valor
+    
+    if respuesta.status_code in (200, 206, 304) and es_nombre_por_contenido(path):
+        patch_cache_control(respuesta, public=True, max_age=CACHE_INMUTABLE, immutable=True)
+    return respuesta
+
+
+@require_safe
+def metricas(request):
+    """Métricas de Prometheus; solo para las IPs de CMS_METRICAS['IPS_PERMITIDAS']"""
+    if not metricas_activas():
+        raise Http404("Métricas no disponibles")
+    permitidas = configuracion_metricas()['IPS_PERMITIDAS']
+    if permitidas is not None and request.META.get('REMOTE_ADDR') not in permitidas:
+        return HttpResponseForbidden()
+    contenido, tipo = exponer_metricas()
+    return HttpResponse(contenido, content_type=tipo)
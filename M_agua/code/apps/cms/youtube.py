@@ -0,0 +1,58 @@
+"""
+Interpretación de las URLs de YouTube de las escenas.
+
+La URL que escribe el editor se analiza una sola vez al guardar la escena;
+el visor solo lee el identificador y las URLs canónicas ya calculadas.
+"""
+
+import re
+from urllib.parse import parse_qs, urlsplit
+
+from django.core.exceptions import ValidationError
+
+_ID_VIDEO = re.compile(r'^[A-Za-z0-9_-]{11}$')
+
+_DOMINIOS = {'youtube.com', 'www.youtube.com', 'm.youtube.com', 'music.youtube.com', 'youtube-nocookie.com', 'www.youtube-nocookie.com'}
+
+# Rutas de youtube.com que llevan el identificador como segundo segmento
+_PREFIJOS_RUTA = ('embed', 'shorts', 'live', 'v')
+
+
+def extraer_id_youtube(url):
+    """Identificador de 11 caracteres del vídeo, o None si la URL no es de YouTube"""
+    if not url:
+        return None
+    partes = urlsplit(url.strip())
+    dominio = (partes.hostname or '').lower()
+    segmentos = [segmento for segmento in partes.path.split('/') if segmento]
+
+    candidato = None
+    if dominio in ('youtu.be', 'www.youtu.be'):
+        candidato = segmentos[0] if segmentos else None
+    elif dominio in _DOMINIOS:
+        if segmentos == ['watch']:
+            candidato = parse_qs(partes.query).get('v', [None])[0]
+        elif len(segmentos) >= 2 and segmentos[0] in _PREFIJOS_RUTA:
+            candidato = segmentos[1]
+
+    if candidato and _ID_VIDEO.match(candidato):
+        return candidato
+    return None
+
+
+def url_embed(video_id):
+    return f"https://www.youtube.com/embed/{video_id}"
+
+
+def url_watch(video_id):
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+
+def validar_url_youtube(valor):
+    """Validador del campo: rechaza URLs de las que no se puede sacar el vídeo"""
+    if valor and extraer_id_youtube(valor) is None:
+        raise ValidationError(
+            "No se reconoce el vídeo de YouTube en esta URL. Usa un enlace como "
+            "https://www.youtube.com/watch?v=VIDEO_ID o https://youtu.be/VIDEO_ID.",
+            code='youtube_invalido',
+        )
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings.local')
+# Bajo ASGI se enrutan las vistas asíncronas del visor (ver apps/cms/urls.py)
+os.environ.setdefault('CMS_VISTAS_ASINCRONAS', '1')
 
 application = get_asgi_application()
@@ -31,6 +31,20 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# 'contenido' guarda las imágenes subidas con el hash de sus bytes como nombre
+# (apps/cms/storage.py); 'default' se usa para los derivados con nombre fijo
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'contenido': {
+        'BACKEND': 'apps.cms.storage.AlmacenamientoPorContenido',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
@@ -56,15 +70,24 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero, para medir la petición completa; se retira solo sin prometheus_client
+    'apps.cms.metricas.MetricasMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    # Sesión, CSRF, autenticación y mensajes de Django, salvo en los GET del
+    # visor público, que no los usa (apps/cms/middleware.py)
+    'apps.cms.middleware.SesionMiddleware',
     'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
+    'apps.cms.middleware.CsrfMiddleware',
+    'apps.cms.middleware.AutenticacionMiddleware',
+    'apps.cms.middleware.MensajesMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# security.W003 solo reconoce la ruta exacta de CsrfViewMiddleware y avisa
+# en falso con su subclase de arriba; cms.W003 (apps/cms/middleware.py) hace
+# la misma comprobación admitiendo subclases
+SILENCED_SYSTEM_CHECKS = ['security.W003']
+
 ROOT_URLCONF = 'core.urls'
 
 TEMPLATES = [
@@ -82,6 +105,20 @@ TEMPLATES = [
             ],
         },
     },
+    {
+        # Plantillas del visor público: sin los context processors de auth y
+        # messages, que no usa y que la pila ligera no prepara
+        'NAME': 'publico',
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [BASE_DIR / "templates"],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.request',
+                'django.template.context_processors.media',
+            ],
+        },
+    },
 ]
 
 WSGI_APPLICATION = 'core.wsgi.application'
@@ -127,3 +164,42 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Teselas multiresolución de las panorámicas (ver apps/cms/multires.py)
+
+CMS_MULTIRES = {
+    'TAMANO_TESELA': 512,
+    'TAMANO_RESPALDO': 1024,
+    'CALIDAD': 85,
+}
+
+# Rendiciones de iconos, logos e imágenes de categoría (ver apps/cms/miniaturas.py)
+
+CMS_MINIATURAS = {
+    'CALIDAD': 80,
+}
+
+# Caché de páginas del visor (ver apps/cms/cache.py). Con varios procesos el
+# backend debe ser compartido para que la invalidación llegue a todos
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'm-agua',
+    }
+}
+
+CMS_CACHE_PAGINAS = {
+    'TIMEOUT': 60 * 60 * 24,
+}
+
+# El visor incrusta solo la primera categoría y pide las demás a la API al abrirlas
+CMS_VISOR_CARGA_DIFERIDA = True
+
+# Segundos que navegadores y proxies pueden reutilizar las respuestas de la API
+CMS_API_MAX_AGE = 60
+
+# Vistas públicas asíncronas (ORM y caché asíncronos); core/asgi.py lo activa
+# con la variable de entorno para que bajo WSGI sigan las vistas síncronas
+CMS_VISTAS_ASINCRONAS = os.environ.get('CMS_VISTAS_ASINCRONAS') == '1'
@@ -4,5 +4,55 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Una conexión por worker que se reutiliza entre peticiones y se
+        # comprueba antes de usarla tras un periodo inactivo
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Los escritores toman el candado al empezar la transacción en lugar
+            # de fallar con "database is locked" al intentar promocionarlo
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
-}
\ No newline at end of file
+}
+
+# WAL, synchronous=NORMAL, mmap y caché de páginas en cada conexión
+# (valores por defecto en apps/cms/sqlite.py; las claves de aquí los sustituyen)
+CMS_SQLITE_PRAGMAS = {}
+
+# El admin encola teselas y rendiciones en lugar de generarlas durante el
+# guardado; requiere `manage.py run_cms_worker` en marcha (apps/cms/tareas.py)
+CMS_TAREAS = {
+    'EN_SEGUNDO_PLANO': True,
+}
+
+# Caché compartida entre workers: la versión del catálogo que publica el admin
+# tiene que verla cualquier proceso que sirva el visor
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+    }
+}
+
+# Estáticos con huella y variantes .gz/.br generadas en collectstatic
+STORAGES = {
+    **STORAGES,
+    'staticfiles': {
+        'BACKEND': 'apps.cms.storage.EstaticosPrecomprimidos',
+    },
+}
+
+# core/wsgi.py sirve STATIC_ROOT y MEDIA_ROOT sin pasar por Django
+# (apps/cms/servidor_estaticos.py); max-age de los archivos sin huella
+CMS_SERVIR_ESTATICOS = True
+CMS_ESTATICOS_MAX_AGE = 60 * 60
+
+# Con nginx delante, el worker solo resuelve la ruta del media y nginx envía el
+# archivo desde una location `internal` con alias a MEDIA_ROOT; con Apache o
+# lighttpd, 'x-sendfile' (apps/cms/envio.py)
+# CMS_ENVIO_ARCHIVOS = {
+#     'DELEGAR': 'x-accel-redirect',
+#     'UBICACION_INTERNA': '/media-interna/',
+# }
@@ -0,0 +1,12 @@
+'use strict';
+// Filtros del admin con autocompletado: al elegir un objeto se recarga la
+// lista filtrada por él, conservando el resto de filtros y la búsqueda
+django.jQuery(function($) {
+    $('.filtro-autocompletar select').on('change', function() {
+        const consulta = new URLSearchParams(this.dataset.consulta);
+        if (this.value) {
+            consulta.set(this.name, this.value);
+        }
+        window.location.search = consulta.toString();
+    });
+});
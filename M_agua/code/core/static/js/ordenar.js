@@ -0,0 +1,51 @@
+'use strict';
+// Página de ordenar del admin: los elementos se arrastran dentro de la lista
+// y al guardar se envía el orden completo en un solo campo
+document.addEventListener('DOMContentLoaded', function() {
+    const lista = document.getElementById('ordenable');
+    const campo = document.getElementById('id_orden');
+    let arrastrado = null;
+
+    function actualizar() {
+        const elementos = lista.querySelectorAll('li[data-id]');
+        elementos.forEach((elemento, indice) => {
+            elemento.querySelector('.posicion').textContent = indice + 1;
+        });
+        campo.value = Array.from(elementos, elemento => elemento.dataset.id).join(',');
+    }
+
+    lista.addEventListener('dragstart', function(e) {
+        arrastrado = e.target.closest('li[data-id]');
+        if (arrastrado) {
+            arrastrado.classList.add('arrastrando');
+            e.dataTransfer.effectAllowed = 'move';
+        }
+    });
+
+    lista.addEventListener('dragover', function(e) {
+        const destino = e.target.closest('li[data-id]');
+        if (!arrastrado || !destino || destino === arrastrado) {
+            return;
+        }
+        e.preventDefault();
+        // Mitad superior: antes del destino; mitad inferior: después
+        const caja = destino.getBoundingClientRect();
+        if (e.clientY < caja.top + caja.height / 2) {
+            lista.insertBefore(arrastrado, destino);
+        } else {
+            lista.insertBefore(arrastrado, destino.nextSibling);
+        }
+    });
+
+    lista.addEventListener('drop', function(e) {
+        e.preventDefault();
+    });
+
+    lista.addEventListener('dragend', function() {
+        if (arrastrado) {
+            arrastrado.classList.remove('arrastrando');
+            arrastrado = null;
+            actualizar();
+        }
+    });
+});
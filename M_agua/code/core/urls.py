@@ -1,13 +1,23 @@
+import re
+from urllib.parse import urlsplit
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+from apps.cms.views import servir_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('apps.cms.urls')),
 ]
 
-# Servir archivos media en desarrollo
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+# Media a través de Django cuando nada lo sirve antes: en desarrollo, bajo
+# ASGI o con un servidor frontal que delega con X-Accel-Redirect/X-Sendfile
+# (bajo WSGI, core/wsgi.py lo sirve antes de llegar aquí)
+if settings.MEDIA_URL and not urlsplit(settings.MEDIA_URL).netloc:
+    urlpatterns += [
+        re_path(
+            r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')),
+            servir_media,
+        ),
+    ]
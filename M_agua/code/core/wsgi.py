@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings.local')
 
 application = get_wsgi_application()
+
+if getattr(settings, 'CMS_SERVIR_ESTATICOS', False):
+    from apps.cms.servidor_estaticos import ServidorEstaticos
+
+    application = ServidorEstaticos(application)